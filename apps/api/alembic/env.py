@@ -7,9 +7,9 @@ from sqlalchemy import engine_from_config, pool
 
 from app.core.config import settings
 from app.db.base import Base
-from app.db.models import artifact, audit, plan, project, run, run_step
+from app.db.models import artifact, audit, failure_fingerprint, plan, project, run, run_step
 
-MODEL_IMPORTS = (artifact, audit, plan, project, run, run_step)
+MODEL_IMPORTS = (artifact, audit, failure_fingerprint, plan, project, run, run_step)
 
 config = context.config
 config.set_main_option("sqlalchemy.url", settings.database_url)
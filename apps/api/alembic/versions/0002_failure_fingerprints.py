@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_failure_fingerprints"
+down_revision = "0001_init"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "failure_fingerprints",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("run_id", sa.Integer(), sa.ForeignKey("runs.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("step_no", sa.Integer(), nullable=False),
+        sa.Column("simhash", sa.BigInteger(), nullable=False),
+        sa.Column("band0", sa.Integer(), nullable=False),
+        sa.Column("band1", sa.Integer(), nullable=False),
+        sa.Column("band2", sa.Integer(), nullable=False),
+        sa.Column("band3", sa.Integer(), nullable=False),
+        sa.Column("cluster_id", sa.Integer(), nullable=True),
+        sa.Column("excerpt", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_failure_fingerprints_run_id", "failure_fingerprints", ["run_id"])
+    op.create_index("ix_failure_fingerprints_cluster_id", "failure_fingerprints", ["cluster_id"])
+    for band in range(4):
+        op.create_index(f"ix_failure_fingerprints_band{band}", "failure_fingerprints", [f"band{band}"])
+
+
+def downgrade() -> None:
+    op.drop_table("failure_fingerprints")
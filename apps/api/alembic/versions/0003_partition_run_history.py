@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+from app.db.partitions import PARTITIONED_TABLES, create_default_partition_sql, ensure_partitions
+
+revision = "0003_partition_run_history"
+down_revision = "0002_failure_fingerprints"
+branch_labels = None
+depends_on = None
+
+
+def _rebuild(table: str, partitioned: bool) -> None:
+    legacy = f"{table}_legacy"
+    op.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+    op.execute(f"ALTER TABLE {legacy} RENAME CONSTRAINT {table}_pkey TO {legacy}_pkey")
+    op.execute(f"DROP INDEX IF EXISTS ix_{table}_run_id")
+    partition_clause = " PARTITION BY RANGE (created_at)" if partitioned else ""
+    op.execute(f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS){partition_clause}")
+    primary_key = "id, created_at" if partitioned else "id"
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY ({primary_key})")
+    op.execute(
+        f"ALTER TABLE {table} ADD CONSTRAINT {table}_run_id_fkey "
+        f"FOREIGN KEY (run_id) REFERENCES runs (id) ON DELETE CASCADE"
+    )
+    op.execute(f"CREATE INDEX ix_{table}_run_id ON {table} (run_id)")
+    if partitioned:
+        bind = op.get_bind()
+        oldest = bind.execute(sa.text(f"SELECT min(created_at) FROM {legacy}")).scalar()
+        now = datetime.now(timezone.utc)
+        ensure_partitions(bind, now, settings.partition_months_ahead, since=oldest or now, tables=(table,))
+        op.execute(create_default_partition_sql(table))
+    op.execute(f"INSERT INTO {table} SELECT * FROM {legacy}")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    op.execute(f"DROP TABLE {legacy}")
+
+
+def upgrade() -> None:
+    op.add_column(
+        "run_steps",
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.execute("UPDATE run_steps SET created_at = runs.created_at FROM runs WHERE runs.id = run_steps.run_id")
+    for table in PARTITIONED_TABLES:
+        _rebuild(table, partitioned=True)
+
+
+def downgrade() -> None:
+    for table in PARTITIONED_TABLES:
+        _rebuild(table, partitioned=False)
+    op.drop_column("run_steps", "created_at")
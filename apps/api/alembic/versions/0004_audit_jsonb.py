@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0004_audit_jsonb"
+down_revision = "0003_partition_run_history"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE audits ALTER COLUMN payload_json TYPE jsonb USING payload_json::jsonb")
+    op.execute("CREATE INDEX ix_audits_payload_json ON audits USING gin (payload_json jsonb_path_ops)")
+    op.create_index("ix_audits_action_created_at", "audits", ["action", "created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_audits_action_created_at", table_name="audits")
+    op.execute("DROP INDEX ix_audits_payload_json")
+    op.execute("ALTER TABLE audits ALTER COLUMN payload_json TYPE json USING payload_json::json")
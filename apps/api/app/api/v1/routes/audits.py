@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+from datetime import datetime
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import require_api_key
+from app.db.session import get_async_db
+from app.schemas.audit import AuditEntry, AuditPage
+from app.services.audits.query import AuditFilter, audits_stmt, decode_cursor, encode_cursor, parse_predicate
+
+router = APIRouter(dependencies=[Depends(require_api_key)])
+
+EXPORT_BATCH_SIZE = 1000
+
+
+async def _export_audits(
+    db: AsyncSession, filters: AuditFilter, dialect: str, after: tuple[datetime, int] | None
+) -> AsyncIterator[str]:
+    try:
+        while True:
+            batch = list((await db.scalars(audits_stmt(filters, dialect, after, EXPORT_BATCH_SIZE))).all())
+            for audit in batch:
+                yield AuditEntry.model_validate(audit).model_dump_json() + "\n"
+            if len(batch) < EXPORT_BATCH_SIZE:
+                break
+            after = (batch[-1].created_at, batch[-1].id)
+            db.expunge_all()
+    finally:
+        await db.close()
+
+
+@router.get("/v1/audits", response_model=AuditPage)
+async def list_audits(
+    action: list[str] = Query(default=[]),
+    actor: str | None = None,
+    run_id: int | None = None,
+    project_id: int | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    where: list[str] = Query(default=[]),
+    cursor: str | None = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+    format: Literal["json", "ndjson"] = "json",
+    db: AsyncSession = Depends(get_async_db),
+):
+    try:
+        predicates = [parse_predicate(text) for text in where]
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    filters = AuditFilter(
+        actions=action,
+        actor=actor,
+        run_id=run_id,
+        project_id=project_id,
+        since=since,
+        until=until,
+        predicates=predicates,
+    )
+    dialect = db.bind.dialect.name
+    if format == "ndjson":
+        return StreamingResponse(_export_audits(db, filters, dialect, after), media_type="application/x-ndjson")
+
+    rows = list((await db.scalars(audits_stmt(filters, dialect, after, limit + 1))).all())
+    next_cursor = encode_cursor(rows[limit - 1].created_at, rows[limit - 1].id) if len(rows) > limit else None
+    return AuditPage(items=[AuditEntry.model_validate(audit) for audit in rows[:limit]], next_cursor=next_cursor)
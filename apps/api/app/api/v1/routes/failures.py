@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import require_api_key
+from app.db.models.failure_fingerprint import FailureFingerprint
+from app.db.models.run import Run
+from app.db.session import get_async_db
+from app.schemas.failure import FailureCluster, SimilarFailure
+from app.services.failures.fingerprint import to_unsigned
+from app.services.failures.store import candidates_stmt, clusters_stmt, near_duplicates
+
+router = APIRouter(dependencies=[Depends(require_api_key)])
+
+
+@router.get("/v1/failures/clusters", response_model=list[FailureCluster])
+async def list_failure_clusters(
+    project_id: int | None = None, limit: int = 20, db: AsyncSession = Depends(get_async_db)
+) -> list[FailureCluster]:
+    rows = (await db.execute(clusters_stmt(project_id, limit))).all()
+    if not rows:
+        return []
+    representatives = {
+        fingerprint.id: fingerprint
+        for fingerprint in (
+            await db.scalars(select(FailureFingerprint).where(FailureFingerprint.id.in_([row.cluster_id for row in rows])))
+        ).all()
+    }
+    return [
+        FailureCluster(
+            cluster_id=row.cluster_id,
+            occurrences=row.occurrences,
+            runs=row.runs,
+            first_seen=row.first_seen,
+            last_seen=row.last_seen,
+            excerpt=representatives[row.cluster_id].excerpt if row.cluster_id in representatives else "",
+        )
+        for row in rows
+    ]
+
+
+@router.get("/v1/runs/{run_id}/similar", response_model=list[SimilarFailure])
+async def list_similar_failures(run_id: int, limit: int = 10, db: AsyncSession = Depends(get_async_db)) -> list[SimilarFailure]:
+    run = await db.scalar(select(Run).where(Run.id == run_id))
+    if run is None:
+        raise HTTPException(status_code=404, detail="run not found")
+
+    fingerprints = (await db.scalars(select(FailureFingerprint).where(FailureFingerprint.run_id == run_id))).all()
+    best: dict[int, tuple[int, int, FailureFingerprint]] = {}
+    for fingerprint in fingerprints:
+        value = to_unsigned(fingerprint.simhash)
+        candidates = (await db.scalars(candidates_stmt(value, exclude_run_id=run_id))).all()
+        for distance, candidate in near_duplicates(value, candidates):
+            current = best.get(candidate.id)
+            if current is None or distance < current[0]:
+                best[candidate.id] = (distance, fingerprint.step_no, candidate)
+
+    ordered = sorted(best.values(), key=lambda item: (item[0], -item[2].run_id))[:limit]
+    return [
+        SimilarFailure(
+            run_id=candidate.run_id,
+            project_id=candidate.project_id,
+            step_no=candidate.step_no,
+            source_step_no=source_step_no,
+            distance=distance,
+            cluster_id=candidate.cluster_id,
+            created_at=candidate.created_at,
+            excerpt=candidate.excerpt,
+        )
+        for distance, source_step_no, candidate in ordered
+    ]
@@ -1,31 +1,63 @@
 from __future__ import annotations
 
+from functools import partial
+from pathlib import Path
+
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
 from app.core.security import require_api_key
 from app.db.models.plan import Plan
 from app.db.models.project import Project
-from app.db.session import get_db
+from app.db.models.run import Run
+from app.db.session import get_async_db
 from app.schemas.plan import PlanCreate, PlanRead
+from app.services.executor.policies import policy_registry
+from app.services.fingerprint.project_fingerprint import project_fingerprint
 from app.services.planner.rule_planner import generate_plan
+from app.services.planner.test_impact import TestSelection, changed_since, select_tests
 from app.state.machine import RunStatus, can_transition_run
 
 router = APIRouter(dependencies=[Depends(require_api_key)])
 
 
+def _select_tests(project_id: int, root_path: Path, changed_files: list[str] | None, base_ref: str | None) -> TestSelection:
+    if changed_files is None and base_ref is not None:
+        changed_files = changed_since(root_path, base_ref)
+    return select_tests(project_id, root_path, changed_files)
+
+
 @router.post("/v1/projects/{project_id}/plans", response_model=PlanRead)
-def create_plan(project_id: int, payload: PlanCreate, db: Session = Depends(get_db)) -> Plan:
-    project = db.scalar(select(Project).where(Project.id == project_id))
+async def create_plan(project_id: int, payload: PlanCreate, db: AsyncSession = Depends(get_async_db)) -> Plan:
+    project = await db.scalar(select(Project).where(Project.id == project_id))
     if project is None:
         raise HTTPException(status_code=404, detail="project not found")
 
-    plan_json = generate_plan(payload.intent_text)
+    root_path = Path(project.root_path)
+    fingerprint = None
+    if await run_in_threadpool(root_path.is_dir):
+        fingerprint = await run_in_threadpool(project_fingerprint, project.id, root_path)
+    base_ref = None
+    if payload.changed_files is None:
+        last_success = await db.scalar(
+            select(Run)
+            .where(Run.project_id == project_id, Run.status == RunStatus.SUCCEEDED.value)
+            .order_by(Run.id.desc())
+            .limit(1)
+        )
+        if last_success is not None:
+            base_ref = (last_success.sandbox_meta or {}).get("git_head")
+    selector = partial(_select_tests, project.id, root_path, payload.changed_files, base_ref)
+    plan_json = await run_in_threadpool(generate_plan, payload.intent_text, fingerprint, selector)
+    violations = policy_registry.engine_for(project.id, project.name).validate_plan(plan_json)
+    if violations:
+        raise HTTPException(status_code=422, detail={"message": "plan violates command policy", "violations": violations})
     plan = Plan(project_id=project_id, intent_text=payload.intent_text, plan_json=plan_json)
     db.add(plan)
-    db.commit()
-    db.refresh(plan)
+    await db.commit()
+    await db.refresh(plan)
 
     if not can_transition_run(RunStatus.PENDING, RunStatus.PLANNED):
         raise HTTPException(status_code=500, detail="invalid run transition table")
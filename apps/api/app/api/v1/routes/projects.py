@@ -1,13 +1,16 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends
+from pathlib import Path
+
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.core.security import require_api_key
 from app.db.models.project import Project
 from app.db.session import get_db
-from app.schemas.project import ProjectCreate, ProjectRead
+from app.schemas.project import ProjectCreate, ProjectFingerprint, ProjectRead
+from app.services.fingerprint.project_fingerprint import project_fingerprint
 
 router = APIRouter(prefix="/v1/projects", tags=["projects"], dependencies=[Depends(require_api_key)])
 
@@ -24,3 +27,14 @@ def create_project(payload: ProjectCreate, db: Session = Depends(get_db)) -> Pro
 @router.get("", response_model=list[ProjectRead])
 def list_projects(db: Session = Depends(get_db)) -> list[Project]:
     return list(db.scalars(select(Project).order_by(Project.id.desc())).all())
+
+
+@router.get("/{project_id}/fingerprint", response_model=ProjectFingerprint)
+def get_project_fingerprint(project_id: int, db: Session = Depends(get_db)) -> ProjectFingerprint:
+    project = db.scalar(select(Project).where(Project.id == project_id))
+    if project is None:
+        raise HTTPException(status_code=404, detail="project not found")
+    root_path = Path(project.root_path)
+    if not root_path.is_dir():
+        raise HTTPException(status_code=409, detail="project root_path is not a directory")
+    return ProjectFingerprint(project_id=project_id, **project_fingerprint(project_id, root_path))
@@ -1,14 +1,16 @@
 from __future__ import annotations
 
+from collections import OrderedDict
 from datetime import datetime, timezone
-from pathlib import Path
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
 from app.api.v1.ws.manager import ws_manager
+from app.api.v1.ws.stream import stream_hub
 from app.core.security import require_api_key
 from app.db.models.artifact import Artifact
 from app.db.models.audit import Audit
@@ -16,29 +18,54 @@ from app.db.models.plan import Plan
 from app.db.models.project import Project
 from app.db.models.run import Run
 from app.db.models.run_step import RunStep
-from app.db.session import get_db
+from app.db.partitions import partition_floor
+from app.db.session import get_async_db
 from app.schemas.run import RunActionResponse, RunCreate, RunRead
+from app.services.artifacts.store import artifact_store
+from app.services.executor.checkpoints import has_checkpoints
+from app.services.executor.policies import policy_registry
 from app.services.tasks import celery_client
 from app.state.machine import RunStatus, StepStatus, can_transition_run
 
 router = APIRouter(dependencies=[Depends(require_api_key)])
 
+KNOWN_RUNS_LIMIT = 10_000
+_known_run_projects: OrderedDict[int, int] = OrderedDict()
+
 
 def _validate_transition(current_status: str, target_status: RunStatus) -> None:
     if not can_transition_run(RunStatus(current_status), target_status):
         raise HTTPException(status_code=400, detail=f"invalid transition {current_status} -> {target_status.value}")
 
 
+def _read_artifact_contents(artifacts: list[Artifact]) -> dict[str, str]:
+    store = artifact_store()
+    contents: dict[str, str] = {}
+    for artifact in artifacts:
+        if artifact.kind not in {"report", "diff", "audit"}:
+            continue
+        try:
+            data = store.read_bytes(artifact.path)
+        except OSError:
+            continue
+        contents[artifact.kind] = data.decode("utf-8", errors="ignore")
+    return contents
+
+
 @router.post("/v1/projects/{project_id}/runs", response_model=RunActionResponse)
-def create_run(project_id: int, payload: RunCreate, db: Session = Depends(get_db)) -> RunActionResponse:
-    project = db.scalar(select(Project).where(Project.id == project_id))
+async def create_run(project_id: int, payload: RunCreate, db: AsyncSession = Depends(get_async_db)) -> RunActionResponse:
+    project = await db.scalar(select(Project).where(Project.id == project_id))
     if project is None:
         raise HTTPException(status_code=404, detail="project not found")
 
-    plan = db.scalar(select(Plan).where(Plan.id == payload.plan_id, Plan.project_id == project_id))
+    plan = await db.scalar(select(Plan).where(Plan.id == payload.plan_id, Plan.project_id == project_id))
     if plan is None:
         raise HTTPException(status_code=404, detail="plan not found")
 
+    violations = policy_registry.engine_for(project.id, project.name).validate_plan(plan.plan_json)
+    if violations:
+        raise HTTPException(status_code=422, detail={"message": "plan violates command policy", "violations": violations})
+
     _validate_transition(RunStatus.PENDING.value, RunStatus.PLANNED)
     _validate_transition(RunStatus.PLANNED.value, RunStatus.AWAITING_REVIEW)
 
@@ -50,8 +77,8 @@ def create_run(project_id: int, payload: RunCreate, db: Session = Depends(get_db
         risk_level=plan.plan_json.get("risk_level", "medium"),
     )
     db.add(run)
-    db.commit()
-    db.refresh(run)
+    await db.commit()
+    await db.refresh(run)
 
     commands = []
     for step_no, step in enumerate(plan.plan_json.get("steps", []), start=1):
@@ -68,13 +95,13 @@ def create_run(project_id: int, payload: RunCreate, db: Session = Depends(get_db
             )
         )
     db.add(Audit(run_id=run.id, actor="user", action="run.created", payload_json={"plan_id": plan.id}))
-    db.commit()
+    await db.commit()
     return RunActionResponse(run_id=run.id, status=run.status)
 
 
 @router.post("/v1/runs/{run_id}:approve", response_model=RunActionResponse)
-def approve_run(run_id: int, db: Session = Depends(get_db)) -> RunActionResponse:
-    run = db.scalar(select(Run).where(Run.id == run_id))
+async def approve_run(run_id: int, db: AsyncSession = Depends(get_async_db)) -> RunActionResponse:
+    run = await db.scalar(select(Run).where(Run.id == run_id))
     if run is None:
         raise HTTPException(status_code=404, detail="run not found")
     _validate_transition(run.status, RunStatus.RUNNING)
@@ -82,48 +109,103 @@ def approve_run(run_id: int, db: Session = Depends(get_db)) -> RunActionResponse
     run.status = RunStatus.RUNNING.value
     run.started_at = datetime.now(timezone.utc)
     db.add(Audit(run_id=run.id, actor="user", action="run.approved", payload_json={}))
-    db.commit()
+    await db.commit()
+
+    await run_in_threadpool(celery_client.send_task, "worker.execute_run", kwargs={"run_id": run_id})
+    return RunActionResponse(run_id=run.id, status=run.status)
 
-    celery_client.send_task("worker.execute_run", kwargs={"run_id": run_id})
+
+@router.post("/v1/runs/{run_id}:resume", response_model=RunActionResponse)
+async def resume_run(run_id: int, db: AsyncSession = Depends(get_async_db)) -> RunActionResponse:
+    source = await db.scalar(select(Run).where(Run.id == run_id))
+    if source is None:
+        raise HTTPException(status_code=404, detail="run not found")
+    if source.status != RunStatus.FAILED.value:
+        raise HTTPException(status_code=400, detail=f"only FAILED runs can be resumed, got {source.status}")
+
+    steps = list((await db.scalars(select(RunStep).where(RunStep.run_id == run_id).order_by(RunStep.step_no))).all())
+    failed_step = next((step for step in steps if step.status == StepStatus.FAILED.value), None)
+    if failed_step is None:
+        raise HTTPException(status_code=400, detail="run has no failed step to resume from")
+    restored_steps = [step.step_no for step in steps if step.step_no < failed_step.step_no]
+    if not await run_in_threadpool(has_checkpoints, run_id, restored_steps):
+        raise HTTPException(status_code=409, detail="workspace checkpoints for this run are no longer available")
+
+    resume = {"run_id": source.id, "step_no": failed_step.step_no}
+    sandbox_meta = {key: value for key, value in (source.sandbox_meta or {}).items() if key not in {"git_head", "shards"}}
+    run = Run(
+        project_id=source.project_id,
+        plan_id=source.plan_id,
+        status=RunStatus.AWAITING_REVIEW.value,
+        sandbox_meta={**sandbox_meta, "resume": resume},
+        risk_level=source.risk_level,
+    )
+    db.add(run)
+    await db.commit()
+    await db.refresh(run)
+
+    for step in steps:
+        db.add(
+            RunStep(
+                run_id=run.id,
+                step_no=step.step_no,
+                type=step.type,
+                command=step.command,
+                status=StepStatus.SKIPPED.value if step.step_no < failed_step.step_no else StepStatus.QUEUED.value,
+            )
+        )
+    db.add(
+        Audit(
+            run_id=run.id,
+            actor="user",
+            action="run.created",
+            payload_json={"plan_id": run.plan_id, "resumed_from_run_id": source.id, "step_no": failed_step.step_no},
+        )
+    )
+    db.add(Audit(run_id=source.id, actor="user", action="run.resumed", payload_json={"resume_run_id": run.id, **resume}))
+    await db.commit()
     return RunActionResponse(run_id=run.id, status=run.status)
 
 
 @router.post("/v1/runs/{run_id}:cancel", response_model=RunActionResponse)
-def cancel_run(run_id: int, db: Session = Depends(get_db)) -> RunActionResponse:
-    run = db.scalar(select(Run).where(Run.id == run_id))
+async def cancel_run(run_id: int, db: AsyncSession = Depends(get_async_db)) -> RunActionResponse:
+    run = await db.scalar(select(Run).where(Run.id == run_id))
     if run is None:
         raise HTTPException(status_code=404, detail="run not found")
     _validate_transition(run.status, RunStatus.CANCELLED)
     run.status = RunStatus.CANCELLED.value
     run.finished_at = datetime.now(timezone.utc)
     db.add(Audit(run_id=run.id, actor="user", action="run.cancelled", payload_json={}))
-    db.commit()
+    await db.commit()
     return RunActionResponse(run_id=run.id, status=run.status)
 
 
 @router.get("/v1/runs/{run_id}", response_model=RunRead)
-def get_run(run_id: int, db: Session = Depends(get_db)) -> RunRead:
-    run = db.scalar(select(Run).where(Run.id == run_id))
+async def get_run(run_id: int, db: AsyncSession = Depends(get_async_db)) -> RunRead:
+    run = await db.scalar(select(Run).where(Run.id == run_id))
     if run is None:
         raise HTTPException(status_code=404, detail="run not found")
 
-    steps = list(db.scalars(select(RunStep).where(RunStep.run_id == run_id).order_by(RunStep.step_no)).all())
-    audits = list(db.scalars(select(Audit).where(Audit.run_id == run_id).order_by(Audit.id)).all())
-    artifacts = list(db.scalars(select(Artifact).where(Artifact.run_id == run_id).order_by(Artifact.id)).all())
+    since = partition_floor(run.created_at)
+    steps = list(
+        (
+            await db.scalars(
+                select(RunStep).where(RunStep.run_id == run_id, RunStep.created_at >= since).order_by(RunStep.step_no)
+            )
+        ).all()
+    )
+    audits = list(
+        (await db.scalars(select(Audit).where(Audit.run_id == run_id, Audit.created_at >= since).order_by(Audit.id))).all()
+    )
+    artifacts = list(
+        (
+            await db.scalars(
+                select(Artifact).where(Artifact.run_id == run_id, Artifact.created_at >= since).order_by(Artifact.id)
+            )
+        ).all()
+    )
 
-    report_content: str | None = None
-    diff_content: str | None = None
-    audit_content: str | None = None
-    for artifact in artifacts:
-        artifact_path = Path(artifact.path)
-        if not artifact_path.exists():
-            continue
-        if artifact.kind == "report":
-            report_content = artifact_path.read_text(encoding="utf-8", errors="ignore")
-        elif artifact.kind == "diff":
-            diff_content = artifact_path.read_text(encoding="utf-8", errors="ignore")
-        elif artifact.kind == "audit":
-            audit_content = artifact_path.read_text(encoding="utf-8", errors="ignore")
+    contents = await run_in_threadpool(_read_artifact_contents, artifacts)
 
     return RunRead(
         id=run.id,
@@ -137,17 +219,32 @@ def get_run(run_id: int, db: Session = Depends(get_db)) -> RunRead:
         steps=steps,
         audits=audits,
         artifacts=artifacts,
-        report_content=report_content,
-        diff_content=diff_content,
-        audit_content=audit_content,
+        report_content=contents.get("report"),
+        diff_content=contents.get("diff"),
+        audit_content=contents.get("audit"),
     )
 
 
+async def _run_project_id(db: AsyncSession, run_id: int) -> int | None:
+    project_id = _known_run_projects.get(run_id)
+    if project_id is not None:
+        _known_run_projects.move_to_end(run_id)
+        return project_id
+    project_id = await db.scalar(select(Run.project_id).where(Run.id == run_id))
+    if project_id is not None:
+        _known_run_projects[run_id] = project_id
+        if len(_known_run_projects) > KNOWN_RUNS_LIMIT:
+            _known_run_projects.popitem(last=False)
+    return project_id
+
+
 @router.post("/v1/internal/runs/{run_id}/events")
-async def post_run_event(run_id: int, payload: dict[str, Any], db: Session = Depends(get_db)) -> dict[str, str]:
-    run = db.scalar(select(Run).where(Run.id == run_id))
-    if run is None:
+async def post_run_event(
+    run_id: int, payload: dict[str, Any], db: AsyncSession = Depends(get_async_db)
+) -> dict[str, str]:
+    project_id = await _run_project_id(db, run_id)
+    if project_id is None:
         raise HTTPException(status_code=404, detail="run not found")
-
+    stream_hub.publish(run_id, project_id, payload)
     await ws_manager.broadcast(run_id, payload)
     return {"status": "ok"}
@@ -1,52 +1,204 @@
 from __future__ import annotations
 
-import subprocess
+from collections.abc import Iterator
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
+from app.core.config import settings
 from app.core.security import require_api_key
 from app.db.models.project import Project
-from app.db.session import get_db
-from app.schemas.search import SearchRequest, SearchResult
+from app.db.models.run import Run
+from app.db.session import get_async_db
+from app.schemas.search import IndexStatus, LogSearchHit, LogSearchRequest, SearchRequest, SearchResult
+from app.services.search.cache import UNINDEXED_STAMP, cache_key, generation_stamps, search_cache
+from app.services.search.index import (
+    IndexHit,
+    index_dir_for,
+    index_status,
+    iter_index_hits,
+    open_index,
+    search_chunks,
+)
+from app.services.search.keyword import KeywordRanker, iter_rg_hits, rank_hits, stream_hits
+from app.services.search.logs import MIN_QUERY_CHARS, log_index_dir, search_logs
+from app.services.tasks import celery_client
 
 router = APIRouter(dependencies=[Depends(require_api_key)])
 
 
+def _semantic_search(project_id: int, root_path: Path, payload: SearchRequest) -> list[SearchResult] | None:
+    reader = open_index(index_dir_for(project_id))
+    if reader is None or reader.vectors is None:
+        return None
+    return [
+        SearchResult(path=hit.path, snippet=hit.snippet, line_range=[hit.start_line, hit.end_line], score=hit.score)
+        for hit in search_chunks(reader, root_path, payload.query, payload.mode, payload.top_k)
+    ]
+
+
+def _keyword_hits(project_id: int, root_path: Path, query: str) -> Iterator[IndexHit]:
+    reader = open_index(index_dir_for(project_id))
+    if reader is not None:
+        return iter_index_hits(reader, root_path, query)
+    return iter_rg_hits(root_path, query)
+
+
+def _to_result(score: float, hit: IndexHit) -> SearchResult:
+    return SearchResult(path=hit.path, snippet=hit.snippet, line_range=[hit.line_no, hit.line_no], score=score)
+
+
+def _keyword_search(project_id: int, root_path: Path, payload: SearchRequest) -> list[SearchResult]:
+    hits = _keyword_hits(project_id, root_path, payload.query)
+    return [_to_result(score, hit) for score, hit in rank_hits(hits, KeywordRanker(root_path), payload.top_k)]
+
+
+def _stream_keyword_search(project_id: int, root_path: Path, payload: SearchRequest) -> Iterator[str]:
+    hits = _keyword_hits(project_id, root_path, payload.query)
+    for score, hit in stream_hits(hits, KeywordRanker(root_path), payload.top_k):
+        yield _to_result(score, hit).model_dump_json() + "\n"
+
+
+def _cache_key(project_id: int, payload: SearchRequest) -> tuple[str, float | None]:
+    stamp = generation_stamps.get(project_id)
+    ttl = settings.search_cache_unindexed_ttl_seconds if stamp == UNINDEXED_STAMP else None
+    return cache_key(project_id, payload.mode, payload.query, payload.top_k, stamp), ttl
+
+
+def _cached_results(key: str) -> list[SearchResult] | None:
+    cached = search_cache.get(key)
+    if cached is None:
+        return None
+    return [SearchResult.model_validate(item) for item in cached]
+
+
+def _store_results(key: str, results: list[SearchResult], ttl: float | None) -> None:
+    search_cache.put(key, [result.model_dump() for result in results], ttl)
+
+
 @router.post("/v1/projects/{project_id}/index:build")
-def build_index(project_id: int, db: Session = Depends(get_db)) -> dict[str, str]:
-    project = db.scalar(select(Project).where(Project.id == project_id))
+async def build_index(project_id: int, db: AsyncSession = Depends(get_async_db)) -> dict[str, str]:
+    project = await db.scalar(select(Project).where(Project.id == project_id))
+    if project is None:
+        raise HTTPException(status_code=404, detail="project not found")
+    task = await run_in_threadpool(celery_client.send_task, "worker.build_index", kwargs={"project_id": project_id})
+    return {"status": "queued", "mode": "keyword", "project_id": str(project_id), "task_id": str(task.id)}
+
+
+@router.post("/v1/projects/{project_id}/index:refresh")
+async def refresh_index(project_id: int, db: AsyncSession = Depends(get_async_db)) -> dict[str, str]:
+    project = await db.scalar(select(Project).where(Project.id == project_id))
     if project is None:
         raise HTTPException(status_code=404, detail="project not found")
-    return {"status": "queued", "mode": "keyword", "project_id": str(project_id)}
+    task = await run_in_threadpool(celery_client.send_task, "worker.refresh_index", kwargs={"project_id": project_id})
+    return {"status": "queued", "mode": "refresh", "project_id": str(project_id), "task_id": str(task.id)}
+
+
+@router.get("/v1/projects/{project_id}/index", response_model=IndexStatus)
+async def get_index_status(project_id: int, db: AsyncSession = Depends(get_async_db)) -> IndexStatus:
+    project = await db.scalar(select(Project).where(Project.id == project_id))
+    if project is None:
+        raise HTTPException(status_code=404, detail="project not found")
+    meta = await run_in_threadpool(index_status, index_dir_for(project_id))
+    if meta is None:
+        return IndexStatus(project_id=project_id, status="missing")
+    return IndexStatus(
+        project_id=project_id,
+        status="ready",
+        generation=meta["generation"],
+        file_count=meta["file_count"],
+        trigram_count=meta["trigram_count"],
+        chunk_count=meta.get("chunk_count"),
+        segments=meta.get("segments"),
+        size_bytes=meta["size_bytes"],
+        build_seconds=meta["build_seconds"],
+        built_at=meta["built_at"],
+        added=meta.get("added"),
+        changed=meta.get("changed"),
+        deleted=meta.get("deleted"),
+    )
 
 
 @router.post("/v1/projects/{project_id}/search", response_model=list[SearchResult])
-def search_project(project_id: int, payload: SearchRequest, db: Session = Depends(get_db)) -> list[SearchResult]:
-    project = db.scalar(select(Project).where(Project.id == project_id))
+async def search_project(
+    project_id: int, payload: SearchRequest, db: AsyncSession = Depends(get_async_db)
+) -> list[SearchResult] | StreamingResponse:
+    project = await db.scalar(select(Project).where(Project.id == project_id))
     if project is None:
         raise HTTPException(status_code=404, detail="project not found")
 
+    if payload.mode not in {"keyword", "vector", "hybrid"}:
+        raise HTTPException(status_code=400, detail="unsupported mode")
+
+    cache_entry: tuple[str, float | None] | None = None
+    if not payload.stream:
+        cache_entry = await run_in_threadpool(_cache_key, project_id, payload)
+        cached = await run_in_threadpool(_cached_results, cache_entry[0])
+        if cached is not None:
+            return cached
+
     root_path = Path(project.root_path)
     if not root_path.exists():
         return []
 
-    if payload.mode not in {"keyword", "vector", "hybrid"}:
-        raise HTTPException(status_code=400, detail="unsupported mode")
     if payload.mode in {"vector", "hybrid"}:
-        return []
-
-    cmd = ["rg", "-n", payload.query, str(root_path)]
-    proc = subprocess.run(cmd, capture_output=True, text=True, check=False)
-    results: list[SearchResult] = []
-    for line in proc.stdout.splitlines()[: payload.top_k]:
-        parts = line.split(":", 2)
-        if len(parts) < 3:
-            continue
-        file_path, row_no, snippet = parts
-        results.append(
-            SearchResult(path=file_path, snippet=snippet, line_range=[int(row_no), int(row_no)], score=1.0)
+        results = await run_in_threadpool(_semantic_search, project_id, root_path, payload)
+        if results is None:
+            raise HTTPException(status_code=409, detail="index not built; POST index:build first")
+    elif payload.stream:
+        return StreamingResponse(
+            _stream_keyword_search(project_id, root_path, payload), media_type="application/x-ndjson"
         )
+    else:
+        results = await run_in_threadpool(_keyword_search, project_id, root_path, payload)
+
+    if cache_entry is not None:
+        await run_in_threadpool(_store_results, cache_entry[0], results, cache_entry[1])
     return results
+
+
+@router.post("/v1/runs:searchLogs", response_model=list[LogSearchHit])
+async def search_run_logs(payload: LogSearchRequest, db: AsyncSession = Depends(get_async_db)) -> list[LogSearchHit]:
+    if len(payload.query) < MIN_QUERY_CHARS:
+        raise HTTPException(status_code=400, detail=f"query must be at least {MIN_QUERY_CHARS} characters")
+
+    filters = []
+    if payload.project_id is not None:
+        filters.append(Run.project_id == payload.project_id)
+    if payload.status:
+        filters.append(Run.status.in_(payload.status))
+    if payload.since is not None:
+        filters.append(Run.created_at >= payload.since)
+    if payload.until is not None:
+        filters.append(Run.created_at < payload.until)
+    run_ids: set[int] | None = None
+    if filters:
+        run_ids = set((await db.scalars(select(Run.id).where(*filters))).all())
+        if not run_ids:
+            return []
+
+    hits = await run_in_threadpool(search_logs, log_index_dir(), payload.query, run_ids, payload.limit)
+    if not hits:
+        return []
+    runs = {
+        run.id: run
+        for run in (await db.scalars(select(Run).where(Run.id.in_({hit.run_id for hit in hits})))).all()
+    }
+    return [
+        LogSearchHit(
+            run_id=hit.run_id,
+            project_id=runs[hit.run_id].project_id,
+            run_status=runs[hit.run_id].status,
+            run_created_at=runs[hit.run_id].created_at,
+            step_no=hit.step_no,
+            line_no=hit.line_no,
+            snippet=hit.snippet,
+            match_count=hit.match_count,
+        )
+        for hit in hits
+        if hit.run_id in runs
+    ]
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.security import require_api_key
+from app.schemas.upload import UploadCreate, UploadStatus
+from app.services.artifacts.store import StoredBlob, artifact_store
+from app.services.artifacts.uploads import (
+    UploadNotFound,
+    UploadOffsetMismatch,
+    UploadSession,
+    UploadTooLarge,
+    UploadVerificationFailed,
+    append_chunk,
+    complete_upload,
+    create_upload,
+    existing_blob,
+    get_upload,
+    index_uploaded_log,
+    is_indexed_log,
+)
+from app.services.search.logs import read_trigram_keys
+
+router = APIRouter(dependencies=[Depends(require_api_key)])
+
+
+def _session_status(session: UploadSession) -> UploadStatus:
+    return UploadStatus(upload_id=session.upload_id, offset=session.offset, size=session.size, sha256=session.sha256)
+
+
+def _blob_status(blob: StoredBlob) -> UploadStatus:
+    return UploadStatus(
+        offset=blob.size,
+        size=blob.size,
+        complete=True,
+        ref=blob.ref,
+        sha256=blob.sha256,
+        stored_size=blob.stored_size,
+        deduplicated=blob.deduplicated,
+    )
+
+
+def _create(payload: UploadCreate) -> UploadStatus:
+    meta = payload.model_dump(exclude={"sha256", "size"})
+    blob = existing_blob(payload.sha256, payload.size)
+    if blob is not None:
+        if is_indexed_log(meta):
+            with artifact_store().open(blob.ref) as stream:
+                index_uploaded_log(meta, blob.ref, read_trigram_keys(stream))
+        return _blob_status(blob)
+    return _session_status(create_upload(payload.sha256, payload.size, meta))
+
+
+@router.post("/v1/internal/uploads", response_model=UploadStatus)
+async def start_upload(payload: UploadCreate) -> UploadStatus:
+    return await run_in_threadpool(_create, payload)
+
+
+@router.get("/v1/internal/uploads/{upload_id}", response_model=UploadStatus)
+async def upload_status(upload_id: str) -> UploadStatus:
+    try:
+        return _session_status(await run_in_threadpool(get_upload, upload_id))
+    except UploadNotFound as exc:
+        raise HTTPException(status_code=404, detail="upload not found") from exc
+
+
+@router.put("/v1/internal/uploads/{upload_id}", response_model=UploadStatus)
+async def upload_chunk(upload_id: str, offset: int, request: Request) -> UploadStatus:
+    declared = request.headers.get("content-length")
+    if declared is not None and int(declared) > settings.upload_chunk_max_bytes:
+        raise HTTPException(status_code=413, detail=f"chunks are limited to {settings.upload_chunk_max_bytes} bytes")
+    data = bytearray()
+    async for chunk in request.stream():
+        data.extend(chunk)
+        if len(data) > settings.upload_chunk_max_bytes:
+            raise HTTPException(status_code=413, detail=f"chunks are limited to {settings.upload_chunk_max_bytes} bytes")
+    try:
+        session = await run_in_threadpool(append_chunk, upload_id, offset, bytes(data))
+    except UploadNotFound as exc:
+        raise HTTPException(status_code=404, detail="upload not found") from exc
+    except UploadOffsetMismatch as exc:
+        raise HTTPException(status_code=409, detail={"offset": exc.offset}) from exc
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc)) from exc
+    return _session_status(session)
+
+
+@router.post("/v1/internal/uploads/{upload_id}:complete", response_model=UploadStatus)
+async def finish_upload(upload_id: str) -> UploadStatus:
+    try:
+        blob = await run_in_threadpool(complete_upload, upload_id)
+    except UploadNotFound as exc:
+        raise HTTPException(status_code=404, detail="upload not found") from exc
+    except UploadOffsetMismatch as exc:
+        raise HTTPException(status_code=409, detail={"offset": exc.offset}) from exc
+    except UploadVerificationFailed as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    return _blob_status(blob)
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from collections import defaultdict
+from typing import Any
+
+from fastapi import WebSocket
+
+from app.core.config import settings
+from app.core.metrics import ws_stream_dropped_total, ws_stream_frames_total
+
+ENCODINGS = ("json", "batch", "msgpack")
+LOG_KEYS = {"event", "run_id", "step_no", "stream", "line", "shard"}
+
+
+def compact_batch(events: list[dict[str, Any]]) -> list[Any]:
+    frame: list[Any] = []
+    for event in events:
+        if event.get("event") == "step.log" and event.get("stream", "stdout") == "stdout" and set(event) <= LOG_KEYS:
+            previous = frame[-1] if frame else None
+            key = [event.get("run_id"), event.get("step_no"), event.get("shard")]
+            if isinstance(previous, list) and previous[:3] == key:
+                previous[3].append(event["line"])
+            else:
+                frame.append([*key, [event["line"]]])
+        else:
+            frame.append(event)
+    return frame
+
+
+def encode_frames(encoding: str, events: list[dict[str, Any]]) -> list[str | bytes]:
+    if encoding == "json":
+        return [json.dumps(event, separators=(",", ":")) for event in events]
+    frame = compact_batch(events)
+    if encoding == "msgpack":
+        import msgpack
+
+        return [msgpack.packb(frame, use_bin_type=True)]
+    return [json.dumps(frame, separators=(",", ":"))]
+
+
+def msgpack_available() -> bool:
+    try:
+        import msgpack  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class StreamConnection:
+    def __init__(self, websocket: WebSocket, encoding: str) -> None:
+        self.websocket = websocket
+        self.encoding = encoding
+        self.runs: set[int] = set()
+        self.projects: set[int] = set()
+        self._pending: list[dict[str, Any]] = []
+        self._dropped = 0
+        self._wakeup = asyncio.Event()
+
+    def push(self, payload: dict[str, Any]) -> None:
+        if len(self._pending) >= settings.ws_stream_max_pending:
+            self._dropped += 1
+            ws_stream_dropped_total.inc()
+        else:
+            self._pending.append(payload)
+        self._wakeup.set()
+
+    async def send_control(self, payload: dict[str, Any]) -> None:
+        frames = encode_frames(self.encoding, [payload])
+        await self._send(frames)
+
+    async def _send(self, frames: list[str | bytes]) -> None:
+        for frame in frames:
+            if isinstance(frame, bytes):
+                await self.websocket.send_bytes(frame)
+            else:
+                await self.websocket.send_text(frame)
+        ws_stream_frames_total.labels(encoding=self.encoding).inc(len(frames))
+
+    async def run_sender(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(settings.ws_stream_flush_ms / 1000)
+            self._wakeup.clear()
+            events, self._pending = self._pending, []
+            if self._dropped:
+                events.append({"event": "stream.dropped", "count": self._dropped})
+                self._dropped = 0
+            if events:
+                await self._send(encode_frames(self.encoding, events))
+
+
+class StreamHub:
+    def __init__(self) -> None:
+        self._runs: dict[int, set[StreamConnection]] = defaultdict(set)
+        self._projects: dict[int, set[StreamConnection]] = defaultdict(set)
+
+    def subscribe(self, connection: StreamConnection, runs: list[int], projects: list[int]) -> None:
+        if len(connection.runs) + len(connection.projects) + len(runs) + len(projects) > settings.ws_stream_max_subscriptions:
+            raise ValueError(f"at most {settings.ws_stream_max_subscriptions} subscriptions per connection")
+        for run_id in runs:
+            connection.runs.add(run_id)
+            self._runs[run_id].add(connection)
+        for project_id in projects:
+            connection.projects.add(project_id)
+            self._projects[project_id].add(connection)
+
+    def unsubscribe(self, connection: StreamConnection, runs: list[int], projects: list[int]) -> None:
+        for subscribers, ids, owned in ((self._runs, runs, connection.runs), (self._projects, projects, connection.projects)):
+            for item in ids:
+                owned.discard(item)
+                targets = subscribers.get(item)
+                if targets is None:
+                    continue
+                targets.discard(connection)
+                if not targets:
+                    del subscribers[item]
+
+    def remove(self, connection: StreamConnection) -> None:
+        self.unsubscribe(connection, list(connection.runs), list(connection.projects))
+
+    def publish(self, run_id: int, project_id: int | None, payload: dict[str, Any]) -> int:
+        targets = set(self._runs.get(run_id, ()))
+        if project_id is not None:
+            targets.update(self._projects.get(project_id, ()))
+        for connection in targets:
+            connection.push(payload)
+        return len(targets)
+
+
+stream_hub = StreamHub()
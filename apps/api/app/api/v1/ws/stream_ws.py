@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from app.api.v1.ws.stream import ENCODINGS, StreamConnection, msgpack_available, stream_hub
+from app.core.metrics import ws_connections_current
+
+router = APIRouter()
+
+
+def _ids(message: dict[str, Any], key: str) -> list[int]:
+    values = message.get(key, [])
+    if not isinstance(values, list) or not all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+        raise ValueError(f"{key} must be a list of integers")
+    return values
+
+
+@router.websocket("/v1/ws/stream")
+async def stream_ws(websocket: WebSocket, encoding: str = "json") -> None:
+    if encoding not in ENCODINGS or (encoding == "msgpack" and not msgpack_available()):
+        await websocket.close(code=1003, reason=f"unsupported encoding: {encoding}")
+        return
+    await websocket.accept()
+    connection = StreamConnection(websocket, encoding)
+    sender = asyncio.create_task(connection.run_sender())
+    ws_connections_current.inc()
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                message = json.loads(raw)
+                if not isinstance(message, dict) or message.get("op") not in {"subscribe", "unsubscribe"}:
+                    raise ValueError("op must be subscribe or unsubscribe")
+                runs, projects = _ids(message, "runs"), _ids(message, "projects")
+                if message["op"] == "subscribe":
+                    stream_hub.subscribe(connection, runs, projects)
+                else:
+                    stream_hub.unsubscribe(connection, runs, projects)
+            except ValueError as exc:
+                await connection.send_control({"event": "stream.error", "detail": str(exc)})
+                continue
+            await connection.send_control(
+                {"event": "stream.subscriptions", "runs": sorted(connection.runs), "projects": sorted(connection.projects)}
+            )
+    except WebSocketDisconnect:
+        pass
+    finally:
+        stream_hub.remove(connection)
+        sender.cancel()
+        ws_connections_current.dec()
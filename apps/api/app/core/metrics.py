@@ -5,3 +5,12 @@ from prometheus_client import Counter, Gauge, Histogram
 run_duration_seconds = Histogram("run_duration_seconds", "Run duration in seconds", ["project_id"])
 step_failures_total = Counter("step_failures_total", "Total failed steps", ["command"])
 ws_connections_current = Gauge("ws_connections_current", "Current websocket connections")
+search_cache_requests_total = Counter(
+    "search_cache_requests_total", "Search result cache lookups", ["layer", "result"]
+)
+search_cache_bytes = Gauge("search_cache_bytes", "Bytes held by the in-process search result cache")
+artifact_bytes_total = Counter("artifact_bytes_total", "Artifact bytes written to the blob store", ["layer"])
+artifact_blobs_total = Counter("artifact_blobs_total", "Artifact blob writes", ["result"])
+ws_stream_frames_total = Counter("ws_stream_frames_total", "Frames sent on multiplexed websocket streams", ["encoding"])
+ws_stream_dropped_total = Counter("ws_stream_dropped_total", "Events dropped for slow multiplexed websocket consumers")
+run_journal_flushes_total = Counter("run_journal_flushes_total", "Run journal flushes to the database", ["trigger"])
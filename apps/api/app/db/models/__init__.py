@@ -1,8 +1,9 @@
 from app.db.models.artifact import Artifact
 from app.db.models.audit import Audit
+from app.db.models.failure_fingerprint import FailureFingerprint
 from app.db.models.plan import Plan
 from app.db.models.project import Project
 from app.db.models.run import Run
 from app.db.models.run_step import RunStep
 
-__all__ = ["Project", "Plan", "Run", "RunStep", "Audit", "Artifact"]
+__all__ = ["Project", "Plan", "Run", "RunStep", "Audit", "Artifact", "FailureFingerprint"]
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Integer, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class FailureFingerprint(Base):
+    __tablename__ = "failure_fingerprints"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    run_id: Mapped[int] = mapped_column(ForeignKey("runs.id", ondelete="CASCADE"), nullable=False, index=True)
+    project_id: Mapped[int] = mapped_column(ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    step_no: Mapped[int] = mapped_column(Integer, nullable=False)
+    simhash: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    band0: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    band1: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    band2: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    band3: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    cluster_id: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
+    excerpt: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -19,4 +19,5 @@ class Run(Base):
     finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     sandbox_meta: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
     risk_level: Mapped[str] = mapped_column(String(32), nullable=False)
+    journal_seq: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
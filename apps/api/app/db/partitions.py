@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+PARTITIONED_TABLES = ("audits", "run_steps", "artifacts")
+DEFAULT_SUFFIX = "pdefault"
+PARTITION_KEY = "created_at"
+
+
+def month_start(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    value = value.astimezone(timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def partition_floor(value: datetime) -> datetime:
+    floor = month_start(value)
+    return floor if value.tzinfo is not None else floor.replace(tzinfo=None)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def create_partition_sql(table: str, month: datetime) -> str:
+    start = month_start(month)
+    end = add_months(start, 1)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, start)} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def create_default_partition_sql(table: str) -> str:
+    return f"CREATE TABLE IF NOT EXISTS {default_partition_name(table)} PARTITION OF {table} DEFAULT"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_{DEFAULT_SUFFIX}"
+
+
+def split_default_partition_sql(table: str, month: datetime) -> list[str]:
+    start = month_start(month)
+    end = add_months(start, 1)
+    default = default_partition_name(table)
+    in_month = f"{PARTITION_KEY} >= '{start.isoformat()}' AND {PARTITION_KEY} < '{end.isoformat()}'"
+    return [
+        f"ALTER TABLE {table} DETACH PARTITION {default}",
+        create_partition_sql(table, start),
+        f"INSERT INTO {table} SELECT * FROM {default} WHERE {in_month}",
+        f"DELETE FROM {default} WHERE {in_month}",
+        f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT",
+    ]
+
+
+def _child_names(conn: Connection, table: str) -> list[str]:
+    return list(
+        conn.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE parent.relname = :table"
+            ),
+            {"table": table},
+        ).scalars()
+    )
+
+
+def _default_has_rows(conn: Connection, table: str, month: datetime) -> bool:
+    start = month_start(month)
+    return bool(
+        conn.execute(
+            text(
+                f"SELECT EXISTS (SELECT 1 FROM {default_partition_name(table)} "
+                f"WHERE {PARTITION_KEY} >= :start AND {PARTITION_KEY} < :end)"
+            ),
+            {"start": start, "end": add_months(start, 1)},
+        ).scalar()
+    )
+
+
+def list_partitions(conn: Connection, table: str) -> list[tuple[str, datetime]]:
+    partitions: list[tuple[str, datetime]] = []
+    prefix = f"{table}_p"
+    for name in _child_names(conn, table):
+        suffix = name.removeprefix(prefix)
+        if name.startswith(prefix) and len(suffix) == 6 and suffix.isdigit():
+            partitions.append((name, datetime(int(suffix[:4]), int(suffix[4:]), 1, tzinfo=timezone.utc)))
+    return sorted(partitions, key=lambda item: item[1])
+
+
+def ensure_partitions(
+    conn: Connection,
+    now: datetime,
+    months_ahead: int,
+    since: datetime | None = None,
+    tables: tuple[str, ...] = PARTITIONED_TABLES,
+) -> list[str]:
+    if conn.dialect.name != "postgresql":
+        return []
+    first = month_start(since or now)
+    last = add_months(month_start(now), months_ahead)
+    created: list[str] = []
+    for table in tables:
+        existing = set(_child_names(conn, table))
+        has_default = default_partition_name(table) in existing
+        month = first
+        while month <= last:
+            if partition_name(table, month) not in existing:
+                if has_default and _default_has_rows(conn, table, month):
+                    for statement in split_default_partition_sql(table, month):
+                        conn.execute(text(statement))
+                else:
+                    conn.execute(text(create_partition_sql(table, month)))
+                created.append(partition_name(table, month))
+            month = add_months(month, 1)
+    return created
+
+
+def drop_partitions_before(conn: Connection, cutoff: datetime) -> list[str]:
+    if conn.dialect.name != "postgresql":
+        return []
+    cutoff_month = month_start(cutoff)
+    dropped: list[str] = []
+    for table in PARTITIONED_TABLES:
+        for name, month in list_partitions(conn, table):
+            if month >= cutoff_month:
+                break
+            conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            conn.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    return dropped
@@ -4,8 +4,8 @@ from fastapi import FastAPI
 from fastapi.responses import PlainTextResponse
 from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
-from app.api.v1.routes import plans, projects, runs, search
-from app.api.v1.ws import runs_ws
+from app.api.v1.routes import audits, failures, plans, projects, runs, search, uploads
+from app.api.v1.ws import runs_ws, stream_ws
 
 app = FastAPI(title="LocalOps Copilot API", version="0.1.0")
 
@@ -13,7 +13,11 @@ app.include_router(projects.router)
 app.include_router(plans.router)
 app.include_router(runs.router)
 app.include_router(search.router)
+app.include_router(failures.router)
+app.include_router(audits.router)
+app.include_router(uploads.router)
 app.include_router(runs_ws.router)
+app.include_router(stream_ws.router)
 
 
 @app.get("/healthz")
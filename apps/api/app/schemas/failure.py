@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class FailureCluster(BaseModel):
+    cluster_id: int
+    occurrences: int
+    runs: int
+    first_seen: datetime
+    last_seen: datetime
+    excerpt: str
+
+
+class SimilarFailure(BaseModel):
+    run_id: int
+    project_id: int
+    step_no: int
+    source_step_no: int
+    distance: int
+    cluster_id: int | None
+    created_at: datetime
+    excerpt: str
@@ -8,6 +8,7 @@ from pydantic import BaseModel
 
 class PlanCreate(BaseModel):
     intent_text: str
+    changed_files: list[str] | None = None
 
 
 class PlanRead(BaseModel):
@@ -17,3 +17,18 @@ class ProjectRead(BaseModel):
     created_at: datetime
 
     model_config = {"from_attributes": True}
+
+
+class ProjectFingerprint(BaseModel):
+    project_id: int
+    key: str
+    languages: list[str]
+    package_managers: list[str]
+    lockfiles: dict[str, str]
+    test_frameworks: list[str]
+    scripts: list[str]
+    file_count: int
+    language_files: dict[str, int]
+    dir_count: int
+    scanned_at: datetime
+    rescanned_dirs: int
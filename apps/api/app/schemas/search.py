@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from datetime import datetime
+
 from pydantic import BaseModel
 
 
@@ -7,6 +9,27 @@ class SearchRequest(BaseModel):
     query: str
     mode: str = "keyword"
     top_k: int = 10
+    stream: bool = False
+
+
+class LogSearchRequest(BaseModel):
+    query: str
+    project_id: int | None = None
+    status: list[str] | None = None
+    since: datetime | None = None
+    until: datetime | None = None
+    limit: int = 50
+
+
+class LogSearchHit(BaseModel):
+    run_id: int
+    project_id: int
+    run_status: str
+    run_created_at: datetime
+    step_no: int
+    line_no: int
+    snippet: str
+    match_count: int
 
 
 class SearchResult(BaseModel):
@@ -14,3 +37,19 @@ class SearchResult(BaseModel):
     snippet: str
     line_range: list[int]
     score: float
+
+
+class IndexStatus(BaseModel):
+    project_id: int
+    status: str
+    generation: int | None = None
+    file_count: int | None = None
+    trigram_count: int | None = None
+    chunk_count: int | None = None
+    segments: int | None = None
+    size_bytes: int | None = None
+    build_seconds: float | None = None
+    built_at: datetime | None = None
+    added: int | None = None
+    changed: int | None = None
+    deleted: int | None = None
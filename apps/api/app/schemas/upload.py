@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+
+class UploadCreate(BaseModel):
+    sha256: str = Field(pattern=r"^[0-9a-f]{64}$")
+    size: int = Field(ge=0)
+    kind: Literal["artifact", "log"] = "artifact"
+    run_id: int | None = None
+    step_no: int | None = None
+
+
+class UploadStatus(BaseModel):
+    upload_id: str | None = None
+    offset: int
+    size: int
+    complete: bool = False
+    ref: str | None = None
+    sha256: str
+    stored_size: int | None = None
+    deduplicated: bool = False
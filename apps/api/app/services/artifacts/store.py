@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import io
+import os
+import tempfile
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO
+
+from app.core.config import settings
+from app.core.metrics import artifact_bytes_total, artifact_blobs_total
+from app.services.retention.archive import is_archive_ref, read_archived
+
+BLOB_PREFIX = "blob:"
+COPY_BLOCK_BYTES = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class StoredBlob:
+    ref: str
+    sha256: str
+    size: int
+    stored_size: int
+    deduplicated: bool
+
+
+def is_blob_ref(ref: str) -> bool:
+    return ref.startswith(BLOB_PREFIX)
+
+
+class BlobWriter:
+    def __init__(self, store: ArtifactStore) -> None:
+        self._store = store
+        self._digest = hashlib.sha256()
+        self._size = 0
+        store.tmp_dir.mkdir(parents=True, exist_ok=True)
+        handle, pending = tempfile.mkstemp(dir=store.tmp_dir, suffix=".gz")
+        self._pending = Path(pending)
+        self._raw = os.fdopen(handle, "wb")
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=settings.artifact_compress_level, mtime=0)
+        self.result: StoredBlob | None = None
+
+    def write(self, data: bytes) -> int:
+        self._digest.update(data)
+        self._size += len(data)
+        return self._gzip.write(data)
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+    def commit(self) -> StoredBlob:
+        self._gzip.close()
+        self._raw.close()
+        sha256 = self._digest.hexdigest()
+        target = self._store.blob_path(sha256)
+        stored_size = self._pending.stat().st_size
+        try:
+            os.utime(target)
+            stored_size = target.stat().st_size
+            deduplicated = True
+        except FileNotFoundError:
+            deduplicated = False
+        if deduplicated:
+            self._pending.unlink(missing_ok=True)
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(self._pending, target)
+            artifact_bytes_total.labels(layer="stored").inc(stored_size)
+        artifact_bytes_total.labels(layer="raw").inc(self._size)
+        artifact_blobs_total.labels(result="deduplicated" if deduplicated else "stored").inc()
+        self.result = StoredBlob(f"{BLOB_PREFIX}{sha256}", sha256, self._size, stored_size, deduplicated)
+        return self.result
+
+    def abort(self) -> None:
+        self._gzip.close()
+        self._raw.close()
+        self._pending.unlink(missing_ok=True)
+
+    def __enter__(self) -> BlobWriter:
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is not None:
+            self.abort()
+        elif self.result is None:
+            self.commit()
+
+
+class ArtifactStore:
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.tmp_dir = root / "tmp"
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / f"{sha256[2:]}.gz"
+
+    def writer(self) -> BlobWriter:
+        return BlobWriter(self)
+
+    def put_chunks(self, chunks: Iterable[bytes]) -> StoredBlob:
+        with self.writer() as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+            return writer.commit()
+
+    def put_bytes(self, data: bytes) -> StoredBlob:
+        return self.put_chunks([data])
+
+    def put_stream(self, stream: IO[bytes]) -> StoredBlob:
+        return self.put_chunks(iter(lambda: stream.read(COPY_BLOCK_BYTES), b""))
+
+    def put_file(self, path: Path) -> StoredBlob:
+        with path.open("rb") as handle:
+            return self.put_stream(handle)
+
+    def open(self, ref: str) -> IO[bytes]:
+        if is_blob_ref(ref):
+            return gzip.open(self.blob_path(ref.removeprefix(BLOB_PREFIX)), "rb")
+        if is_archive_ref(ref):
+            return io.BytesIO(read_archived(ref))
+        return Path(ref).open("rb")
+
+    def read_bytes(self, ref: str) -> bytes:
+        with self.open(ref) as handle:
+            return handle.read()
+
+    def exists(self, ref: str) -> bool:
+        if is_blob_ref(ref):
+            return self.blob_path(ref.removeprefix(BLOB_PREFIX)).exists()
+        if is_archive_ref(ref):
+            try:
+                read_archived(ref)
+            except OSError:
+                return False
+            return True
+        return Path(ref).exists()
+
+
+def artifact_store() -> ArtifactStore:
+    return ArtifactStore(Path(settings.artifact_root) / "blobs")
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import re
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from app.core.config import settings
+from app.services.artifacts.store import BLOB_PREFIX, StoredBlob, artifact_store
+from app.services.search.index import TrigramCollector
+from app.services.search.logs import index_step_log, log_index_dir
+
+UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+HASH_BLOCK_BYTES = 1024 * 1024
+
+
+class UploadNotFound(Exception):
+    pass
+
+
+class UploadOffsetMismatch(Exception):
+    def __init__(self, offset: int) -> None:
+        super().__init__(f"upload is at offset {offset}")
+        self.offset = offset
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class UploadVerificationFailed(Exception):
+    pass
+
+
+@dataclass
+class UploadSession:
+    upload_id: str
+    sha256: str
+    size: int
+    created_at: float
+    meta: dict[str, Any] = field(default_factory=dict)
+    offset: int = 0
+
+
+def uploads_root() -> Path:
+    return Path(settings.artifact_root) / "uploads"
+
+
+def _paths(upload_id: str) -> tuple[Path, Path]:
+    if not UPLOAD_ID_RE.match(upload_id):
+        raise UploadNotFound(upload_id)
+    return uploads_root() / f"{upload_id}.json", uploads_root() / f"{upload_id}.part"
+
+
+def create_upload(sha256: str, size: int, meta: dict[str, Any]) -> UploadSession:
+    upload_id = uuid.uuid4().hex
+    session = UploadSession(upload_id=upload_id, sha256=sha256, size=size, created_at=time.time(), meta=meta)
+    meta_path, part_path = _paths(upload_id)
+    uploads_root().mkdir(parents=True, exist_ok=True)
+    part_path.touch()
+    record = asdict(session)
+    del record["offset"]
+    meta_path.write_text(json.dumps(record), encoding="utf-8")
+    return session
+
+
+def get_upload(upload_id: str) -> UploadSession:
+    meta_path, part_path = _paths(upload_id)
+    try:
+        record = json.loads(meta_path.read_text(encoding="utf-8"))
+        offset = part_path.stat().st_size
+    except (OSError, ValueError) as exc:
+        raise UploadNotFound(upload_id) from exc
+    return UploadSession(**record, offset=offset)
+
+
+def append_chunk(upload_id: str, offset: int, data: bytes) -> UploadSession:
+    session = get_upload(upload_id)
+    _, part_path = _paths(upload_id)
+    with part_path.open("ab") as handle:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        try:
+            current = os.fstat(handle.fileno()).st_size
+            if current != offset:
+                raise UploadOffsetMismatch(current)
+            if offset + len(data) > session.size:
+                raise UploadTooLarge(f"chunk ends at {offset + len(data)} beyond declared size {session.size}")
+            handle.write(data)
+            handle.flush()
+            session.offset = offset + len(data)
+        finally:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+    return session
+
+
+def discard_upload(upload_id: str) -> None:
+    for path in _paths(upload_id):
+        path.unlink(missing_ok=True)
+
+
+def is_indexed_log(meta: dict[str, Any]) -> bool:
+    return meta.get("kind") == "log" and meta.get("run_id") is not None and meta.get("step_no") is not None
+
+
+def index_uploaded_log(meta: dict[str, Any], ref: str, keys: set[int]) -> None:
+    try:
+        index_step_log(log_index_dir(), int(meta["run_id"]), int(meta["step_no"]), ref, keys)
+    except OSError:
+        pass
+
+
+def complete_upload(upload_id: str) -> StoredBlob:
+    session = get_upload(upload_id)
+    _, part_path = _paths(upload_id)
+    if session.offset != session.size:
+        raise UploadOffsetMismatch(session.offset)
+    trigrams = TrigramCollector() if is_indexed_log(session.meta) else None
+    with part_path.open("rb") as handle, artifact_store().writer() as writer:
+        for block in iter(lambda: handle.read(HASH_BLOCK_BYTES), b""):
+            writer.write(block)
+            if trigrams is not None:
+                trigrams.update(block)
+        if writer.hexdigest() != session.sha256:
+            discard_upload(upload_id)
+            raise UploadVerificationFailed(f"sha256 mismatch for upload {upload_id}")
+        blob = writer.commit()
+    if trigrams is not None:
+        index_uploaded_log(session.meta, blob.ref, trigrams.keys)
+    discard_upload(upload_id)
+    return blob
+
+
+def existing_blob(sha256: str, size: int) -> StoredBlob | None:
+    path = artifact_store().blob_path(sha256)
+    try:
+        os.utime(path)
+        stored_size = path.stat().st_size
+    except OSError:
+        return None
+    return StoredBlob(f"{BLOB_PREFIX}{sha256}", sha256, size, stored_size, True)
+
+
+def gc_uploads(now: float, ttl_seconds: int) -> int:
+    root = uploads_root()
+    if not root.is_dir():
+        return 0
+    removed = 0
+    for meta_path in root.glob("*.json"):
+        part_path = meta_path.with_suffix(".part")
+        try:
+            touched = max(meta_path.stat().st_mtime, part_path.stat().st_mtime if part_path.exists() else 0)
+        except OSError:
+            continue
+        if now - touched > ttl_seconds:
+            part_path.unlink(missing_ok=True)
+            meta_path.unlink(missing_ok=True)
+            removed += 1
+    return removed
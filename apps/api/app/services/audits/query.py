@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import ColumnElement, Select, and_, cast, literal, or_, select
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.db.models.audit import Audit
+from app.db.models.run import Run
+
+PREDICATE_OPERATORS = ("!=", "~", "=")
+
+
+@dataclass(frozen=True)
+class PayloadPredicate:
+    path: tuple[str, ...]
+    operator: str
+    value: Any
+
+
+@dataclass
+class AuditFilter:
+    actions: list[str] = field(default_factory=list)
+    actor: str | None = None
+    run_id: int | None = None
+    project_id: int | None = None
+    since: datetime | None = None
+    until: datetime | None = None
+    predicates: list[PayloadPredicate] = field(default_factory=list)
+
+
+def _parse_value(raw: str) -> Any:
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        return raw
+    return value if isinstance(value, (str, int, float, bool)) else raw
+
+
+def _find_operator(text: str) -> tuple[int, str] | None:
+    for index in range(len(text)):
+        for operator in PREDICATE_OPERATORS:
+            if text.startswith(operator, index):
+                return index, operator
+    return None
+
+
+def parse_predicate(text: str) -> PayloadPredicate:
+    found = _find_operator(text)
+    if found is None:
+        raise ValueError(f"predicate {text!r} must use one of {', '.join(PREDICATE_OPERATORS)}")
+    index, operator = found
+    key, raw = text[:index], text[index + len(operator) :]
+    path = tuple(part for part in key.strip().split(".") if part)
+    if not path:
+        raise ValueError(f"predicate {text!r} has an empty JSON path")
+    value = raw.strip() if operator == "~" else _parse_value(raw.strip())
+    if operator == "~" and not value:
+        raise ValueError(f"predicate {text!r} has an empty substring")
+    return PayloadPredicate(path=path, operator=operator, value=value)
+
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _nested(path: tuple[str, ...], value: Any) -> Any:
+    for key in reversed(path):
+        value = {key: value}
+    return value
+
+
+def _typed(element: Any, value: Any) -> ColumnElement:
+    if isinstance(value, bool):
+        return element.as_boolean()
+    if isinstance(value, (int, float)):
+        return element.as_float()
+    return element.as_string()
+
+
+def payload_condition(predicate: PayloadPredicate, dialect: str) -> ColumnElement:
+    element = Audit.payload_json[predicate.path]
+    if predicate.operator == "~":
+        return element.as_string().ilike(f"%{_like_escape(predicate.value)}%", escape="\\")
+    if predicate.operator == "=" and dialect == "postgresql":
+        return Audit.payload_json.op("@>")(cast(literal(json.dumps(_nested(predicate.path, predicate.value))), JSONB))
+    typed = _typed(element, predicate.value)
+    if predicate.operator == "=":
+        return typed == predicate.value
+    return typed != predicate.value
+
+
+def encode_cursor(created_at: datetime, audit_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), audit_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, audit_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(created_at), int(audit_id)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+def audits_stmt(filters: AuditFilter, dialect: str, after: tuple[datetime, int] | None, limit: int) -> Select:
+    conditions: list[ColumnElement] = []
+    if filters.actions:
+        conditions.append(Audit.action.in_(filters.actions))
+    if filters.actor is not None:
+        conditions.append(Audit.actor == filters.actor)
+    if filters.run_id is not None:
+        conditions.append(Audit.run_id == filters.run_id)
+    if filters.project_id is not None:
+        conditions.append(Audit.run_id.in_(select(Run.id).where(Run.project_id == filters.project_id)))
+    if filters.since is not None:
+        conditions.append(Audit.created_at >= filters.since)
+    if filters.until is not None:
+        conditions.append(Audit.created_at < filters.until)
+    conditions.extend(payload_condition(predicate, dialect) for predicate in filters.predicates)
+    if after is not None:
+        created_at, audit_id = after
+        conditions.append(or_(Audit.created_at < created_at, and_(Audit.created_at == created_at, Audit.id < audit_id)))
+    return select(Audit).where(*conditions).order_by(Audit.created_at.desc(), Audit.id.desc()).limit(limit)
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import stat
+import tarfile
+from pathlib import Path
+from typing import Any
+
+from app.core.config import settings
+
+DIRECTORY_MARK = -1
+
+
+class CheckpointMissing(Exception):
+    pass
+
+
+def checkpoints_root() -> Path:
+    return Path(settings.artifact_root) / "checkpoints"
+
+
+def _run_dir(run_id: int) -> Path:
+    return checkpoints_root() / str(run_id)
+
+
+def _layer_name(step_no: int) -> str:
+    return f"{step_no:04d}"
+
+
+def scan_workspace(workspace: Path) -> dict[str, list[int]]:
+    manifest: dict[str, list[int]] = {}
+    pending = [""]
+    while pending:
+        rel_dir = pending.pop()
+        try:
+            entries = list(os.scandir(workspace / rel_dir if rel_dir else workspace))
+        except OSError:
+            continue
+        for entry in entries:
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            try:
+                entry_stat = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if stat.S_ISDIR(entry_stat.st_mode):
+                manifest[rel_path] = [DIRECTORY_MARK, 0]
+                pending.append(rel_path)
+            else:
+                manifest[rel_path] = [entry_stat.st_size, entry_stat.st_mtime_ns]
+    return manifest
+
+
+def write_checkpoint(run_id: int, step_no: int, workspace: Path, previous: dict[str, list[int]]) -> dict[str, list[int]]:
+    current = scan_workspace(workspace)
+    changed = sorted(path for path, entry in current.items() if previous.get(path) != entry)
+    deleted = sorted(
+        path
+        for path, entry in previous.items()
+        if path not in current or (entry[0] == DIRECTORY_MARK) != (current[path][0] == DIRECTORY_MARK)
+    )
+    run_dir = _run_dir(run_id)
+    run_dir.mkdir(parents=True, exist_ok=True)
+    name = _layer_name(step_no)
+    pending = run_dir / f"{name}.tar.gz.tmp"
+    with tarfile.open(pending, mode="w:gz", compresslevel=1) as archive:
+        for rel_path in changed:
+            try:
+                archive.add(workspace / rel_path, arcname=rel_path, recursive=False)
+            except OSError:
+                continue
+    os.replace(pending, run_dir / f"{name}.tar.gz")
+    layer = {"step_no": step_no, "changed": len(changed), "deleted": deleted}
+    (run_dir / f"{name}.json").write_text(json.dumps(layer), encoding="utf-8")
+    return current
+
+
+def checkpoint_steps(run_id: int) -> list[int]:
+    run_dir = _run_dir(run_id)
+    if not run_dir.is_dir():
+        return []
+    return sorted(
+        int(path.name.split(".")[0])
+        for path in run_dir.glob("*.tar.gz")
+        if path.name.split(".")[0].isdigit() and (run_dir / f"{path.name.split('.')[0]}.json").exists()
+    )
+
+
+def has_checkpoints(run_id: int, step_nos: list[int]) -> bool:
+    available = set(checkpoint_steps(run_id))
+    return all(step_no in available for step_no in step_nos)
+
+
+def inherit_checkpoints(source_run_id: int, run_id: int, step_nos: list[int]) -> None:
+    source_dir = _run_dir(source_run_id)
+    target_dir = _run_dir(run_id)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    for step_no in step_nos:
+        for suffix in (".tar.gz", ".json"):
+            source = source_dir / f"{_layer_name(step_no)}{suffix}"
+            target = target_dir / source.name
+            if not source.exists():
+                raise CheckpointMissing(f"checkpoint for run {source_run_id} step {step_no} is missing")
+            if target.exists():
+                continue
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copy2(source, target)
+
+
+def restore_checkpoints(run_id: int, step_nos: list[int], workspace: Path) -> None:
+    run_dir = _run_dir(run_id)
+    root = workspace.resolve()
+    for step_no in sorted(step_nos):
+        name = _layer_name(step_no)
+        try:
+            layer: dict[str, Any] = json.loads((run_dir / f"{name}.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            raise CheckpointMissing(f"checkpoint for run {run_id} step {step_no} is missing") from exc
+        for rel_path in layer["deleted"]:
+            target = (workspace / rel_path).resolve()
+            if not target.is_relative_to(root) or target == root:
+                continue
+            if target.is_dir() and not target.is_symlink():
+                shutil.rmtree(target, ignore_errors=True)
+            else:
+                target.unlink(missing_ok=True)
+        try:
+            with tarfile.open(run_dir / f"{name}.tar.gz", mode="r:gz") as archive:
+                archive.extractall(workspace, filter="tar")
+        except (OSError, tarfile.TarError) as exc:
+            raise CheckpointMissing(f"checkpoint for run {run_id} step {step_no} is unreadable") from exc
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for entry in path.iterdir():
+        try:
+            entry_stat = entry.stat()
+        except OSError:
+            continue
+        if stat.S_ISREG(entry_stat.st_mode):
+            total += entry_stat.st_size // max(1, entry_stat.st_nlink)
+    return total
+
+
+def gc_checkpoints(budget_bytes: int, keep: set[int] | None = None) -> dict[str, int]:
+    root = checkpoints_root()
+    if not root.is_dir():
+        return {"removed_runs": 0, "bytes": 0}
+    runs: list[tuple[float, int, Path, int]] = []
+    for run_dir in root.iterdir():
+        if not run_dir.is_dir() or not run_dir.name.isdigit():
+            continue
+        try:
+            mtime = run_dir.stat().st_mtime
+        except OSError:
+            continue
+        runs.append((mtime, int(run_dir.name), run_dir, _dir_size(run_dir)))
+    total = sum(size for *_, size in runs)
+    removed = 0
+    for _, run_id, run_dir, size in sorted(runs):
+        if total <= budget_bytes:
+            break
+        if keep and run_id in keep:
+            continue
+        shutil.rmtree(run_dir, ignore_errors=True)
+        total -= size
+        removed += 1
+    return {"removed_runs": removed, "bytes": total}
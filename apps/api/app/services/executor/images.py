@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import tomllib
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from app.core.config import settings
+
+IMAGE_RECIPE_VERSION = 1
+IMAGE_REPOSITORY = "localops-sandbox-deps"
+DEPS_ROOT = "/opt/deps"
+NODE_MODULES = f"{DEPS_ROOT}/node/node_modules"
+PYTHON_LOCKFILES = ("poetry.lock",)
+NODE_LOCKFILES = ("pnpm-lock.yaml",)
+NODE_MANIFESTS = ("package.json", "pnpm-workspace.yaml", ".npmrc")
+LOCAL_SOURCE_TYPES = {"directory", "file", "git", "url"}
+
+
+class ImageBuildError(Exception):
+    pass
+
+
+@dataclass
+class SandboxImage:
+    ref: str
+    key: str | None = None
+    tag: str | None = None
+    built: bool = False
+    node_modules: bool = False
+    error: str | None = None
+
+    def meta(self) -> dict[str, Any]:
+        meta: dict[str, Any] = {"ref": self.ref, "base": settings.sandbox_image}
+        if self.key is not None:
+            meta.update({"key": self.key, "tag": self.tag, "built": self.built})
+        if self.error is not None:
+            meta["error"] = self.error
+        return meta
+
+
+def images_root() -> Path:
+    return Path(settings.artifact_root) / "sandbox_images"
+
+
+def mirror_root() -> Path:
+    return Path(settings.sandbox_deps_mirror) if settings.sandbox_deps_mirror else Path(settings.artifact_root) / "mirror"
+
+
+def _docker(*args: str, timeout: float | None = 60) -> str:
+    try:
+        completed = subprocess.run(
+            ["docker", *args], capture_output=True, text=True, timeout=timeout, check=False
+        )
+    except (OSError, subprocess.TimeoutExpired) as exc:
+        raise ImageBuildError(f"docker {args[0]} failed: {exc}") from exc
+    if completed.returncode != 0:
+        raise ImageBuildError(f"docker {args[0]} failed: {completed.stderr.strip()[-500:]}")
+    return completed.stdout.strip()
+
+
+def _inspect(ref: str) -> tuple[str, int] | None:
+    try:
+        output = _docker("image", "inspect", "--format", "{{.Id}} {{.Size}}", ref)
+    except ImageBuildError:
+        return None
+    image_id, _, size = output.partition(" ")
+    return image_id, int(size or 0)
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for block in iter(lambda: handle.read(65536), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def dependency_lockfiles(root: Path) -> dict[str, str]:
+    names = sorted(path.name for path in root.glob("requirements*.txt") if path.is_file())
+    names += [name for name in (*PYTHON_LOCKFILES, *NODE_LOCKFILES) if (root / name).is_file()]
+    return {name: _sha256(root / name) for name in sorted(names)}
+
+
+def node_manifests(root: Path, lockfiles: dict[str, str]) -> dict[str, str]:
+    if not any(name in lockfiles for name in NODE_LOCKFILES):
+        return {}
+    return {name: _sha256(root / name) for name in NODE_MANIFESTS if (root / name).is_file()}
+
+
+def image_key(lockfiles: dict[str, str], base_id: str, manifests: dict[str, str] | None = None) -> str:
+    material = {"recipe": IMAGE_RECIPE_VERSION, "base": base_id, "lockfiles": lockfiles, "manifests": manifests or {}}
+    return hashlib.sha256(json.dumps(material, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def image_tag(key: str) -> str:
+    return f"{IMAGE_REPOSITORY}:{key[:24]}"
+
+
+def poetry_requirements(lock_text: str) -> list[str]:
+    packages = tomllib.loads(lock_text).get("package", [])
+    return sorted(
+        f"{package['name']}=={package['version']}"
+        for package in packages
+        if package.get("source", {}).get("type") not in LOCAL_SOURCE_TYPES
+    )
+
+
+def _pinned_requirements(text: str) -> list[str]:
+    kept: list[str] = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.startswith(("-e", "--editable", ".", "/", "file:")) or " @ file:" in stripped:
+            continue
+        kept.append(line)
+    return kept
+
+
+def write_build_context(root: Path, lockfiles: dict[str, str], context: Path) -> bool:
+    lock_dir = context / "lock"
+    node_dir = lock_dir / "node"
+    lock_dir.mkdir(parents=True, exist_ok=True)
+    python_requirements: list[str] = []
+    for name in lockfiles:
+        if name.startswith("requirements"):
+            text = (root / name).read_text(encoding="utf-8", errors="ignore")
+            (lock_dir / name).write_text("\n".join(_pinned_requirements(text)) + "\n", encoding="utf-8")
+            python_requirements.append(name)
+        elif name == "poetry.lock":
+            pins = poetry_requirements((root / name).read_text(encoding="utf-8"))
+            (lock_dir / "poetry-requirements.txt").write_text("\n".join(pins) + "\n", encoding="utf-8")
+            python_requirements.append("poetry-requirements.txt")
+    has_node = "pnpm-lock.yaml" in lockfiles and (root / "package.json").is_file()
+    if has_node:
+        node_dir.mkdir()
+        for name in (*NODE_MANIFESTS, *NODE_LOCKFILES):
+            if (root / name).is_file():
+                shutil.copy2(root / name, node_dir / name)
+
+    lines = [f"FROM {settings.sandbox_image}", f"COPY lock/ {DEPS_ROOT}/lock/"]
+    if python_requirements:
+        requirement_args = " ".join(f"-r {DEPS_ROOT}/lock/{name}" for name in python_requirements)
+        lines.append(
+            "RUN --mount=type=bind,from=mirror,target=/mirror "
+            f"python -m venv {DEPS_ROOT}/venv && "
+            f"{DEPS_ROOT}/venv/bin/pip install --no-cache-dir --no-index --find-links /mirror/pip {requirement_args}"
+        )
+    if has_node:
+        lines.append(
+            "RUN --mount=type=bind,from=mirror,target=/mirror,rw "
+            f"cp -r {DEPS_ROOT}/lock/node {DEPS_ROOT}/node && cd {DEPS_ROOT}/node && "
+            "pnpm install --offline --frozen-lockfile --package-import-method copy --store-dir /mirror/pnpm-store"
+        )
+    lines.append(f'ENV PATH="{DEPS_ROOT}/venv/bin:{NODE_MODULES}/.bin:$PATH"')
+    lines.append(f'LABEL localops.deps.recipe="{IMAGE_RECIPE_VERSION}"')
+    lines.append("WORKDIR /workspace")
+    (context / "Dockerfile").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return has_node
+
+
+@contextmanager
+def _locked(name: str) -> Iterator[None]:
+    images_root().mkdir(parents=True, exist_ok=True)
+    with (images_root() / name).open("a") as handle:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def _index_path() -> Path:
+    return images_root() / "index.json"
+
+
+def load_index() -> dict[str, dict[str, Any]]:
+    try:
+        data = json.loads(_index_path().read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _save_index(index: dict[str, dict[str, Any]]) -> None:
+    target = _index_path()
+    target.parent.mkdir(parents=True, exist_ok=True)
+    pending = target.with_suffix(".json.tmp")
+    pending.write_text(json.dumps(index, sort_keys=True), encoding="utf-8")
+    os.replace(pending, target)
+
+
+def _touch(key: str, entry: dict[str, Any], project_id: int) -> None:
+    with _locked(".index.lock"):
+        index = load_index()
+        current = {**index.get(key, {}), **entry}
+        current["last_used"] = time.time()
+        current["projects"] = sorted(set(current.get("projects", [])) | {project_id})
+        index[key] = current
+        _save_index(index)
+
+
+def build_image(root: Path, lockfiles: dict[str, str], key: str) -> tuple[str, int, bool]:
+    mirror = mirror_root()
+    if not mirror.is_dir():
+        raise ImageBuildError(f"dependency mirror {mirror} does not exist")
+    tag = image_tag(key)
+    with tempfile.TemporaryDirectory(prefix="sandbox-deps-") as context_dir:
+        context = Path(context_dir)
+        has_node = write_build_context(root, lockfiles, context)
+        _docker(
+            "build",
+            "--network",
+            "none",
+            "--build-context",
+            f"mirror={mirror}",
+            "--label",
+            f"localops.deps.key={key}",
+            "-t",
+            tag,
+            str(context),
+            timeout=settings.sandbox_deps_build_timeout_seconds,
+        )
+    inspected = _inspect(tag)
+    if inspected is None:
+        raise ImageBuildError(f"built image {tag} is missing")
+    return inspected[0], inspected[1], has_node
+
+
+def ensure_sandbox_image(project_id: int, root: Path) -> SandboxImage:
+    lockfiles = dependency_lockfiles(root)
+    if not lockfiles:
+        return SandboxImage(ref=settings.sandbox_image)
+    base = _inspect(settings.sandbox_image)
+    key = image_key(lockfiles, base[0] if base else settings.sandbox_image, node_manifests(root, lockfiles))
+    tag = image_tag(key)
+    with _locked(f"{key[:24]}.lock"):
+        entry = load_index().get(key)
+        inspected = _inspect(tag) if entry else None
+        if entry and inspected and inspected[0] == entry.get("image_id"):
+            _touch(key, {}, project_id)
+            return SandboxImage(ref=entry["image_id"], key=key, tag=tag, node_modules=entry.get("node_modules", False))
+        try:
+            image_id, size, has_node = build_image(root, lockfiles, key)
+        except (ImageBuildError, OSError, ValueError) as exc:
+            return SandboxImage(ref=settings.sandbox_image, key=key, tag=tag, error=str(exc))
+        _touch(
+            key,
+            {
+                "tag": tag,
+                "image_id": image_id,
+                "size": size,
+                "lockfiles": lockfiles,
+                "node_modules": has_node,
+                "built_at": time.time(),
+            },
+            project_id,
+        )
+    return SandboxImage(ref=image_id, key=key, tag=tag, built=True, node_modules=has_node)
+
+
+def link_node_modules(image: SandboxImage, workspace: Path) -> None:
+    target = workspace / "node_modules"
+    if image.node_modules and not os.path.lexists(target):
+        target.symlink_to(NODE_MODULES)
+
+
+def gc_sandbox_images(budget_bytes: int, keep: set[str] | None = None) -> dict[str, int]:
+    with _locked(".index.lock"):
+        index = load_index()
+        total = sum(int(entry.get("size", 0)) for entry in index.values())
+        removed = 0
+        for key, entry in sorted(index.items(), key=lambda item: item[1].get("last_used", 0)):
+            if total <= budget_bytes:
+                break
+            if keep and key in keep:
+                continue
+            try:
+                _docker("image", "rm", entry.get("tag") or entry.get("image_id", ""))
+            except ImageBuildError:
+                if _inspect(entry.get("image_id", "")) is not None:
+                    continue
+            del index[key]
+            total -= int(entry.get("size", 0))
+            removed += 1
+        _save_index(index)
+    return {"removed_images": removed, "bytes": total}
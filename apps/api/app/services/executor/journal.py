@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import json
+import logging
+import os
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import run_journal_flushes_total
+from app.db.models.audit import Audit
+from app.db.models.run import Run
+from app.db.models.run_step import RunStep
+
+logger = logging.getLogger(__name__)
+
+DATETIME_FIELDS = {"started_at", "finished_at"}
+
+
+class JournalBusy(Exception):
+    pass
+
+
+def journal_root() -> Path:
+    return Path(settings.artifact_root) / "journal"
+
+
+def journal_path(run_id: int) -> Path:
+    return journal_root() / f"{run_id}.jsonl"
+
+
+def journal_run_ids() -> list[int]:
+    root = journal_root()
+    if not root.is_dir():
+        return []
+    return sorted(int(path.stem) for path in root.glob("*.jsonl") if path.stem.isdigit())
+
+
+def _encode(fields: dict[str, Any]) -> dict[str, Any]:
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in fields.items()}
+
+
+def _decode(fields: dict[str, Any]) -> dict[str, Any]:
+    return {
+        key: datetime.fromisoformat(value) if key in DATETIME_FIELDS and isinstance(value, str) else value
+        for key, value in fields.items()
+    }
+
+
+def read_journal(path: Path) -> list[dict[str, Any]]:
+    try:
+        text = path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return []
+    entries: list[dict[str, Any]] = []
+    for line in text.splitlines():
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            break
+    return entries
+
+
+def _try_lock(fd: int) -> bool:
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+class JournalBatch:
+    def __init__(self) -> None:
+        self.steps: dict[int, dict[str, Any]] = {}
+        self.audits: list[dict[str, Any]] = []
+        self.seq = 0
+        self.entries = 0
+
+    def __bool__(self) -> bool:
+        return self.entries > 0
+
+    def add(self, entry: dict[str, Any]) -> None:
+        if "step" in entry:
+            self.steps.setdefault(entry["step"], {}).update(_decode(entry["set"]))
+        else:
+            self.audits.append(entry["audit"])
+        self.seq = entry["seq"]
+        self.entries += 1
+
+    def merge(self, newer: JournalBatch) -> None:
+        for step_id, fields in newer.steps.items():
+            self.steps.setdefault(step_id, {}).update(fields)
+        self.audits.extend(newer.audits)
+        self.seq = max(self.seq, newer.seq)
+        self.entries += newer.entries
+
+
+async def apply_batch(session: AsyncSession, run_id: int, batch: JournalBatch) -> None:
+    if batch.steps:
+        await session.execute(update(RunStep), [{"id": step_id, **fields} for step_id, fields in batch.steps.items()])
+    if batch.audits:
+        await session.execute(insert(Audit), [{"run_id": run_id, **audit} for audit in batch.audits])
+    if batch:
+        await session.execute(update(Run).where(Run.id == run_id).values(journal_seq=batch.seq))
+    await session.commit()
+
+
+class RunJournal:
+    def __init__(
+        self,
+        run_id: int,
+        session_factory: Callable[[], AsyncSession],
+        start_seq: int = 0,
+        flush_seconds: float | None = None,
+    ) -> None:
+        self.run_id = run_id
+        self.path = journal_path(run_id)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        if not _try_lock(self._fd):
+            os.close(self._fd)
+            raise JournalBusy(f"run {run_id} journal is held by another worker")
+        self.flushes = 0
+        self._session_factory = session_factory
+        self._seq = start_seq
+        self._pending = JournalBatch()
+        self._lock = asyncio.Lock()
+        self._flush_seconds = settings.run_journal_flush_seconds if flush_seconds is None else flush_seconds
+        self._stopped = asyncio.Event()
+        self._timer: asyncio.Task[None] | None = None
+
+    def _append(self, entry: dict[str, Any]) -> None:
+        self._seq += 1
+        record = {"seq": self._seq, **entry}
+        os.write(self._fd, (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8"))
+        self._pending.add(record)
+
+    def update_step(self, step: RunStep, **fields: Any) -> None:
+        for key, value in fields.items():
+            setattr(step, key, value)
+        self._append({"step": step.id, "set": _encode(fields)})
+
+    def audit(self, action: str, payload: dict[str, Any], actor: str = "worker") -> None:
+        self._append({"audit": {"actor": actor, "action": action, "payload_json": payload}})
+
+    async def flush(self, session: AsyncSession | None = None, trigger: str = "boundary") -> None:
+        async with self._lock:
+            batch, self._pending = self._pending, JournalBatch()
+            if session is None and not batch:
+                return
+            try:
+                if session is None:
+                    async with self._session_factory() as own_session:
+                        await apply_batch(own_session, self.run_id, batch)
+                else:
+                    await apply_batch(session, self.run_id, batch)
+            except BaseException:
+                batch.merge(self._pending)
+                self._pending = batch
+                raise
+            self.flushes += 1
+            run_journal_flushes_total.labels(trigger=trigger).inc()
+
+    async def _tick(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                await asyncio.wait_for(self._stopped.wait(), self._flush_seconds)
+            except TimeoutError:
+                try:
+                    await self.flush(trigger="timer")
+                except (SQLAlchemyError, OSError) as exc:
+                    logger.warning("run %s journal flush failed: %s", self.run_id, exc)
+
+    def start(self) -> None:
+        self._timer = asyncio.create_task(self._tick())
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._timer is not None:
+            await self._timer
+            self._timer = None
+
+    async def close(self) -> None:
+        await self.stop()
+        if not self._pending:
+            self.path.unlink(missing_ok=True)
+        os.close(self._fd)
+
+
+async def recover_journal(run_id: int, session_factory: Callable[[], AsyncSession]) -> int:
+    path = journal_path(run_id)
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return 0
+    try:
+        if not _try_lock(fd):
+            raise JournalBusy(f"run {run_id} journal is held by another worker")
+        batch = JournalBatch()
+        async with session_factory() as session:
+            watermark = await session.scalar(select(Run.journal_seq).where(Run.id == run_id))
+            if watermark is not None:
+                for entry in read_journal(path):
+                    if entry["seq"] > watermark:
+                        batch.add(entry)
+                if batch:
+                    await apply_batch(session, run_id, batch)
+                    run_journal_flushes_total.labels(trigger="recovery").inc()
+        path.unlink(missing_ok=True)
+        return batch.entries
+    finally:
+        os.close(fd)
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import codecs
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from typing import Any, BinaryIO
+
+READ_CHUNK_BYTES = 65536
+
+
+@dataclass(frozen=True)
+class OutputLine:
+    text: str
+    progress: bool = False
+
+
+def read_chunks(stream: BinaryIO) -> Iterator[bytes]:
+    read = getattr(stream, "read1", stream.read)
+    while True:
+        chunk = read(READ_CHUNK_BYTES)
+        if not chunk:
+            return
+        yield chunk
+
+
+class OutputSplitter:
+    def __init__(self) -> None:
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._buffer = ""
+
+    def feed(self, chunk: bytes) -> list[OutputLine]:
+        buffer = self._buffer + self._decoder.decode(chunk)
+        lines: list[OutputLine] = []
+        start = 0
+        while True:
+            newline = buffer.find("\n", start)
+            carriage = buffer.find("\r", start)
+            if carriage != -1 and (newline == -1 or carriage < newline):
+                if carriage + 1 == len(buffer):
+                    break
+                if buffer[carriage + 1] == "\n":
+                    lines.append(OutputLine(buffer[start:carriage]))
+                    start = carriage + 2
+                else:
+                    lines.append(OutputLine(buffer[start:carriage], progress=True))
+                    start = carriage + 1
+            elif newline != -1:
+                lines.append(OutputLine(buffer[start:newline]))
+                start = newline + 1
+            else:
+                break
+        self._buffer = buffer[start:]
+        return lines
+
+    def close(self) -> list[OutputLine]:
+        buffer = self._buffer + self._decoder.decode(b"", final=True)
+        self._buffer = ""
+        frames = buffer.split("\r")
+        return [
+            OutputLine(frame, progress=index < len(frames) - 1)
+            for index, frame in enumerate(frames)
+            if frame or index < len(frames) - 1
+        ]
+
+
+def split_output(chunks: Iterable[bytes]) -> Iterator[OutputLine]:
+    splitter = OutputSplitter()
+    for chunk in chunks:
+        yield from splitter.feed(chunk)
+    yield from splitter.close()
+
+
+class LiveLogLimiter:
+    def __init__(
+        self,
+        rate_per_second: float,
+        burst: int,
+        progress_interval: float,
+        max_line_chars: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = rate_per_second
+        self.burst = max(1, burst)
+        self.progress_interval = progress_interval
+        self.max_line_chars = max_line_chars
+        self.clock = clock
+        self.tokens = float(self.burst)
+        self.updated = clock()
+        self.suppressed = 0
+        self.total_suppressed = 0
+        self.last_progress = float("-inf")
+        self.emitted = 0
+        self._lock = threading.Lock()
+
+    def _take(self) -> bool:
+        now = self.clock()
+        self.tokens = min(float(self.burst), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def _clip(self, text: str) -> str:
+        if len(text) <= self.max_line_chars:
+            return text
+        return f"{text[: self.max_line_chars]}… [{len(text) - self.max_line_chars} chars truncated]"
+
+    def _marker(self) -> list[dict[str, Any]]:
+        if not self.suppressed:
+            return []
+        marker = {"line": f"… {self.suppressed} lines suppressed", "suppressed": self.suppressed}
+        self.suppressed = 0
+        return [marker]
+
+    def offer(self, line: OutputLine) -> list[dict[str, Any]]:
+        with self._lock:
+            if line.progress:
+                now = self.clock()
+                if now - self.last_progress < self.progress_interval or not self._take():
+                    return []
+                self.last_progress = now
+                events = [{"line": self._clip(line.text), "progress": True}]
+            elif not self._take():
+                self.suppressed += 1
+                self.total_suppressed += 1
+                return []
+            else:
+                events = [*self._marker(), {"line": self._clip(line.text)}]
+            self.emitted += len(events)
+            return events
+
+    def summary(self) -> dict[str, int]:
+        return {"emitted": self.emitted, "suppressed": self.total_suppressed}
+
+    def flush(self) -> list[dict[str, Any]]:
+        with self._lock:
+            events = self._marker()
+            self.emitted += len(events)
+            return events
@@ -1,6 +1,15 @@
 from __future__ import annotations
 
+import json
 import re
+import shlex
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from app.core.config import settings
 
 ALLOWED_COMMANDS = {
     "git",
@@ -24,20 +33,165 @@ DANGEROUS_PATTERNS = [
     re.compile(r"\bchmod\s+777\s+/\b"),
 ]
 
+DECISION_CACHE_SIZE = 4096
+_OPERATOR_CHARS = set(";&|()\n\r")
+_REDIRECT_CHARS = set("<>&")
+_ASSIGNMENT_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*=")
+
+
+@dataclass(frozen=True)
+class PolicyRules:
+    allowed_commands: frozenset[str]
+    deny_patterns: tuple[str, ...]
+
+
+DEFAULT_RULES = PolicyRules(
+    allowed_commands=frozenset(ALLOWED_COMMANDS),
+    deny_patterns=tuple(pattern.pattern for pattern in DANGEROUS_PATTERNS),
+)
+
+
+def _substitutions(word: str) -> list[str]:
+    bodies: list[str] = []
+    index = 0
+    while index < len(word):
+        if word.startswith("$(", index):
+            depth = 1
+            end = index + 2
+            while end < len(word) and depth:
+                depth += {"(": 1, ")": -1}.get(word[end], 0)
+                end += 1
+            bodies.append(word[index + 2 : end - 1 if depth == 0 else end])
+            index = end
+        elif word[index] == "`":
+            end = word.find("`", index + 1)
+            end = len(word) if end == -1 else end
+            bodies.append(word[index + 1 : end])
+            index = end + 1
+        else:
+            index += 1
+    return [body for body in bodies if body.strip()]
+
+
+def split_command(command: str) -> list[list[str]]:
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=";&|()<>\n\r")
+    lexer.whitespace = " \t"
+    lexer.whitespace_split = True
+    segments: list[list[str]] = []
+    current: list[str] = []
+    skip_target = False
+    for token in lexer:
+        if set(token) <= _OPERATOR_CHARS:
+            if current:
+                segments.append(current)
+            current = []
+            continue
+        if set(token) <= _REDIRECT_CHARS:
+            skip_target = True
+            continue
+        for body in _substitutions(token):
+            segments.extend(split_command(body))
+        if skip_target:
+            skip_target = False
+            continue
+        if not current and (token == "$" or _ASSIGNMENT_RE.match(token)):
+            continue
+        current.append(token)
+    if current:
+        segments.append(current)
+    return segments
+
+
+class PolicyEngine:
+    def __init__(self, rules: PolicyRules) -> None:
+        self.rules = rules
+        patterns = "|".join(f"(?:{pattern})" for pattern in rules.deny_patterns)
+        self._deny = re.compile(patterns) if patterns else None
+        self.check = lru_cache(maxsize=DECISION_CACHE_SIZE)(self._check)
 
-def validate_command_policy(command: str) -> tuple[bool, str]:
-    stripped_command = command.strip()
-    if not stripped_command:
-        return False, "empty command"
+    def _check(self, command: str) -> tuple[bool, str]:
+        stripped_command = command.strip()
+        if not stripped_command:
+            return False, "empty command"
 
-    for pattern in DANGEROUS_PATTERNS:
-        if pattern.search(stripped_command):
+        if self._deny is not None and self._deny.search(stripped_command):
             return False, "dangerous pattern blocked"
 
-    head_token = stripped_command.split()[0]
-    if head_token not in ALLOWED_COMMANDS:
-        return False, f"command '{head_token}' not in allowlist"
-    return True, "ok"
+        try:
+            segments = split_command(stripped_command)
+        except ValueError as exc:
+            return False, f"unparseable command: {exc}"
+        if not segments:
+            return False, "empty command"
+        for argv in segments:
+            head_token = argv[0]
+            if head_token not in self.rules.allowed_commands:
+                return False, f"command '{head_token}' not in allowlist"
+        return True, "ok"
+
+    def validate_plan(self, plan_json: dict[str, Any]) -> list[dict[str, Any]]:
+        violations: list[dict[str, Any]] = []
+        for step_no, step in enumerate(plan_json.get("steps", []), start=1):
+            for command in step.get("commands", []):
+                ok, reason = self.check(command)
+                if not ok:
+                    violations.append(
+                        {"step": step.get("id", str(step_no)), "command": command, "reason": reason}
+                    )
+        return violations
+
+
+def _rules_for(config: dict[str, Any], project_key: str | None) -> PolicyRules:
+    default = config.get("default", {})
+    allowed = set(default.get("allowed_commands", DEFAULT_RULES.allowed_commands))
+    deny = list(default.get("deny_patterns", DEFAULT_RULES.deny_patterns))
+    overrides = config.get("projects", {}).get(project_key, {}) if project_key is not None else {}
+    allowed.update(overrides.get("allow", []))
+    allowed.difference_update(overrides.get("block", []))
+    deny.extend(overrides.get("deny_patterns", []))
+    return PolicyRules(allowed_commands=frozenset(allowed), deny_patterns=tuple(deny))
+
+
+class PolicyRegistry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._config_stamp: tuple[str, int] | None = None
+        self._config: dict[str, Any] = {}
+        self._engines: dict[str | None, PolicyEngine] = {}
+
+    def _load(self) -> None:
+        config_path = settings.policy_config_path
+        try:
+            stamp = (config_path, Path(config_path).stat().st_mtime_ns) if config_path else ("", 0)
+        except FileNotFoundError:
+            stamp = (config_path, 0)
+        if stamp == self._config_stamp:
+            return
+        self._config = json.loads(Path(config_path).read_text(encoding="utf-8")) if stamp[1] else {}
+        self._config_stamp = stamp
+        self._engines.clear()
+
+    def engine_for(self, project_id: int | None = None, project_name: str | None = None) -> PolicyEngine:
+        with self._lock:
+            self._load()
+            projects = self._config.get("projects", {})
+            project_key = None
+            if project_id is not None and str(project_id) in projects:
+                project_key = str(project_id)
+            elif project_name is not None and project_name in projects:
+                project_key = project_name
+            engine = self._engines.get(project_key)
+            if engine is None:
+                engine = PolicyEngine(_rules_for(self._config, project_key))
+                self._engines[project_key] = engine
+            return engine
+
+
+policy_registry = PolicyRegistry()
+
+
+def validate_command_policy(command: str, project_id: int | None = None, project_name: str | None = None) -> tuple[bool, str]:
+    return policy_registry.engine_for(project_id, project_name).check(command)
 
 
 def evaluate_risk(command: str, network_required: bool) -> str:
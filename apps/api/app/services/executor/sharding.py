@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import configparser
+import heapq
+import json
+import os
+import shlex
+import statistics
+import threading
+import tomllib
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from fnmatch import fnmatch
+from pathlib import Path, PurePosixPath
+
+from app.core.config import settings
+from app.services.search.index import iter_source_files
+
+SHARDED_STEP_TYPE = "sharded_test"
+JUNIT_DIR = ".localops"
+DEFAULT_TEST_SECONDS = 1.0
+NO_TESTS_COLLECTED = 5
+_PYTEST_PREFIXES = (("pytest",), ("python", "-m", "pytest"))
+DEFAULT_PYTHON_FILES = ("test_*.py", "*_test.py")
+_INI_SECTIONS = (("pytest.ini", "pytest"), ("pyproject.toml", None), ("tox.ini", "pytest"), ("setup.cfg", "tool:pytest"))
+
+
+@dataclass(frozen=True)
+class Shard:
+    index: int
+    tests: tuple[str, ...]
+    expected_seconds: float
+
+
+def _durations_path(project_id: int) -> Path:
+    return Path(settings.artifact_root) / "durations" / f"{project_id}.json"
+
+
+_lock = threading.Lock()
+
+
+def load_durations(project_id: int) -> dict[str, float]:
+    try:
+        data = json.loads(_durations_path(project_id).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return {str(path): float(seconds) for path, seconds in data.items()} if isinstance(data, dict) else {}
+
+
+def _testcase_file(case: ET.Element, known: set[str]) -> str | None:
+    file_attr = case.get("file")
+    if file_attr:
+        return PurePosixPath(file_attr).as_posix()
+    parts = (case.get("classname") or "").split(".")
+    for end in range(len(parts), 0, -1):
+        candidate = "/".join(parts[:end]) + ".py"
+        if candidate in known:
+            return candidate
+    return None
+
+
+def junit_durations(junit_paths: list[Path], known: set[str]) -> dict[str, float]:
+    durations: dict[str, float] = {}
+    for junit_path in junit_paths:
+        try:
+            tree = ET.parse(junit_path)
+        except (OSError, ET.ParseError):
+            continue
+        for case in tree.iter("testcase"):
+            test_file = _testcase_file(case, known)
+            if test_file is None:
+                continue
+            try:
+                seconds = float(case.get("time") or 0.0)
+            except ValueError:
+                continue
+            durations[test_file] = durations.get(test_file, 0.0) + seconds
+    return durations
+
+
+def record_durations(project_id: int, durations: dict[str, float]) -> None:
+    if not durations:
+        return
+    target = _durations_path(project_id)
+    with _lock:
+        merged = {**load_durations(project_id), **{path: round(seconds, 3) for path, seconds in durations.items()}}
+        target.parent.mkdir(parents=True, exist_ok=True)
+        pending = target.with_suffix(".json.tmp")
+        pending.write_text(json.dumps(merged, sort_keys=True), encoding="utf-8")
+        os.replace(pending, target)
+
+
+def merge_junit(junit_paths: list[Path], target: Path) -> bool:
+    merged = ET.Element("testsuites")
+    for junit_path in junit_paths:
+        try:
+            root = ET.parse(junit_path).getroot()
+        except (OSError, ET.ParseError):
+            continue
+        merged.extend(root.iter("testsuite") if root.tag == "testsuites" else [root])
+    if not len(merged):
+        return False
+    ET.ElementTree(merged).write(target, encoding="utf-8", xml_declaration=True)
+    return True
+
+
+def split_pytest_command(command: str, root: Path) -> tuple[list[str], list[str]] | None:
+    try:
+        tokens = shlex.split(command)
+    except ValueError:
+        return None
+    prefix = next((list(candidate) for candidate in _PYTEST_PREFIXES if tuple(tokens[: len(candidate)]) == candidate), None)
+    if prefix is None:
+        return None
+    options: list[str] = []
+    paths: list[str] = []
+    for token in tokens[len(prefix) :]:
+        if token in {"&&", "||", "|", ";"} or token.startswith(("-n", "--junitxml")):
+            return None
+        if not token.startswith("-") and (token.endswith(".py") or (root / token).exists()):
+            paths.append(token.removeprefix("./").rstrip("/"))
+        else:
+            options.append(token)
+    return prefix + options, paths
+
+
+def _ini_values(value: str | list[str] | None) -> list[str] | None:
+    if value is None:
+        return None
+    return value.split() if isinstance(value, str) else [str(item) for item in value]
+
+
+def pytest_collection_config(root: Path) -> tuple[list[str], list[str]]:
+    for name, section in _INI_SECTIONS:
+        path = root / name
+        if not path.is_file():
+            continue
+        if section is None:
+            try:
+                options = tomllib.loads(path.read_text(encoding="utf-8"))["tool"]["pytest"]["ini_options"]
+            except (OSError, ValueError, KeyError, TypeError):
+                continue
+        else:
+            parser = configparser.ConfigParser(interpolation=None)
+            try:
+                parser.read(path, encoding="utf-8")
+            except (OSError, configparser.Error):
+                continue
+            if not parser.has_section(section):
+                if name == "pytest.ini":
+                    break
+                continue
+            options = dict(parser.items(section))
+        testpaths = _ini_values(options.get("testpaths")) or []
+        patterns = _ini_values(options.get("python_files")) or list(DEFAULT_PYTHON_FILES)
+        return [path.removeprefix("./").rstrip("/") for path in testpaths], patterns
+    return [], list(DEFAULT_PYTHON_FILES)
+
+
+def discover_tests(root: Path, paths: list[str]) -> list[str]:
+    testpaths, patterns = pytest_collection_config(root)
+    scopes = paths or testpaths
+    tests: list[str] = []
+    for rel_path, _ in iter_source_files(root, settings.search_index_max_file_bytes):
+        if not rel_path.endswith(".py"):
+            continue
+        if rel_path not in paths and not any(fnmatch(PurePosixPath(rel_path).name, pattern) for pattern in patterns):
+            continue
+        if not scopes or any(rel_path == scope or rel_path.startswith(f"{scope}/") for scope in scopes):
+            tests.append(rel_path)
+    return sorted(tests)
+
+
+def shard_count(test_count: int) -> int:
+    return max(1, min(settings.test_shard_max, os.cpu_count() or 1, test_count))
+
+
+def partition(tests: list[str], durations: dict[str, float], shards: int) -> list[Shard]:
+    known = [durations[test] for test in tests if test in durations]
+    fallback = statistics.median(known) if known else DEFAULT_TEST_SECONDS
+    weighted = sorted(((durations.get(test, fallback), test) for test in tests), key=lambda item: (-item[0], item[1]))
+    heap = [(0.0, index) for index in range(shards)]
+    assigned: list[list[str]] = [[] for _ in range(shards)]
+    for seconds, test in weighted:
+        load, index = heapq.heappop(heap)
+        assigned[index].append(test)
+        heapq.heappush(heap, (load + seconds, index))
+    loads = {index: load for load, index in heap}
+    return [
+        Shard(index=index, tests=tuple(sorted(assigned[index])), expected_seconds=round(loads[index], 3))
+        for index in range(shards)
+        if assigned[index]
+    ]
+
+
+def plan_shards(project_id: int, root: Path, command: str) -> tuple[list[str], list[Shard]] | None:
+    parsed = split_pytest_command(command, root)
+    if parsed is None:
+        return None
+    base_args, paths = parsed
+    tests = discover_tests(root, paths)
+    if any(path.endswith(".py") and path not in tests for path in paths):
+        return None
+    count = shard_count(len(tests))
+    if count < 2:
+        return None
+    return base_args, partition(tests, load_durations(project_id), count)
+
+
+def shard_command(base_args: list[str], shard: Shard, junit_path: str) -> str:
+    return shlex.join([*base_args, "-p", "no:cacheprovider", f"--junitxml={junit_path}", *shard.tests])
+
+
+def merge_exit_codes(codes: list[int]) -> int:
+    relevant = [code for code in codes if code != NO_TESTS_COLLECTED]
+    if not relevant:
+        return NO_TESTS_COLLECTED if codes else 0
+    failed = [code for code in relevant if code != 0]
+    return max(failed) if failed else 0
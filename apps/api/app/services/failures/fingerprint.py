@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from collections import Counter
+from collections.abc import Iterable
+
+SIMHASH_BITS = 64
+BAND_BITS = 16
+BAND_COUNT = SIMHASH_BITS // BAND_BITS
+
+_MASKS = (
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b"), "<uuid>"),
+    (re.compile(r"run-\d+-[\w.]+"), "run-<id>-*"),
+    (re.compile(r"(?:/tmp|/var/folders|/private/var)/(?!run-<id>)[^\s'\":,)]+"), "<tmp>"),
+    (re.compile(r"\b0x[0-9a-f]+\b"), "<hex>"),
+    (re.compile(r"\b(?=[0-9a-f]*\d)(?=[0-9a-f]*[a-f])[0-9a-f]{7,}\b"), "<hex>"),
+    (re.compile(r"\d+(?:\.\d+)*"), "<n>"),
+)
+_TOKEN_RE = re.compile(r"<[a-z]+>|[a-z_][\w.]*|[^\w\s]")
+
+
+def normalize_tail(lines: Iterable[str], tail_lines: int) -> list[str]:
+    tail = [line.strip().lower() for line in lines if line.strip()][-tail_lines:]
+    normalized: list[str] = []
+    for line in tail:
+        for pattern, replacement in _MASKS:
+            line = pattern.sub(replacement, line)
+        normalized.append(line)
+    return normalized
+
+
+def _features(lines: list[str]) -> Counter[str]:
+    features: Counter[str] = Counter()
+    for line in lines:
+        tokens = _TOKEN_RE.findall(line)
+        features.update(tokens)
+        features.update(f"{left} {right}" for left, right in zip(tokens, tokens[1:]))
+    return features
+
+
+def simhash(lines: list[str]) -> int:
+    weights = [0] * SIMHASH_BITS
+    for feature, count in _features(lines).items():
+        value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += count if value >> bit & 1 else -count
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def bands(value: int) -> list[int]:
+    mask = (1 << BAND_BITS) - 1
+    return [(value >> (band * BAND_BITS)) & mask for band in range(BAND_COUNT)]
+
+
+def hamming(left: int, right: int) -> int:
+    return ((left ^ right) & ((1 << SIMHASH_BITS) - 1)).bit_count()
+
+
+def to_signed(value: int) -> int:
+    return value - (1 << SIMHASH_BITS) if value >= 1 << (SIMHASH_BITS - 1) else value
+
+
+def to_unsigned(value: int) -> int:
+    return value & ((1 << SIMHASH_BITS) - 1)
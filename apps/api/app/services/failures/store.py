@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+from sqlalchemy import Select, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.failure_fingerprint import FailureFingerprint
+from app.services.failures.fingerprint import bands, hamming, normalize_tail, simhash, to_signed, to_unsigned
+
+EXCERPT_MAX_LINES = 5
+
+
+def candidates_stmt(value: int, exclude_run_id: int | None = None) -> Select[tuple[FailureFingerprint]]:
+    band_values = bands(value)
+    stmt = select(FailureFingerprint).where(
+        or_(
+            FailureFingerprint.band0 == band_values[0],
+            FailureFingerprint.band1 == band_values[1],
+            FailureFingerprint.band2 == band_values[2],
+            FailureFingerprint.band3 == band_values[3],
+        )
+    )
+    if exclude_run_id is not None:
+        stmt = stmt.where(FailureFingerprint.run_id != exclude_run_id)
+    return stmt
+
+
+def near_duplicates(
+    value: int, candidates: Sequence[FailureFingerprint], max_distance: int | None = None
+) -> list[tuple[int, FailureFingerprint]]:
+    limit = settings.failure_similarity_max_distance if max_distance is None else max_distance
+    scored = [(hamming(value, to_unsigned(candidate.simhash)), candidate) for candidate in candidates]
+    matches = [(distance, candidate) for distance, candidate in scored if distance <= limit]
+    matches.sort(key=lambda item: (item[0], -item[1].id))
+    return matches
+
+
+def record_failure(db: Session, run_id: int, project_id: int, step_no: int, lines: Sequence[str]) -> FailureFingerprint | None:
+    normalized = normalize_tail(lines, settings.failure_tail_lines)
+    if not normalized:
+        return None
+    value = simhash(normalized)
+    band_values = bands(value)
+    matches = near_duplicates(value, db.scalars(candidates_stmt(value)).all())
+    fingerprint = FailureFingerprint(
+        run_id=run_id,
+        project_id=project_id,
+        step_no=step_no,
+        simhash=to_signed(value),
+        band0=band_values[0],
+        band1=band_values[1],
+        band2=band_values[2],
+        band3=band_values[3],
+        cluster_id=matches[0][1].cluster_id if matches else None,
+        excerpt="\n".join(normalized[-EXCERPT_MAX_LINES:]),
+    )
+    db.add(fingerprint)
+    db.flush()
+    if fingerprint.cluster_id is None:
+        fingerprint.cluster_id = fingerprint.id
+    return fingerprint
+
+
+def previous_runs_stmt(cluster_id: int, run_id: int) -> Select[tuple[int]]:
+    return select(func.count(func.distinct(FailureFingerprint.run_id))).where(
+        FailureFingerprint.cluster_id == cluster_id, FailureFingerprint.run_id < run_id
+    )
+
+
+def previous_run_counts(db: Session, run_id: int) -> dict[int, int]:
+    counts: dict[int, int] = {}
+    for fingerprint in db.scalars(select(FailureFingerprint).where(FailureFingerprint.run_id == run_id)).all():
+        if fingerprint.cluster_id is not None:
+            counts[fingerprint.step_no] = db.scalar(previous_runs_stmt(fingerprint.cluster_id, run_id)) or 0
+    return counts
+
+
+def clusters_stmt(project_id: int | None, limit: int) -> Select[tuple[int, int, int, object, object]]:
+    stmt = select(
+        FailureFingerprint.cluster_id,
+        func.count(FailureFingerprint.id).label("occurrences"),
+        func.count(func.distinct(FailureFingerprint.run_id)).label("runs"),
+        func.min(FailureFingerprint.created_at).label("first_seen"),
+        func.max(FailureFingerprint.created_at).label("last_seen"),
+    ).where(FailureFingerprint.cluster_id.is_not(None))
+    if project_id is not None:
+        stmt = stmt.where(FailureFingerprint.project_id == project_id)
+    return (
+        stmt.group_by(FailureFingerprint.cluster_id)
+        .order_by(func.count(FailureFingerprint.id).desc(), FailureFingerprint.cluster_id.desc())
+        .limit(limit)
+    )
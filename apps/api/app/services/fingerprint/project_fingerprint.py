@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from app.core.config import settings
+from app.services.search.index import SKIP_DIRS
+
+FINGERPRINT_VERSION = 1
+
+LOCKFILES = {
+    "pnpm-lock.yaml": "pnpm",
+    "yarn.lock": "yarn",
+    "package-lock.json": "npm",
+    "bun.lockb": "bun",
+    "poetry.lock": "poetry",
+    "uv.lock": "uv",
+    "Pipfile.lock": "pipenv",
+    "requirements.txt": "pip",
+    "go.sum": "go",
+    "Cargo.lock": "cargo",
+}
+MANIFESTS = {
+    "package.json": "javascript",
+    "pyproject.toml": "python",
+    "setup.py": "python",
+    "setup.cfg": "python",
+    "requirements.txt": "python",
+    "go.mod": "go",
+    "Cargo.toml": "rust",
+    "pom.xml": "java",
+    "build.gradle": "java",
+}
+EXTENSION_LANGUAGES = {
+    ".py": "python",
+    ".js": "javascript",
+    ".jsx": "javascript",
+    ".mjs": "javascript",
+    ".ts": "typescript",
+    ".tsx": "typescript",
+    ".go": "go",
+    ".rs": "rust",
+    ".java": "java",
+    ".kt": "kotlin",
+    ".rb": "ruby",
+    ".sh": "shell",
+}
+JS_TEST_FRAMEWORKS = ("vitest", "jest", "mocha", "playwright")
+NOTABLE_FILES = {"conftest.py", "pytest.ini", "tox.ini"}
+_PYTEST_RE = re.compile(r"\bpytest\b")
+
+
+def _fingerprint_path(project_id: int) -> Path:
+    return Path(settings.artifact_root) / "fingerprints" / f"{project_id}.json"
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for block in iter(lambda: handle.read(65536), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _scan_dir(root: Path, rel_dir: str) -> list[Any] | None:
+    counts: Counter[str] = Counter()
+    subdirs: list[str] = []
+    notable: list[str] = []
+    directory = root / rel_dir if rel_dir else root
+    try:
+        mtime_ns = directory.stat().st_mtime_ns
+        entries = list(os.scandir(directory))
+    except OSError:
+        return None
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in SKIP_DIRS:
+                    subdirs.append(f"{rel_dir}/{entry.name}" if rel_dir else entry.name)
+            elif entry.is_file(follow_symlinks=False):
+                counts[os.path.splitext(entry.name)[1].lower() or entry.name] += 1
+                if entry.name in NOTABLE_FILES:
+                    notable.append(entry.name)
+        except OSError:
+            continue
+    return [mtime_ns, dict(counts), sorted(subdirs), sorted(notable)]
+
+
+def _walk(root: Path, dirs: dict[str, list[Any]], start: str) -> None:
+    pending = [start]
+    while pending:
+        rel_dir = pending.pop()
+        scanned = _scan_dir(root, rel_dir)
+        if scanned is None:
+            continue
+        dirs[rel_dir] = scanned
+        pending.extend(scanned[2])
+
+
+def _refresh_dirs(root: Path, previous: dict[str, list[Any]]) -> tuple[dict[str, list[Any]], int]:
+    dirs: dict[str, list[Any]] = {}
+    rescanned = 0
+    pending = [""]
+    while pending:
+        rel_dir = pending.pop()
+        cached = previous.get(rel_dir)
+        directory = root / rel_dir if rel_dir else root
+        try:
+            mtime_ns = directory.stat().st_mtime_ns
+        except OSError:
+            continue
+        if cached is None:
+            _walk(root, dirs, rel_dir)
+            rescanned += 1
+            continue
+        if cached[0] != mtime_ns:
+            scanned = _scan_dir(root, rel_dir)
+            if scanned is None:
+                continue
+            cached = scanned
+            rescanned += 1
+        dirs[rel_dir] = cached
+        pending.extend(cached[2])
+    return dirs, rescanned
+
+
+def _root_files(root: Path, previous: dict[str, list[Any]]) -> dict[str, list[Any]]:
+    files: dict[str, list[Any]] = {}
+    for name in sorted(set(LOCKFILES) | set(MANIFESTS)):
+        path = root / name
+        try:
+            file_stat = path.stat()
+        except OSError:
+            continue
+        cached = previous.get(name)
+        if cached is not None and cached[0] == file_stat.st_size and cached[1] == file_stat.st_mtime_ns:
+            files[name] = cached
+        else:
+            files[name] = [file_stat.st_size, file_stat.st_mtime_ns, _sha256(path)]
+    return files
+
+
+def _read_json(path: Path) -> dict[str, Any]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _python_test_framework(root: Path, extensions: Counter[str], dirs: dict[str, list[Any]]) -> str | None:
+    for name in ("pyproject.toml", "setup.cfg", "requirements.txt", "requirements-dev.txt", "tox.ini", "pytest.ini"):
+        try:
+            if _PYTEST_RE.search((root / name).read_text(encoding="utf-8", errors="ignore")):
+                return "pytest"
+        except OSError:
+            continue
+    if any(entry[3] for entry in dirs.values()):
+        return "pytest"
+    if extensions.get(".py") and any(Path(rel_dir).name in {"tests", "test"} for rel_dir in dirs):
+        return "unittest"
+    return None
+
+
+def _describe(root: Path, dirs: dict[str, list[Any]], files: dict[str, list[Any]]) -> dict[str, Any]:
+    extensions: Counter[str] = Counter()
+    for entry in dirs.values():
+        extensions.update(entry[1])
+    language_files: Counter[str] = Counter()
+    for extension, count in extensions.items():
+        if extension in EXTENSION_LANGUAGES:
+            language_files[EXTENSION_LANGUAGES[extension]] += count
+    languages = sorted(set(language_files) | {MANIFESTS[name] for name in files if name in MANIFESTS})
+
+    package_managers = sorted({LOCKFILES[name] for name in files if name in LOCKFILES})
+    package_json = _read_json(root / "package.json") if "package.json" in files else {}
+    scripts = sorted(package_json.get("scripts", {})) if isinstance(package_json.get("scripts"), dict) else []
+    if package_json and not any(manager in package_managers for manager in ("pnpm", "yarn", "npm", "bun")):
+        package_managers.append("npm")
+    if files.keys() & {"pyproject.toml", "setup.py"} and not any(
+        manager in package_managers for manager in ("poetry", "uv", "pipenv", "pip")
+    ):
+        package_managers.append("pip")
+
+    test_frameworks: list[str] = []
+    python_framework = _python_test_framework(root, extensions, dirs) if "python" in languages else None
+    if python_framework:
+        test_frameworks.append(python_framework)
+    js_dependencies = {**package_json.get("dependencies", {}), **package_json.get("devDependencies", {})}
+    test_frameworks.extend(name for name in JS_TEST_FRAMEWORKS if name in js_dependencies)
+
+    lockfiles = {name: files[name][2] for name in sorted(files) if name in LOCKFILES}
+    key_material = {
+        "package_managers": sorted(package_managers),
+        "lockfiles": lockfiles,
+        "manifests": {name: files[name][2] for name in sorted(files) if name in MANIFESTS},
+    }
+    return {
+        "version": FINGERPRINT_VERSION,
+        "key": hashlib.sha256(json.dumps(key_material, sort_keys=True).encode("utf-8")).hexdigest(),
+        "languages": languages,
+        "package_managers": sorted(package_managers),
+        "lockfiles": lockfiles,
+        "test_frameworks": test_frameworks,
+        "scripts": scripts,
+        "file_count": sum(extensions.values()),
+        "language_files": dict(language_files.most_common()),
+        "dir_count": len(dirs),
+    }
+
+
+_lock = threading.Lock()
+_cache: dict[int, dict[str, Any]] = {}
+
+
+def project_fingerprint(project_id: int, root: Path) -> dict[str, Any]:
+    with _lock:
+        state = _cache.get(project_id)
+    if state is None or state.get("root") != str(root) or state.get("version") != FINGERPRINT_VERSION:
+        stored = _read_json(_fingerprint_path(project_id))
+        state = stored if stored.get("root") == str(root) and stored.get("version") == FINGERPRINT_VERSION else {}
+
+    if state:
+        dirs, rescanned = _refresh_dirs(root, state["dirs"])
+    else:
+        dirs = {}
+        _walk(root, dirs, "")
+        rescanned = len(dirs)
+    files = _root_files(root, state.get("files", {}))
+    if state and rescanned == 0 and files == state["files"]:
+        with _lock:
+            _cache[project_id] = state
+        return state["fingerprint"]
+
+    fingerprint = _describe(root, dirs, files)
+    fingerprint["scanned_at"] = datetime.now(timezone.utc).isoformat()
+    fingerprint["rescanned_dirs"] = rescanned
+    state = {"version": FINGERPRINT_VERSION, "root": str(root), "dirs": dirs, "files": files, "fingerprint": fingerprint}
+    target = _fingerprint_path(project_id)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    pending = target.with_suffix(".json.tmp")
+    pending.write_text(json.dumps(state), encoding="utf-8")
+    os.replace(pending, target)
+    with _lock:
+        _cache[project_id] = state
+    return fingerprint
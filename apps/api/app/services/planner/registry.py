@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import json
+import threading
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from string import Template
+from typing import Any
+
+from app.core.config import settings
+
+PLAN_VERSION = "1.0"
+DEFAULT_RULES_PATH = Path(__file__).with_name("rules.json")
+RISK_LEVELS = {"low", "medium", "high"}
+STEP_KEYS = {"id", "type", "title", "commands", "dangerous", "network_required"}
+ADAPT_KINDS = {None, "test", "build"}
+
+
+class AhoCorasick:
+    def __init__(self, patterns: list[str]) -> None:
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[list[int]] = [[]]
+        for pattern_id, pattern in enumerate(patterns):
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(pattern_id)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                candidate = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = candidate if candidate != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def search(self, text: str) -> set[int]:
+        found: set[int] = set()
+        state = 0
+        for char in text:
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            found.update(self._output[state])
+        return found
+
+
+@dataclass(frozen=True)
+class PlanTemplate:
+    name: str
+    adapt: str | None
+    plan: dict[str, Any]
+
+    def render(self, intent: str) -> dict[str, Any]:
+        return {
+            **self.plan,
+            "intent": intent,
+            "assumptions": list(self.plan["assumptions"]),
+            "steps": [{**step, "commands": list(step["commands"])} for step in self.plan["steps"]],
+            "outputs": list(self.plan["outputs"]),
+        }
+
+
+@dataclass(frozen=True)
+class IntentRule:
+    rule_id: str
+    priority: int
+    order: int
+    template: PlanTemplate
+
+
+def _substitute(value: Any, params: dict[str, str], where: str) -> Any:
+    if isinstance(value, str):
+        template = Template(value)
+        missing = set(template.get_identifiers()) - set(params)
+        if missing:
+            raise ValueError(f"{where}: missing parameters {sorted(missing)}")
+        return template.substitute(params)
+    if isinstance(value, list):
+        return [_substitute(item, params, where) for item in value]
+    if isinstance(value, dict):
+        return {key: _substitute(item, params, where) for key, item in value.items()}
+    return value
+
+
+def _validate_template(name: str, template: dict[str, Any]) -> None:
+    if template.get("risk_level") not in RISK_LEVELS:
+        raise ValueError(f"template {name}: risk_level must be one of {sorted(RISK_LEVELS)}")
+    if template.get("adapt") not in ADAPT_KINDS:
+        raise ValueError(f"template {name}: unknown adapt kind {template.get('adapt')!r}")
+    steps = template.get("steps")
+    if not isinstance(steps, list) or not steps:
+        raise ValueError(f"template {name}: steps must be a non-empty list")
+    if template.get("adapt") is not None and len(steps) != 2:
+        raise ValueError(f"template {name}: adapt templates need exactly an inspect and an execute step")
+    for step in steps:
+        if not isinstance(step, dict) or set(step) != STEP_KEYS:
+            raise ValueError(f"template {name}: each step needs exactly {sorted(STEP_KEYS)}")
+        commands = step["commands"]
+        if not isinstance(commands, list) or not all(isinstance(command, str) and command.strip() for command in commands):
+            raise ValueError(f"template {name}: step {step['id']} commands must be non-empty strings")
+
+
+def _compile_template(name: str, template: dict[str, Any], params: dict[str, str], where: str) -> PlanTemplate:
+    rendered = _substitute(template, params, where)
+    plan = {
+        "version": PLAN_VERSION,
+        "intent": "",
+        "risk_level": rendered["risk_level"],
+        "assumptions": rendered.get("assumptions", []),
+        "steps": rendered["steps"],
+        "outputs": rendered.get("outputs", []),
+    }
+    return PlanTemplate(name=name, adapt=template.get("adapt"), plan=plan)
+
+
+class CompiledRules:
+    def __init__(self, config: dict[str, Any]) -> None:
+        templates = config.get("templates", {})
+        for name, template in templates.items():
+            _validate_template(name, template)
+        default_name = config.get("default_template")
+        if default_name not in templates:
+            raise ValueError(f"default_template {default_name!r} is not defined")
+        self.default = _compile_template(default_name, templates[default_name], {}, f"template {default_name}")
+
+        self.rules: list[IntentRule] = []
+        keywords: list[str] = []
+        self._keyword_rules: list[int] = []
+        for order, rule in enumerate(config.get("rules", [])):
+            rule_id = rule["id"]
+            template_name = rule["template"]
+            if template_name not in templates:
+                raise ValueError(f"rule {rule_id}: unknown template {template_name!r}")
+            params = {key: str(value) for key, value in rule.get("params", {}).items()}
+            compiled = _compile_template(template_name, templates[template_name], params, f"rule {rule_id}")
+            self.rules.append(IntentRule(rule_id=rule_id, priority=int(rule.get("priority", 0)), order=order, template=compiled))
+            for keyword in rule.get("keywords", []):
+                keywords.append(keyword.lower())
+                self._keyword_rules.append(len(self.rules) - 1)
+        self._matcher = AhoCorasick(keywords)
+
+    def match(self, intent: str) -> IntentRule | None:
+        matched = {self._keyword_rules[keyword_id] for keyword_id in self._matcher.search(intent.lower())}
+        if not matched:
+            return None
+        best = min(matched, key=lambda index: (-self.rules[index].priority, self.rules[index].order))
+        return self.rules[best]
+
+
+def _load_config(path: Path) -> dict[str, Any]:
+    text = path.read_text(encoding="utf-8")
+    if path.suffix in {".yaml", ".yml"}:
+        try:
+            import yaml
+        except ImportError as exc:
+            raise RuntimeError("PyYAML is required for YAML planner rules") from exc
+        try:
+            config = yaml.safe_load(text)
+        except yaml.YAMLError as exc:
+            raise ValueError(f"invalid planner rules in {path}: {exc}") from exc
+    else:
+        config = json.loads(text)
+    if not isinstance(config, dict):
+        raise ValueError(f"planner rules in {path} must be a mapping")
+    return config
+
+
+class PlannerRegistry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stamp: tuple[str, int] | None = None
+        self._compiled: CompiledRules | None = None
+
+    def rules(self) -> CompiledRules:
+        path = Path(settings.planner_rules_path) if settings.planner_rules_path else DEFAULT_RULES_PATH
+        with self._lock:
+            try:
+                stamp = (str(path), path.stat().st_mtime_ns)
+                if self._compiled is None or stamp != self._stamp:
+                    self._stamp = stamp
+                    self._compiled = CompiledRules(_load_config(path))
+            except (OSError, KeyError, TypeError, ValueError):
+                if self._compiled is None:
+                    raise
+            return self._compiled
+
+
+planner_registry = PlannerRegistry()
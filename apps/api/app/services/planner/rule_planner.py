@@ -1,106 +1,79 @@
 from __future__ import annotations
 
+from collections.abc import Callable
 from typing import Any
 
+from app.core.config import settings
+from app.services.executor.sharding import SHARDED_STEP_TYPE
+from app.services.planner.registry import planner_registry
+from app.services.planner.test_impact import TestSelection
 
-def _test_plan(intent: str) -> dict[str, Any]:
-    return {
-        "version": "1.0",
-        "intent": intent,
-        "risk_level": "low",
-        "assumptions": ["项目测试命令可用"],
-        "steps": [
-            {
-                "id": "s1",
-                "type": "inspect",
-                "title": "检查工作区",
-                "commands": ["git status"],
-                "dangerous": False,
-                "network_required": False,
-            },
-            {
-                "id": "s2",
-                "type": "execute",
-                "title": "运行测试",
-                "commands": ["pytest -q"],
-                "dangerous": False,
-                "network_required": False,
-            },
-        ],
-        "outputs": ["report.md", "audit.json", "diff.patch"],
-    }
 
+def _js_runner(fingerprint: dict[str, Any]) -> str:
+    return "pnpm" if "pnpm" in fingerprint.get("package_managers", []) else "npm"
 
-def _build_plan(intent: str) -> dict[str, Any]:
-    return {
-        "version": "1.0",
-        "intent": intent,
-        "risk_level": "low",
-        "assumptions": ["项目支持构建命令"],
-        "steps": [
-            {
-                "id": "s1",
-                "type": "inspect",
-                "title": "检查依赖",
-                "commands": ["node -v", "pnpm -v"],
-                "dangerous": False,
-                "network_required": False,
-            },
-            {
-                "id": "s2",
-                "type": "execute",
-                "title": "构建项目",
-                "commands": ["pnpm build"],
-                "dangerous": False,
-                "network_required": False,
-            },
-        ],
-        "outputs": ["report.md", "audit.json", "diff.patch"],
-    }
 
+def _test_commands(fingerprint: dict[str, Any], selection: TestSelection | None = None) -> list[str]:
+    commands: list[str] = []
+    frameworks = fingerprint.get("test_frameworks", [])
+    if "pytest" in frameworks:
+        commands.append(selection.command() if selection is not None else "pytest -q")
+    elif "unittest" in frameworks:
+        commands.append("python -m unittest discover")
+    if "test" in fingerprint.get("scripts", []):
+        commands.append(f"{_js_runner(fingerprint)} test")
+    return commands
 
-def _search_log_plan(intent: str) -> dict[str, Any]:
-    return {
-        "version": "1.0",
-        "intent": intent,
-        "risk_level": "low",
-        "assumptions": ["日志文件可读"],
-        "steps": [
-            {
-                "id": "s1",
-                "type": "inspect",
-                "title": "搜索错误日志",
-                "commands": ["rg -n \"error|exception|traceback\" ."],
-                "dangerous": False,
-                "network_required": False,
-            }
-        ],
-        "outputs": ["report.md", "audit.json", "diff.patch"],
-    }
 
+def _build_commands(fingerprint: dict[str, Any]) -> list[str]:
+    if "build" in fingerprint.get("scripts", []):
+        runner = _js_runner(fingerprint)
+        return [f"{runner} build" if runner == "pnpm" else "npm run build"]
+    if "python" in fingerprint.get("languages", []):
+        return ["python -m compileall -q ."]
+    return []
 
-def generate_plan(intent: str) -> dict[str, Any]:
-    lowered_intent = intent.lower()
-    if "单测" in intent or "测试" in intent or "test" in lowered_intent:
-        return _test_plan(intent)
-    if "构建" in intent or "build" in lowered_intent:
-        return _build_plan(intent)
-    if "日志" in intent or "error" in lowered_intent or "错误" in intent:
-        return _search_log_plan(intent)
-    return {
-        "version": "1.0",
-        "intent": intent,
-        "risk_level": "medium",
-        "assumptions": ["按最小风险执行"],
-        "steps": [
-            {
-                "id": "s1",
-                "type": "inspect",
-                "title": "检查目录结构",
-                "commands": ["rg -n \"TODO|FIXME\" ."],
-                "dangerous": False,
-                "network_required": False,
-            }
-        ],
-        "outputs": ["report.md", "audit.json", "diff.patch"],
-    }
+
+def _inspect_commands(fingerprint: dict[str, Any]) -> list[str]:
+    commands = ["git status"]
+    if "javascript" in fingerprint.get("languages", []) or "typescript" in fingerprint.get("languages", []):
+        commands.extend(["node -v", f"{_js_runner(fingerprint)} -v"])
+    if "python" in fingerprint.get("languages", []):
+        commands.append("python --version")
+    return commands
+
+
+def _apply_fingerprint(plan: dict[str, Any], commands: list[str], fingerprint: dict[str, Any]) -> dict[str, Any]:
+    plan["project_fingerprint"] = fingerprint.get("key")
+    inspect_step, execute_step = plan["steps"]
+    inspect_step["commands"] = _inspect_commands(fingerprint)
+    detected = ", ".join(fingerprint.get("languages", [])) or "unknown"
+    if commands:
+        execute_step["commands"] = commands
+        plan["assumptions"] = [f"按项目指纹生成命令（语言: {detected}）"]
+    else:
+        plan["steps"] = [inspect_step]
+        plan["assumptions"] = [f"未检测到可用命令（语言: {detected}），仅执行检查"]
+    return plan
+
+
+def generate_plan(
+    intent: str,
+    fingerprint: dict[str, Any] | None = None,
+    select_tests: Callable[[], TestSelection] | None = None,
+) -> dict[str, Any]:
+    rules = planner_registry.rules()
+    rule = rules.match(intent)
+    template = rule.template if rule is not None else rules.default
+    plan = template.render(intent)
+    if fingerprint is None or template.adapt is None:
+        return plan
+    if template.adapt == "build":
+        return _apply_fingerprint(plan, _build_commands(fingerprint), fingerprint)
+    selection = select_tests() if select_tests is not None and "pytest" in fingerprint.get("test_frameworks", []) else None
+    plan = _apply_fingerprint(plan, _test_commands(fingerprint, selection), fingerprint)
+    if selection is not None:
+        plan["test_impact"] = selection.summary()
+        if selection.full_suite and settings.test_shard_max > 1 and len(plan["steps"]) > 1:
+            plan["steps"][1]["type"] = SHARDED_STEP_TYPE
+    return plan
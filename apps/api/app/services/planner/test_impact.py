@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import ast
+import hashlib
+import json
+import os
+import shlex
+import subprocess
+import threading
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import Any
+
+from app.core.config import settings
+from app.services.search.index import iter_source_files
+
+GRAPH_VERSION = 1
+FULL_SUITE_FILES = {
+    "conftest.py",
+    "pyproject.toml",
+    "setup.cfg",
+    "setup.py",
+    "pytest.ini",
+    "tox.ini",
+    "requirements.txt",
+    "requirements-dev.txt",
+}
+IGNORED_SUFFIXES = {".md", ".rst"}
+GIT_TIMEOUT_SECONDS = 10
+
+
+@dataclass(frozen=True)
+class TestSelection:
+    __test__ = False
+
+    full_suite: bool
+    reason: str
+    tests: tuple[str, ...] = ()
+    changed_files: tuple[str, ...] = ()
+
+    def command(self) -> str:
+        if self.full_suite:
+            return "pytest -q"
+        return "pytest -q " + " ".join(shlex.quote(test) for test in self.tests)
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "full_suite": self.full_suite,
+            "reason": self.reason,
+            "changed_files": len(self.changed_files),
+            "selected_tests": len(self.tests),
+        }
+
+
+def is_test_module(rel_path: str) -> bool:
+    path = PurePosixPath(rel_path)
+    if path.suffix != ".py":
+        return False
+    return path.name.startswith("test_") or path.stem.endswith("_test")
+
+
+def _module_names(rel_path: str) -> list[str]:
+    path = PurePosixPath(rel_path)
+    parts = list(path.with_suffix("").parts)
+    if parts and parts[-1] == "__init__":
+        parts = parts[:-1]
+    return [".".join(parts[index:]) for index in range(len(parts)) if parts[index:]]
+
+
+def parse_imports(rel_path: str, source: bytes) -> list[str]:
+    try:
+        tree = ast.parse(source, filename=rel_path)
+    except (SyntaxError, ValueError):
+        return []
+    package = list(PurePosixPath(rel_path).parent.parts)
+    imports: set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base_parts = package[: len(package) - (node.level - 1)]
+                base = ".".join(base_parts + ([node.module] if node.module else []))
+            else:
+                base = node.module or ""
+            if base:
+                imports.add(base)
+            imports.update(f"{base}.{alias.name}" if base else alias.name for alias in node.names if alias.name != "*")
+    return sorted(imports)
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _graph_path(project_id: int) -> Path:
+    return Path(settings.artifact_root) / "impact" / f"{project_id}.json"
+
+
+_lock = threading.Lock()
+_graphs: dict[int, dict[str, Any]] = {}
+
+
+def refresh_import_graph(project_id: int, root: Path) -> dict[str, list[Any]]:
+    with _lock:
+        state = _graphs.get(project_id)
+    if state is None or state.get("root") != str(root):
+        try:
+            state = json.loads(_graph_path(project_id).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            state = {}
+        if state.get("root") != str(root) or state.get("version") != GRAPH_VERSION:
+            state = {}
+    previous: dict[str, list[Any]] = state.get("files", {})
+
+    files: dict[str, list[Any]] = {}
+    changed = False
+    for rel_path, file_stat in iter_source_files(root, settings.search_index_max_file_bytes):
+        if not rel_path.endswith(".py"):
+            continue
+        cached = previous.get(rel_path)
+        if cached is not None and cached[1] == file_stat.st_size and cached[2] == file_stat.st_mtime_ns:
+            files[rel_path] = cached
+            continue
+        try:
+            data = (root / rel_path).read_bytes()
+        except OSError:
+            continue
+        digest = _sha256(data)
+        if cached is not None and cached[0] == digest:
+            files[rel_path] = [digest, file_stat.st_size, file_stat.st_mtime_ns, cached[3]]
+        else:
+            files[rel_path] = [digest, file_stat.st_size, file_stat.st_mtime_ns, parse_imports(rel_path, data)]
+        changed = True
+    changed = changed or files.keys() != previous.keys()
+
+    state = {"version": GRAPH_VERSION, "root": str(root), "files": files}
+    if changed:
+        target = _graph_path(project_id)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        pending = target.with_suffix(".json.tmp")
+        pending.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(pending, target)
+    with _lock:
+        _graphs[project_id] = state
+    return files
+
+
+def reverse_dependencies(files: dict[str, list[Any]], removed: list[str] | None = None) -> dict[str, set[str]]:
+    by_module: dict[str, set[str]] = {}
+    for rel_path in [*files, *(removed or [])]:
+        for name in _module_names(rel_path):
+            by_module.setdefault(name, set()).add(rel_path)
+    importers: dict[str, set[str]] = {}
+    for rel_path, entry in files.items():
+        for name in entry[3]:
+            for target in by_module.get(name, ()):
+                if target != rel_path:
+                    importers.setdefault(target, set()).add(rel_path)
+    return importers
+
+
+def affected_tests(files: dict[str, list[Any]], changed: list[str]) -> list[str]:
+    importers = reverse_dependencies(files, [path for path in changed if path not in files])
+    seen = set(changed)
+    queue = deque(changed)
+    while queue:
+        current = queue.popleft()
+        for importer in importers.get(current, ()):
+            if importer not in seen:
+                seen.add(importer)
+                queue.append(importer)
+    fixture_dirs = [PurePosixPath(path).parent for path in seen if PurePosixPath(path).name == "conftest.py"]
+    selected = {path for path in seen if path in files and is_test_module(path)}
+    for directory in fixture_dirs:
+        selected.update(
+            path for path in files if is_test_module(path) and directory in PurePosixPath(path).parents
+        )
+    return sorted(selected)
+
+
+def _git(root: Path, *args: str) -> list[str] | None:
+    try:
+        completed = subprocess.run(
+            ["git", "-C", str(root), *args],
+            capture_output=True,
+            text=True,
+            check=False,
+            timeout=GIT_TIMEOUT_SECONDS,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if completed.returncode != 0:
+        return None
+    return [line.strip() for line in completed.stdout.splitlines() if line.strip()]
+
+
+def git_head(root: Path) -> str | None:
+    output = _git(root, "rev-parse", "HEAD")
+    return output[0] if output else None
+
+
+def changed_since(root: Path, base_ref: str) -> list[str] | None:
+    diff = _git(root, "diff", "--relative", "--name-only", base_ref, "--")
+    untracked = _git(root, "ls-files", "--others", "--exclude-standard")
+    if diff is None or untracked is None:
+        return None
+    return sorted(set(diff) | set(untracked))
+
+
+def select_tests(project_id: int, root: Path, changed_files: list[str] | None) -> TestSelection:
+    if changed_files is None:
+        return TestSelection(full_suite=True, reason="no change set available")
+    changed = tuple(sorted({PurePosixPath(path).as_posix().removeprefix("./") for path in changed_files}))
+    relevant = [path for path in changed if PurePosixPath(path).suffix not in IGNORED_SUFFIXES]
+    if not relevant:
+        return TestSelection(full_suite=True, reason="no code changes", changed_files=changed)
+    for path in relevant:
+        if PurePosixPath(path).name in FULL_SUITE_FILES:
+            return TestSelection(full_suite=True, reason=f"{path} affects the whole suite", changed_files=changed)
+        if not path.endswith(".py"):
+            return TestSelection(full_suite=True, reason=f"non-Python change {path}", changed_files=changed)
+
+    files = refresh_import_graph(project_id, root)
+    tests = affected_tests(files, relevant)
+    if not tests:
+        return TestSelection(full_suite=True, reason="no affected test modules found", changed_files=changed)
+    total_tests = sum(1 for path in files if is_test_module(path))
+    if len(tests) > settings.test_impact_max_selected or len(tests) == total_tests:
+        return TestSelection(full_suite=True, reason="change affects most of the suite", changed_files=changed)
+    return TestSelection(full_suite=False, reason="import graph", tests=tuple(tests), changed_files=changed)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from app.core.config import settings
+
+ARCHIVE_SEP = "!"
+INDEX_MEMBER = "index.json"
+RUN_DIRS = ("logs", "reports", "artifacts")
+RUNS_PER_BUCKET = 1000
+
+
+@dataclass
+class PackedRun:
+    archive: Path
+    refs: dict[str, str] = field(default_factory=dict)
+    packed_bytes: int = 0
+    archive_bytes: int = 0
+
+
+def data_root() -> Path:
+    return Path(settings.artifact_root)
+
+
+def archive_root() -> Path:
+    return data_root() / "archive"
+
+
+def archive_path(run_id: int) -> Path:
+    return archive_root() / f"{run_id // RUNS_PER_BUCKET:05d}" / f"run-{run_id}.zip"
+
+
+def run_sources(run_id: int) -> list[tuple[str, Path]]:
+    sources: list[tuple[str, Path]] = []
+    for name in RUN_DIRS:
+        run_dir = data_root() / name / str(run_id)
+        if not run_dir.is_dir():
+            continue
+        for path in sorted(run_dir.rglob("*")):
+            if path.is_file():
+                sources.append((f"{name}/{path.relative_to(run_dir).as_posix()}", path))
+    return sources
+
+
+def has_sources(run_id: int) -> bool:
+    return any((data_root() / name / str(run_id)).is_dir() for name in RUN_DIRS)
+
+
+def pack_run(run_id: int) -> PackedRun:
+    target = archive_path(run_id)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    sources = run_sources(run_id)
+    packed = PackedRun(archive=target)
+    new_members = {member for member, _ in sources}
+    pending = target.with_suffix(".zip.tmp")
+    with zipfile.ZipFile(pending, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+        index: dict[str, int] = {}
+        if target.exists():
+            with zipfile.ZipFile(target) as previous:
+                for info in previous.infolist():
+                    if info.filename == INDEX_MEMBER or info.filename in new_members:
+                        continue
+                    archive.writestr(info, previous.read(info))
+                    index[info.filename] = info.file_size
+        for member, path in sources:
+            archive.write(path, member)
+            size = path.stat().st_size
+            index[member] = size
+            packed.packed_bytes += size
+            packed.refs[str(path)] = f"{target}{ARCHIVE_SEP}{member}"
+        archive.writestr(INDEX_MEMBER, json.dumps({"run_id": run_id, "members": index}, sort_keys=True))
+    os.replace(pending, target)
+    packed.archive_bytes = target.stat().st_size
+    return packed
+
+
+def remove_sources(run_id: int) -> None:
+    for name in RUN_DIRS:
+        shutil.rmtree(data_root() / name / str(run_id), ignore_errors=True)
+
+
+def is_archive_ref(ref: str) -> bool:
+    return ARCHIVE_SEP in ref and ref.split(ARCHIVE_SEP, 1)[0].endswith(".zip")
+
+
+def read_archived(ref: str) -> bytes:
+    archive, member = ref.split(ARCHIVE_SEP, 1)
+    try:
+        with zipfile.ZipFile(archive) as handle:
+            return handle.read(member)
+    except (KeyError, zipfile.BadZipFile) as exc:
+        raise FileNotFoundError(ref) from exc
+
+
+def archived_ref_for(path: Path) -> str | None:
+    try:
+        relative = path.resolve().relative_to(data_root().resolve())
+    except ValueError:
+        return None
+    if len(relative.parts) < 3 or relative.parts[0] not in RUN_DIRS or not relative.parts[1].isdigit():
+        return None
+    member = "/".join((relative.parts[0], *relative.parts[2:]))
+    return f"{archive_path(int(relative.parts[1]))}{ARCHIVE_SEP}{member}"
+
+
+def read_log(ref: str) -> bytes:
+    if is_archive_ref(ref):
+        return read_archived(ref)
+    path = Path(ref)
+    try:
+        return path.read_bytes()
+    except FileNotFoundError:
+        archived = archived_ref_for(path)
+        if archived is None:
+            raise
+        return read_archived(archived)
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import shutil
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import Select, and_, delete, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.artifact import Artifact
+from app.db.models.audit import Audit
+from app.db.models.run import Run
+from app.db.models.run_step import RunStep
+from app.services.artifacts.store import BLOB_PREFIX, artifact_store, is_blob_ref
+from app.services.artifacts.uploads import gc_uploads
+from app.services.executor.checkpoints import checkpoints_root
+from app.services.retention.archive import (
+    ARCHIVE_SEP,
+    archive_root,
+    data_root,
+    has_sources,
+    pack_run,
+    remove_sources,
+)
+from app.state.machine import RunStatus
+
+TERMINAL_STATUSES = (RunStatus.SUCCEEDED.value, RunStatus.FAILED.value, RunStatus.CANCELLED.value)
+BUDGET_DIRS = ("logs", "reports", "artifacts", "archive", "blobs")
+BLOB_GRACE_SECONDS = 3600
+
+
+def expired_runs_stmt(now: datetime) -> Select:
+    ended_at = func.coalesce(Run.finished_at, Run.created_at)
+    ranked = (
+        select(
+            Run.id.label("id"),
+            Run.status.label("status"),
+            ended_at.label("ended_at"),
+            func.row_number().over(partition_by=Run.project_id, order_by=Run.id.desc()).label("rank"),
+        )
+        .where(Run.status.in_(TERMINAL_STATUSES))
+        .subquery()
+    )
+    cutoff = now - timedelta(days=settings.retention_archive_after_days)
+    failed_cutoff = now - timedelta(days=settings.retention_failed_archive_after_days)
+    return (
+        select(ranked.c.id)
+        .where(
+            or_(
+                ranked.c.rank > settings.retention_keep_runs_per_project,
+                and_(ranked.c.status == RunStatus.FAILED.value, ranked.c.ended_at < failed_cutoff),
+                and_(ranked.c.status != RunStatus.FAILED.value, ranked.c.ended_at < cutoff),
+            )
+        )
+        .order_by(ranked.c.id)
+    )
+
+
+def _tree_bytes(root: Path) -> int:
+    total = 0
+    for path in root.rglob("*"):
+        try:
+            if path.is_file():
+                total += path.stat().st_size
+        except OSError:
+            continue
+    return total
+
+
+def stored_bytes() -> int:
+    return sum(_tree_bytes(data_root() / name) for name in BUDGET_DIRS if (data_root() / name).is_dir())
+
+
+def archive_run(db: Session, run: Run) -> int:
+    packed = pack_run(run.id)
+    for step in db.scalars(select(RunStep).where(RunStep.run_id == run.id)).all():
+        step.stdout_path = packed.refs.get(step.stdout_path or "", step.stdout_path)
+        step.stderr_path = packed.refs.get(step.stderr_path or "", step.stderr_path)
+    for artifact in db.scalars(select(Artifact).where(Artifact.run_id == run.id)).all():
+        artifact.path = packed.refs.get(artifact.path, artifact.path)
+    run.sandbox_meta = {**(run.sandbox_meta or {}), "archive": str(packed.archive)}
+    db.add(
+        Audit(
+            run_id=run.id,
+            actor="retention",
+            action="run.archived",
+            payload_json={"archive": str(packed.archive), "files": len(packed.refs), "bytes": packed.packed_bytes},
+        )
+    )
+    db.commit()
+    remove_sources(run.id)
+    shutil.rmtree(checkpoints_root() / str(run.id), ignore_errors=True)
+    return packed.packed_bytes - packed.archive_bytes
+
+
+def purge_archive(db: Session, run_id: int, archive: Path) -> int:
+    size = archive.stat().st_size
+    prefix = f"{archive}{ARCHIVE_SEP}"
+    for step in db.scalars(select(RunStep).where(RunStep.run_id == run_id)).all():
+        if step.stdout_path and (step.stdout_path.startswith(prefix) or is_blob_ref(step.stdout_path)):
+            step.stdout_path = None
+        if step.stderr_path and (step.stderr_path.startswith(prefix) or is_blob_ref(step.stderr_path)):
+            step.stderr_path = None
+    db.execute(delete(Artifact).where(Artifact.run_id == run_id))
+    db.add(Audit(run_id=run_id, actor="retention", action="run.purged", payload_json={"archive": str(archive), "bytes": size}))
+    db.commit()
+    archive.unlink(missing_ok=True)
+    return size
+
+
+def collect_blobs(db: Session, now: float) -> tuple[int, int]:
+    store = artifact_store()
+    if not store.root.is_dir():
+        return 0, 0
+    referenced = {
+        path.removeprefix(BLOB_PREFIX)
+        for path in db.scalars(select(Artifact.path).where(Artifact.path.startswith(BLOB_PREFIX))).all()
+    }
+    for column in (RunStep.stdout_path, RunStep.stderr_path):
+        referenced.update(
+            path.removeprefix(BLOB_PREFIX) for path in db.scalars(select(column).where(column.startswith(BLOB_PREFIX))).all()
+        )
+    removed = 0
+    reclaimed = 0
+    for blob in store.root.glob("??/*.gz"):
+        sha256 = blob.parent.name + blob.name.removesuffix(".gz")
+        if sha256 in referenced:
+            continue
+        try:
+            blob_stat = blob.stat()
+        except OSError:
+            continue
+        if now - blob_stat.st_mtime < BLOB_GRACE_SECONDS:
+            continue
+        blob.unlink(missing_ok=True)
+        removed += 1
+        reclaimed += blob_stat.st_size
+    return removed, reclaimed
+
+
+def _archives_oldest_first() -> list[tuple[int, Path]]:
+    archives: list[tuple[int, Path]] = []
+    for archive in archive_root().glob("*/run-*.zip") if archive_root().is_dir() else []:
+        run_id = archive.stem.removeprefix("run-")
+        if run_id.isdigit():
+            archives.append((int(run_id), archive))
+    return sorted(archives)
+
+
+def apply_retention(db: Session, now: datetime | None = None) -> dict[str, Any]:
+    now = now or datetime.now(timezone.utc)
+    report: dict[str, Any] = {"archived_runs": 0, "purged_runs": 0, "deleted_blobs": 0, "reclaimed_bytes": 0}
+    before = stored_bytes()
+
+    archived = 0
+    for run_id in db.scalars(expired_runs_stmt(now)).all():
+        if archived >= settings.retention_batch_size:
+            break
+        if not has_sources(run_id):
+            continue
+        run = db.get(Run, run_id)
+        if run is None:
+            continue
+        archive_run(db, run)
+        archived += 1
+    report["archived_runs"] = archived
+
+    total = stored_bytes()
+    if total > settings.retention_budget_bytes:
+        expired = set(db.scalars(expired_runs_stmt(now)).all())
+        for run_id, archive in _archives_oldest_first():
+            if total <= settings.retention_budget_bytes:
+                break
+            if run_id not in expired:
+                continue
+            total -= purge_archive(db, run_id, archive)
+            report["purged_runs"] += 1
+
+    report["deleted_blobs"], _ = collect_blobs(db, time.time())
+    report["expired_uploads"] = gc_uploads(time.time(), settings.upload_session_ttl_seconds)
+    report["total_bytes"] = stored_bytes()
+    report["reclaimed_bytes"] = max(0, before - report["total_bytes"])
+    return report
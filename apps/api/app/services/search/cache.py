@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+import redis
+
+from app.core.config import settings
+from app.core.metrics import search_cache_bytes, search_cache_requests_total
+from app.services.search.index import current_generation_name, index_dir_for
+from app.services.search.vector import tokenize
+
+UNINDEXED_STAMP = "live"
+
+
+def normalize_query(query: str, mode: str) -> str:
+    if mode == "keyword":
+        return query
+    return " ".join(tokenize(query))
+
+
+def cache_key(project_id: int, mode: str, query: str, top_k: int, stamp: str) -> str:
+    digest = hashlib.sha256(normalize_query(query, mode).encode("utf-8")).hexdigest()
+    return f"search:{project_id}:{stamp}:{mode}:{top_k}:{digest}"
+
+
+class GenerationStamps:
+    def __init__(self, ttl_seconds: float) -> None:
+        self._ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._stamps: dict[int, tuple[str, float]] = {}
+
+    def get(self, project_id: int) -> str:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._stamps.get(project_id)
+            if cached is not None and cached[1] > now:
+                return cached[0]
+        stamp = current_generation_name(index_dir_for(project_id)) or UNINDEXED_STAMP
+        with self._lock:
+            self._stamps[project_id] = (stamp, now + self._ttl)
+        return stamp
+
+    def invalidate(self, project_id: int) -> None:
+        with self._lock:
+            self._stamps.pop(project_id, None)
+
+
+class LruBytesCache:
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[bytes, float | None]] = OrderedDict()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: bytes, ttl_seconds: float | None = None) -> None:
+        if len(value) > self.max_bytes:
+            return
+        expires_at = None if ttl_seconds is None else time.monotonic() + ttl_seconds
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, expires_at)
+            self.size_bytes += len(value)
+            while self.size_bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def _drop(self, key: str) -> None:
+        value, _ = self._entries.pop(key)
+        self.size_bytes -= len(value)
+
+
+class SearchCache:
+    def __init__(self, max_bytes: int, redis_url: str | None = None, redis_ttl_seconds: int = 3600) -> None:
+        self.local = LruBytesCache(max_bytes)
+        self._redis = redis.Redis.from_url(redis_url) if redis_url else None
+        self._redis_ttl = redis_ttl_seconds
+
+    def get(self, key: str) -> list[dict[str, Any]] | None:
+        value = self.local.get(key)
+        if value is not None:
+            search_cache_requests_total.labels(layer="local", result="hit").inc()
+            return json.loads(value)
+        search_cache_requests_total.labels(layer="local", result="miss").inc()
+        if self._redis is None:
+            return None
+        try:
+            value, ttl_ms = self._redis.pipeline(transaction=False).get(key).pttl(key).execute()
+        except redis.RedisError:
+            search_cache_requests_total.labels(layer="redis", result="error").inc()
+            return None
+        if value is None:
+            search_cache_requests_total.labels(layer="redis", result="miss").inc()
+            return None
+        search_cache_requests_total.labels(layer="redis", result="hit").inc()
+        self.local.put(key, value, ttl_ms / 1000 if ttl_ms > 0 else None)
+        search_cache_bytes.set(self.local.size_bytes)
+        return json.loads(value)
+
+    def put(self, key: str, results: list[dict[str, Any]], ttl_seconds: float | None = None) -> None:
+        value = json.dumps(results, separators=(",", ":")).encode("utf-8")
+        self.local.put(key, value, ttl_seconds)
+        search_cache_bytes.set(self.local.size_bytes)
+        if self._redis is None:
+            return
+        try:
+            self._redis.set(key, value, ex=max(1, int(ttl_seconds or self._redis_ttl)))
+        except redis.RedisError:
+            search_cache_requests_total.labels(layer="redis", result="error").inc()
+
+
+search_cache = SearchCache(
+    settings.search_cache_max_bytes,
+    settings.search_cache_redis_url or None,
+    settings.search_cache_redis_ttl_seconds,
+)
+generation_stamps = GenerationStamps(settings.search_cache_stamp_ttl_seconds)
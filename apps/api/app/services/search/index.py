@@ -0,0 +1,653 @@
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import stat
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from itertools import islice
+from pathlib import Path, PurePath
+from typing import Any
+
+from app.core.config import settings
+from app.services.search.vector import ChunkTableBuilder, SegmentedVectors, VectorSegment, VectorStore, tokenize
+
+SKIP_DIRS = {
+    ".git",
+    ".hg",
+    ".svn",
+    ".venv",
+    "venv",
+    "node_modules",
+    "__pycache__",
+    ".mypy_cache",
+    ".pytest_cache",
+    ".ruff_cache",
+    ".next",
+}
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = ".lock"
+META_FILE = "meta.json"
+FILES_FILE = "files.json"
+TRIGRAM_KEYS_FILE = "trigram_keys.bin"
+TRIGRAM_SLOTS_FILE = "trigram_slots.bin"
+POSTINGS_FILE = "postings.bin"
+LINES_FILE = "lines.bin"
+SEGMENTS_FILE = "segments.json"
+
+
+@dataclass(frozen=True)
+class IndexedFile:
+    path: str
+    size: int
+    mtime_ns: int
+    line_start: int
+    line_count: int
+    sha256: str = ""
+
+
+@dataclass(frozen=True)
+class IndexHit:
+    path: str
+    line_no: int
+    snippet: str
+    match_count: int = 1
+
+
+@dataclass(frozen=True)
+class ChunkHit:
+    path: str
+    start_line: int
+    end_line: int
+    snippet: str
+    score: float
+
+
+def index_dir_for(project_id: int) -> Path:
+    return Path(settings.artifact_root) / "index" / str(project_id)
+
+
+def excluded_dirs(root: Path, index_dir: Path) -> set[str]:
+    resolved_root = root.resolve()
+    excluded: set[str] = set()
+    for path in (Path(settings.artifact_root), index_dir):
+        try:
+            excluded.add(path.resolve().relative_to(resolved_root).as_posix())
+        except ValueError:
+            continue
+    excluded.discard(".")
+    return excluded
+
+
+def is_excluded(relative: PurePath, excluded: set[str]) -> bool:
+    return any(PurePath(*relative.parts[:depth]).as_posix() in excluded for depth in range(1, len(relative.parts) + 1))
+
+
+def iter_source_files(
+    root: Path, max_bytes: int, excluded: set[str] | None = None
+) -> Iterator[tuple[str, os.stat_result]]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        base = Path(dirpath)
+        dirnames[:] = sorted(
+            name
+            for name in dirnames
+            if name not in SKIP_DIRS and not (excluded and (base / name).relative_to(root).as_posix() in excluded)
+        )
+        for name in sorted(filenames):
+            full_path = base / name
+            try:
+                file_stat = full_path.stat()
+            except OSError:
+                continue
+            if not stat.S_ISREG(file_stat.st_mode) or file_stat.st_size > max_bytes:
+                continue
+            yield full_path.relative_to(root).as_posix(), file_stat
+
+
+def is_binary(data: bytes) -> bool:
+    return b"\0" in data[:8192]
+
+
+def line_offsets(data: bytes) -> array:
+    offsets = array("I", [0])
+    position = data.find(b"\n")
+    while position != -1:
+        offsets.append(position + 1)
+        position = data.find(b"\n", position + 1)
+    if len(offsets) > 1 and offsets[-1] == len(data):
+        offsets.pop()
+    return offsets
+
+
+def trigram_keys(data: bytes) -> set[int]:
+    lowered = data.lower()
+    grams = {lowered[i : i + 3] for i in range(len(lowered) - 2)}
+    return {int.from_bytes(gram, "big") for gram in grams}
+
+
+class TrigramCollector:
+    def __init__(self) -> None:
+        self.keys: set[int] = set()
+        self._tail = b""
+
+    def update(self, data: bytes) -> None:
+        window = self._tail + data
+        self.keys.update(trigram_keys(window))
+        self._tail = window[-2:]
+
+
+def current_generation_name(index_dir: Path) -> str | None:
+    try:
+        name = (index_dir / CURRENT_FILE).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    return name or None
+
+
+def _generation_number(name: str | None) -> int:
+    if not name:
+        return 0
+    return int(name.rsplit("-", 1)[-1])
+
+
+@contextmanager
+def locked(index_dir: Path) -> Iterator[None]:
+    index_dir.mkdir(parents=True, exist_ok=True)
+    with (index_dir / LOCK_FILE).open("a") as handle:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def write_array(path: Path, values: array) -> None:
+    with path.open("wb") as handle:
+        values.tofile(handle)
+
+
+def _publish(index_dir: Path, generation_name: str) -> None:
+    pointer = index_dir / f"{CURRENT_FILE}.tmp"
+    pointer.write_text(generation_name, encoding="utf-8")
+    os.replace(pointer, index_dir / CURRENT_FILE)
+
+
+def _read_segments(generation_dir: Path) -> list[dict[str, Any]]:
+    try:
+        return json.loads((generation_dir / SEGMENTS_FILE).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return [{"name": generation_dir.name, "deleted": []}]
+
+
+def _gc_generations(index_dir: Path, keep: int) -> None:
+    generations = sorted(path for path in index_dir.glob("gen-*") if path.is_dir())
+    kept = generations[max(0, len(generations) - keep) :]
+    referenced = {entry["name"] for generation_dir in kept for entry in _read_segments(generation_dir)}
+    for stale in generations:
+        if stale not in kept and stale.name not in referenced:
+            shutil.rmtree(stale, ignore_errors=True)
+
+
+class _GenerationBuilder:
+    def __init__(self) -> None:
+        self.files: list[list[Any]] = []
+        self.lines = array("I")
+        self.postings: dict[int, list[int]] = {}
+        self.chunks = ChunkTableBuilder(settings.search_chunk_lines)
+
+    def add_file(self, rel_path: str, file_stat: os.stat_result, data: bytes, digest: str) -> int:
+        file_id = len(self.files)
+        offsets = line_offsets(data)
+        self.files.append([rel_path, file_stat.st_size, file_stat.st_mtime_ns, len(self.lines), len(offsets), digest])
+        self.lines.extend(offsets)
+        for key in trigram_keys(data):
+            self.postings.setdefault(key, []).append(file_id)
+        self.chunks.add_file(file_id, data)
+        return file_id
+
+    def carry_segment(self, segment: SegmentReader, deleted: frozenset[int]) -> None:
+        remap = array("i", [-1]) * len(segment.files)
+        for old_id, indexed in enumerate(segment.files):
+            if old_id in deleted:
+                continue
+            remap[old_id] = len(self.files)
+            self.files.append(
+                [indexed.path, indexed.size, indexed.mtime_ns, len(self.lines), indexed.line_count, indexed.sha256]
+            )
+            self.lines.extend(segment.line_starts(old_id))
+            if segment.vectors is not None:
+                self.chunks.carry(segment.vectors, old_id, remap[old_id])
+        for key, old_ids in segment.iter_postings():
+            new_ids = [remap[old_id] for old_id in old_ids if remap[old_id] >= 0]
+            if new_ids:
+                self.postings.setdefault(key, []).extend(new_ids)
+
+    def write(
+        self,
+        index_dir: Path,
+        generation: int,
+        root: Path,
+        started: float,
+        extra: dict[str, Any],
+        prior: SegmentedVectors | None = None,
+        prior_segments: list[dict[str, Any]] | None = None,
+    ) -> dict[str, Any]:
+        generation_name = f"gen-{generation:06d}"
+        staging_dir = index_dir / f".{generation_name}.tmp"
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        staging_dir.mkdir(parents=True)
+
+        keys = array("I", sorted(self.postings))
+        slots = array("I")
+        flat_postings = array("I")
+        for key in keys:
+            file_ids = self.postings[key]
+            slots.append(len(flat_postings))
+            slots.append(len(file_ids))
+            flat_postings.extend(file_ids)
+        write_array(staging_dir / TRIGRAM_KEYS_FILE, keys)
+        write_array(staging_dir / TRIGRAM_SLOTS_FILE, slots)
+        write_array(staging_dir / POSTINGS_FILE, flat_postings)
+        write_array(staging_dir / LINES_FILE, self.lines)
+        (staging_dir / FILES_FILE).write_text(json.dumps(self.files, ensure_ascii=False), encoding="utf-8")
+        if prior is None:
+            chunk_count = self.chunks.write(staging_dir)
+        else:
+            chunk_count = self.chunks.write(staging_dir, prior.document_frequency(), prior.chunk_count)
+
+        segments = [
+            *(prior_segments or []),
+            {
+                "name": generation_name,
+                "files": len(self.files),
+                "chunks": chunk_count,
+                "trigrams": len(keys),
+                "size_bytes": sum(path.stat().st_size for path in staging_dir.iterdir()),
+                "deleted": [],
+                "dead_chunks": 0,
+            },
+        ]
+        (staging_dir / SEGMENTS_FILE).write_text(json.dumps(segments), encoding="utf-8")
+        meta = {
+            "generation": generation,
+            "root_path": str(root),
+            "file_count": sum(entry["files"] - len(entry["deleted"]) for entry in segments),
+            "trigram_count": sum(entry["trigrams"] for entry in segments),
+            "chunk_count": sum(entry["chunks"] - entry["dead_chunks"] for entry in segments),
+            "size_bytes": sum(entry["size_bytes"] for entry in segments),
+            "segments": len(segments),
+            "build_seconds": round(time.perf_counter() - started, 3),
+            "built_at": datetime.now(timezone.utc).isoformat(),
+            **extra,
+        }
+        (staging_dir / META_FILE).write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(staging_dir, index_dir / generation_name)
+        _publish(index_dir, generation_name)
+        _gc_generations(index_dir, settings.search_index_keep_generations)
+        return meta
+
+
+def _read_source(root: Path, rel_path: str) -> bytes | None:
+    try:
+        data = (root / rel_path).read_bytes()
+    except OSError:
+        return None
+    if is_binary(data):
+        return None
+    return data
+
+
+def _build_locked(root: Path, index_dir: Path, started: float) -> dict[str, Any]:
+    generation = _generation_number(current_generation_name(index_dir)) + 1
+    builder = _GenerationBuilder()
+    excluded = excluded_dirs(root, index_dir)
+    for rel_path, file_stat in iter_source_files(root, settings.search_index_max_file_bytes, excluded):
+        data = _read_source(root, rel_path)
+        if data is not None:
+            builder.add_file(rel_path, file_stat, data, hashlib.sha256(data).hexdigest())
+    extra = {"mode": "full", "added": len(builder.files), "changed": 0, "deleted": 0}
+    return builder.write(index_dir, generation, root, started, extra)
+
+
+def build_index(root: Path, index_dir: Path) -> dict[str, Any]:
+    started = time.perf_counter()
+    with locked(index_dir):
+        return _build_locked(root, index_dir, started)
+
+
+def _needs_compaction(segments: list[dict[str, Any]], added_files: int) -> bool:
+    if len(segments) + 1 > max(1, settings.search_index_max_segments):
+        return True
+    total = sum(entry["files"] for entry in segments) + added_files
+    dead = sum(len(entry["deleted"]) for entry in segments)
+    return total > 0 and dead / total > settings.search_index_max_dead_ratio
+
+
+def refresh_index(root: Path, index_dir: Path) -> dict[str, Any]:
+    started = time.perf_counter()
+    with locked(index_dir):
+        previous_name = current_generation_name(index_dir)
+        try:
+            reader = None if previous_name is None else IndexReader(index_dir / previous_name)
+        except FileNotFoundError:
+            reader = None
+        if reader is None or reader.vectors is None:
+            return _build_locked(root, index_dir, started)
+        live = {indexed.path: file_id for file_id, indexed in reader.live_files()}
+        removed: list[int] = []
+        builder = _GenerationBuilder()
+        added = changed = deleted = 0
+        excluded = excluded_dirs(root, index_dir)
+        for rel_path, file_stat in iter_source_files(root, settings.search_index_max_file_bytes, excluded):
+            old_id = live.pop(rel_path, None)
+            if old_id is not None:
+                indexed = reader.files[old_id]
+                if indexed.size == file_stat.st_size and indexed.mtime_ns == file_stat.st_mtime_ns:
+                    continue
+                removed.append(old_id)
+            data = _read_source(root, rel_path)
+            if data is None:
+                deleted += old_id is not None
+                continue
+            digest = hashlib.sha256(data).hexdigest()
+            builder.add_file(rel_path, file_stat, data, digest)
+            if old_id is None:
+                added += 1
+            elif reader.files[old_id].sha256 != digest:
+                changed += 1
+        deleted += len(live)
+        removed.extend(live.values())
+
+        if not (builder.files or removed):
+            return {**reader.meta, "mode": "unchanged", "added": 0, "changed": 0, "deleted": 0}
+        extra = {"mode": "refresh", "added": added, "changed": changed, "deleted": deleted}
+        segments = reader.tombstone(removed)
+        if _needs_compaction(segments, len(builder.files)):
+            for segment, entry in zip(reader.segments, segments):
+                builder.carry_segment(segment, frozenset(entry["deleted"]))
+            return builder.write(index_dir, reader.generation + 1, root, started, {**extra, "compacted": True})
+        return builder.write(
+            index_dir, reader.generation + 1, root, started, {**extra, "compacted": False}, reader.vectors, segments
+        )
+
+
+def index_status(index_dir: Path) -> dict[str, Any] | None:
+    generation_name = current_generation_name(index_dir)
+    if generation_name is None:
+        return None
+    try:
+        return json.loads((index_dir / generation_name / META_FILE).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def map_file(path: Path) -> memoryview:
+    with path.open("rb") as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return memoryview(array("I"))
+        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mapped).cast("I")
+
+
+class SegmentReader:
+    def __init__(self, segment_dir: Path) -> None:
+        self.segment_dir = segment_dir
+        self.files = [IndexedFile(*entry) for entry in json.loads((segment_dir / FILES_FILE).read_text(encoding="utf-8"))]
+        self._keys = map_file(segment_dir / TRIGRAM_KEYS_FILE)
+        self._slots = map_file(segment_dir / TRIGRAM_SLOTS_FILE)
+        self._postings = map_file(segment_dir / POSTINGS_FILE)
+        self._lines = map_file(segment_dir / LINES_FILE)
+        self.vectors = VectorStore(segment_dir) if VectorStore.exists(segment_dir) else None
+        self.trigram_count = len(self._keys)
+
+    def size_bytes(self) -> int:
+        return sum(path.stat().st_size for path in self.segment_dir.iterdir() if path.is_file())
+
+    def _posting_list(self, key: int) -> memoryview | None:
+        position = bisect_left(self._keys, key)
+        if position >= len(self._keys) or self._keys[position] != key:
+            return None
+        start = self._slots[position * 2]
+        count = self._slots[position * 2 + 1]
+        return self._postings[start : start + count]
+
+    def candidate_ids(self, keys: set[int]) -> list[int]:
+        if not keys:
+            return list(range(len(self.files)))
+        posting_lists: list[memoryview] = []
+        for key in keys:
+            posting_list = self._posting_list(key)
+            if posting_list is None:
+                return []
+            posting_lists.append(posting_list)
+        posting_lists.sort(key=len)
+        candidates = set(posting_lists[0])
+        for posting_list in posting_lists[1:]:
+            candidates.intersection_update(posting_list)
+            if not candidates:
+                return []
+        return sorted(candidates)
+
+    def iter_postings(self) -> Iterator[tuple[int, memoryview]]:
+        for position, key in enumerate(self._keys):
+            start = self._slots[position * 2]
+            yield key, self._postings[start : start + self._slots[position * 2 + 1]]
+
+    def line_starts(self, file_id: int) -> memoryview:
+        indexed = self.files[file_id]
+        return self._lines[indexed.line_start : indexed.line_start + indexed.line_count]
+
+
+_segments: dict[Path, SegmentReader] = {}
+_segments_lock = threading.Lock()
+
+
+def _open_segments(index_dir: Path, names: list[str]) -> list[SegmentReader]:
+    opened: list[SegmentReader] = []
+    with _segments_lock:
+        live = {index_dir / name for name in names}
+        for stale in [path for path in _segments if path.parent == index_dir and path not in live]:
+            del _segments[stale]
+        for name in names:
+            segment_dir = index_dir / name
+            segment = _segments.get(segment_dir)
+            if segment is None:
+                segment = SegmentReader(segment_dir)
+                _segments[segment_dir] = segment
+            opened.append(segment)
+    return opened
+
+
+class IndexReader:
+    def __init__(self, generation_dir: Path) -> None:
+        self.generation_dir = generation_dir
+        self.meta: dict[str, Any] = json.loads((generation_dir / META_FILE).read_text(encoding="utf-8"))
+        self.generation: int = self.meta["generation"]
+        self._entries = _read_segments(generation_dir)
+        self.segments = _open_segments(generation_dir.parent, [entry["name"] for entry in self._entries])
+        self.deleted = [frozenset(entry["deleted"]) for entry in self._entries]
+        self.files: list[IndexedFile] = []
+        self._offsets: list[int] = []
+        for segment in self.segments:
+            self._offsets.append(len(self.files))
+            self.files.extend(segment.files)
+        self.vectors = self._segmented_vectors()
+
+    def _segmented_vectors(self) -> SegmentedVectors | None:
+        if any(segment.vectors is None for segment in self.segments):
+            return None
+        vector_segments: list[VectorSegment] = []
+        chunk_offset = 0
+        for segment, file_offset, deleted in zip(self.segments, self._offsets, self.deleted):
+            store = segment.vectors
+            vector_segments.append(VectorSegment(store, file_offset, chunk_offset, store.chunk_ids_for_files(deleted)))
+            chunk_offset += store.chunk_count
+        return SegmentedVectors(vector_segments)
+
+    def _locate(self, file_id: int) -> tuple[int, int]:
+        position = bisect_right(self._offsets, file_id) - 1
+        return position, file_id - self._offsets[position]
+
+    def live_files(self) -> Iterator[tuple[int, IndexedFile]]:
+        for segment, file_offset, deleted in zip(self.segments, self._offsets, self.deleted):
+            for local_id, indexed in enumerate(segment.files):
+                if local_id not in deleted:
+                    yield file_offset + local_id, indexed
+
+    def tombstone(self, file_ids: list[int]) -> list[dict[str, Any]]:
+        removed: dict[int, set[int]] = {}
+        for file_id in file_ids:
+            position, local_id = self._locate(file_id)
+            removed.setdefault(position, set()).add(local_id)
+        entries: list[dict[str, Any]] = []
+        for position, (entry, segment) in enumerate(zip(self._entries, self.segments)):
+            deleted = sorted(self.deleted[position] | removed.get(position, set()))
+            dead_chunks = segment.vectors.chunk_ids_for_files(deleted).size if segment.vectors is not None else 0
+            entries.append(
+                {
+                    "name": entry["name"],
+                    "files": len(segment.files),
+                    "chunks": segment.vectors.chunk_count if segment.vectors is not None else 0,
+                    "trigrams": segment.trigram_count,
+                    "size_bytes": entry.get("size_bytes") or segment.size_bytes(),
+                    "deleted": deleted,
+                    "dead_chunks": int(dead_chunks),
+                }
+            )
+        return entries
+
+    def candidate_ids(self, query: str) -> list[int]:
+        keys = trigram_keys(query.encode("utf-8"))
+        candidates: list[int] = []
+        for segment, file_offset, deleted in zip(self.segments, self._offsets, self.deleted):
+            candidates.extend(file_offset + local_id for local_id in segment.candidate_ids(keys) if local_id not in deleted)
+        return candidates
+
+    def line_starts(self, file_id: int) -> memoryview:
+        position, local_id = self._locate(file_id)
+        return self.segments[position].line_starts(local_id)
+
+
+_readers: dict[Path, IndexReader] = {}
+_readers_lock = threading.Lock()
+
+
+def open_index(index_dir: Path) -> IndexReader | None:
+    generation_name = current_generation_name(index_dir)
+    if generation_name is None:
+        return None
+    with _readers_lock:
+        reader = _readers.get(index_dir)
+        if reader is not None and reader.generation_dir.name == generation_name:
+            return reader
+        try:
+            reader = IndexReader(index_dir / generation_name)
+        except FileNotFoundError:
+            return None
+        _readers[index_dir] = reader
+        return reader
+
+
+def _line_hit(file_path: Path, data: bytes, starts: memoryview | array, line_index: int, match_count: int) -> IndexHit:
+    line_begin = starts[line_index]
+    line_end = starts[line_index + 1] - 1 if line_index + 1 < len(starts) else len(data)
+    snippet = data[line_begin:line_end].rstrip(b"\r\n").decode("utf-8", errors="replace")
+    return IndexHit(path=str(file_path), line_no=line_index + 1, snippet=snippet, match_count=match_count)
+
+
+def iter_line_hits(
+    file_path: Path, data: bytes, needle: bytes, case_sensitive: bool, starts: memoryview | array | None = None
+) -> Iterator[IndexHit]:
+    haystack = data if case_sensitive else data.lower()
+    if starts is None:
+        starts = line_offsets(data)
+    step = max(1, len(needle))
+    current_line = -1
+    match_count = 0
+    position = haystack.find(needle)
+    while position != -1:
+        line_index = bisect_right(starts, position) - 1
+        if line_index != current_line:
+            if current_line >= 0:
+                yield _line_hit(file_path, data, starts, current_line, match_count)
+            current_line, match_count = line_index, 0
+        match_count += 1
+        position = haystack.find(needle, position + step)
+    if current_line >= 0:
+        yield _line_hit(file_path, data, starts, current_line, match_count)
+
+
+def _verify_file(root: Path, reader: IndexReader, file_id: int, needle: bytes, case_sensitive: bool) -> Iterator[IndexHit]:
+    indexed = reader.files[file_id]
+    file_path = root / indexed.path
+    try:
+        file_stat = file_path.stat()
+        data = file_path.read_bytes()
+    except OSError:
+        return
+    starts: memoryview | array | None = None
+    if file_stat.st_size == indexed.size and file_stat.st_mtime_ns == indexed.mtime_ns:
+        starts = reader.line_starts(file_id)
+    yield from iter_line_hits(file_path, data, needle, case_sensitive, starts)
+
+
+def iter_index_hits(reader: IndexReader, root: Path, query: str) -> Iterator[IndexHit]:
+    case_sensitive = query != query.lower()
+    needle = query.encode("utf-8")
+    if not case_sensitive:
+        needle = needle.lower()
+    for file_id in reader.candidate_ids(query):
+        yield from _verify_file(root, reader, file_id, needle, case_sensitive)
+
+
+def search_index(reader: IndexReader, root: Path, query: str, limit: int) -> list[IndexHit]:
+    return list(islice(iter_index_hits(reader, root, query), limit))
+
+
+def _best_line(file_path: Path, start_line: int, end_line: int, query_tokens: set[str]) -> str:
+    try:
+        lines = file_path.read_text(encoding="utf-8", errors="replace").splitlines()[start_line - 1 : end_line]
+    except OSError:
+        return ""
+    best = ""
+    best_overlap = -1
+    for line in lines:
+        if not line.strip():
+            continue
+        overlap = len(query_tokens.intersection(tokenize(line)))
+        if overlap > best_overlap:
+            best, best_overlap = line, overlap
+    return best
+
+
+def search_chunks(reader: IndexReader, root: Path, query: str, mode: str, limit: int) -> list[ChunkHit]:
+    if reader.vectors is None:
+        return []
+    if mode == "vector":
+        scored = reader.vectors.search_vector(query, limit)
+    else:
+        scored = reader.vectors.search_hybrid(query, limit)
+    query_tokens = set(tokenize(query))
+    hits: list[ChunkHit] = []
+    for item in scored:
+        file_path = root / reader.files[item.file_id].path
+        hits.append(
+            ChunkHit(
+                path=str(file_path),
+                start_line=item.start_line,
+                end_line=item.end_line,
+                snippet=_best_line(file_path, item.start_line, item.end_line, query_tokens),
+                score=round(item.score, 6),
+            )
+        )
+    return hits
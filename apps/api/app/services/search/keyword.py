@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import subprocess
+import time
+from collections.abc import Iterator
+from contextlib import closing
+from itertools import islice
+from pathlib import Path
+
+from app.core.config import settings
+from app.services.search.index import IndexHit
+
+SNIPPET_MAX_CHARS = 500
+RECENCY_HALF_LIFE_DAYS = 30.0
+
+
+def iter_rg_hits(root: Path, query: str) -> Iterator[IndexHit]:
+    cmd = [
+        "rg",
+        "--json",
+        "--fixed-strings",
+        "--smart-case",
+        "--max-count",
+        str(settings.search_rg_max_count_per_file),
+        "--",
+        query,
+        str(root),
+    ]
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, errors="replace")
+    try:
+        if process.stdout is None:
+            return
+        for raw in process.stdout:
+            if not raw.startswith('{"type":"match"'):
+                continue
+            data = json.loads(raw)["data"]
+            path = data["path"].get("text")
+            line_text = data["lines"].get("text")
+            if path is None or line_text is None:
+                continue
+            yield IndexHit(
+                path=path,
+                line_no=data["line_number"],
+                snippet=line_text.rstrip("\r\n")[:SNIPPET_MAX_CHARS],
+                match_count=max(1, len(data["submatches"])),
+            )
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        if process.stdout is not None:
+            process.stdout.close()
+
+
+class KeywordRanker:
+    def __init__(self, root: Path, now: float | None = None) -> None:
+        self._root = root
+        self._now = time.time() if now is None else now
+        self._mtimes: dict[str, float] = {}
+
+    def _mtime(self, path: str) -> float:
+        if path not in self._mtimes:
+            try:
+                self._mtimes[path] = os.stat(path).st_mtime
+            except OSError:
+                self._mtimes[path] = 0.0
+        return self._mtimes[path]
+
+    def score(self, hit: IndexHit) -> float:
+        try:
+            depth = len(Path(hit.path).relative_to(self._root).parts) - 1
+        except ValueError:
+            depth = 0
+        age_days = max(0.0, (self._now - self._mtime(hit.path)) / 86400)
+        term_frequency = 1 + math.log(hit.match_count)
+        recency = 1 + 2 ** (-age_days / RECENCY_HALF_LIFE_DAYS)
+        return round(term_frequency / (1 + 0.25 * depth) * recency, 6)
+
+
+def candidate_cap(top_k: int) -> int:
+    return max(settings.search_candidate_min, top_k * settings.search_candidate_factor)
+
+
+def rank_hits(hits: Iterator[IndexHit], ranker: KeywordRanker, top_k: int) -> list[tuple[float, IndexHit]]:
+    with closing(hits):
+        candidates = list(islice(hits, candidate_cap(top_k)))
+    scored = [(ranker.score(hit), hit) for hit in candidates]
+    scored.sort(key=lambda item: (-item[0], item[1].path, item[1].line_no))
+    return scored[:top_k]
+
+
+def stream_hits(hits: Iterator[IndexHit], ranker: KeywordRanker, top_k: int) -> Iterator[tuple[float, IndexHit]]:
+    yield from rank_hits(hits, ranker, top_k)
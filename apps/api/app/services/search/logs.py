@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any
+
+from app.core.config import settings
+from app.services.artifacts.store import artifact_store, is_blob_ref
+from app.services.retention.archive import read_log
+from app.services.search.index import TrigramCollector, iter_line_hits, locked, map_file, trigram_keys, write_array
+
+MANIFEST_FILE = "MANIFEST.json"
+DOCS_FILE = "docs.json"
+KEYS_FILE = "keys.bin"
+SLOTS_FILE = "slots.bin"
+POSTINGS_FILE = "postings.bin"
+MIN_QUERY_CHARS = 3
+SNIPPET_MAX_CHARS = 500
+READ_BLOCK_BYTES = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class LogDoc:
+    run_id: int
+    step_no: int
+    path: str
+
+
+@dataclass(frozen=True)
+class LogHit:
+    run_id: int
+    step_no: int
+    line_no: int
+    snippet: str
+    match_count: int
+
+
+def log_index_dir() -> Path:
+    return Path(settings.artifact_root) / "logindex"
+
+
+def _read_manifest(index_dir: Path) -> dict[str, Any]:
+    try:
+        return json.loads((index_dir / MANIFEST_FILE).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {"next_segment": 1, "segments": []}
+
+
+def _write_manifest(index_dir: Path, manifest: dict[str, Any]) -> None:
+    pending = index_dir / f"{MANIFEST_FILE}.tmp"
+    pending.write_text(json.dumps(manifest), encoding="utf-8")
+    os.replace(pending, index_dir / MANIFEST_FILE)
+
+
+class _SegmentBuilder:
+    def __init__(self) -> None:
+        self.docs: list[LogDoc] = []
+        self._postings: dict[int, list[int]] = {}
+
+    def add(self, doc: LogDoc, keys: Iterable[int]) -> None:
+        doc_id = len(self.docs)
+        self.docs.append(doc)
+        for key in keys:
+            self._postings.setdefault(key, []).append(doc_id)
+
+    def carry(self, segment: LogSegment, keep: list[LogDoc | None]) -> None:
+        remap = array("i")
+        for doc in keep:
+            if doc is None:
+                remap.append(-1)
+            else:
+                remap.append(len(self.docs))
+                self.docs.append(doc)
+        for key, posting_list in segment.iter_postings():
+            mapped = [remap[doc_id] for doc_id in posting_list if remap[doc_id] >= 0]
+            if mapped:
+                self._postings.setdefault(key, []).extend(mapped)
+
+    def write(self, segment_dir: Path) -> None:
+        segment_dir.mkdir(parents=True)
+        keys = array("I", sorted(self._postings))
+        slots = array("I")
+        postings = array("I")
+        for key in keys:
+            doc_ids = self._postings[key]
+            slots.extend((len(postings), len(doc_ids)))
+            postings.extend(doc_ids)
+        write_array(segment_dir / KEYS_FILE, keys)
+        write_array(segment_dir / SLOTS_FILE, slots)
+        write_array(segment_dir / POSTINGS_FILE, postings)
+        docs = [[doc.run_id, doc.step_no, doc.path] for doc in self.docs]
+        (segment_dir / DOCS_FILE).write_text(json.dumps(docs), encoding="utf-8")
+
+
+class LogSegment:
+    def __init__(self, segment_dir: Path) -> None:
+        self.segment_dir = segment_dir
+        self.docs = [LogDoc(*entry) for entry in json.loads((segment_dir / DOCS_FILE).read_text(encoding="utf-8"))]
+        self._keys = map_file(segment_dir / KEYS_FILE)
+        self._slots = map_file(segment_dir / SLOTS_FILE)
+        self._postings = map_file(segment_dir / POSTINGS_FILE)
+        self.doc_keys = {(doc.run_id, doc.step_no) for doc in self.docs}
+
+    def _posting_list(self, key: int) -> memoryview | None:
+        position = bisect_left(self._keys, key)
+        if position >= len(self._keys) or self._keys[position] != key:
+            return None
+        start = self._slots[position * 2]
+        return self._postings[start : start + self._slots[position * 2 + 1]]
+
+    def candidate_docs(self, keys: set[int]) -> list[LogDoc]:
+        posting_lists: list[memoryview] = []
+        for key in keys:
+            posting_list = self._posting_list(key)
+            if posting_list is None:
+                return []
+            posting_lists.append(posting_list)
+        posting_lists.sort(key=len)
+        candidates = set(posting_lists[0])
+        for posting_list in posting_lists[1:]:
+            candidates.intersection_update(posting_list)
+            if not candidates:
+                return []
+        return [self.docs[doc_id] for doc_id in sorted(candidates)]
+
+    def iter_postings(self) -> Iterator[tuple[int, memoryview]]:
+        for position, key in enumerate(self._keys):
+            start = self._slots[position * 2]
+            yield key, self._postings[start : start + self._slots[position * 2 + 1]]
+
+
+def _segment_name(manifest: dict[str, Any]) -> str:
+    name = f"seg-{manifest['next_segment']:08d}"
+    manifest["next_segment"] += 1
+    return name
+
+
+def _merge_tier(index_dir: Path, manifest: dict[str, Any], merge_factor: int) -> list[str]:
+    segments = manifest["segments"]
+    for level in sorted({entry["level"] for entry in segments}):
+        tier = [entry for entry in segments if entry["level"] == level]
+        if len(tier) < merge_factor:
+            continue
+        opened = [LogSegment(index_dir / entry["name"]) for entry in tier]
+        seen: set[tuple[int, int]] = set()
+        keep_lists: list[list[LogDoc | None]] = []
+        for segment in reversed(opened):
+            keep: list[LogDoc | None] = []
+            for doc in reversed(segment.docs):
+                doc_key = (doc.run_id, doc.step_no)
+                keep.append(None if doc_key in seen else doc)
+                seen.add(doc_key)
+            keep_lists.append(keep[::-1])
+        builder = _SegmentBuilder()
+        for segment, keep in zip(opened, reversed(keep_lists)):
+            builder.carry(segment, keep)
+        merged_name = _segment_name(manifest)
+        builder.write(index_dir / merged_name)
+        merged_names = {entry["name"] for entry in tier}
+        position = segments.index(tier[0])
+        remaining = [entry for entry in segments if entry["name"] not in merged_names]
+        remaining.insert(position, {"name": merged_name, "level": level + 1, "docs": len(builder.docs)})
+        manifest["segments"] = remaining
+        return sorted(merged_names)
+    return []
+
+
+def read_trigram_keys(stream: IO[bytes]) -> set[int]:
+    collector = TrigramCollector()
+    for block in iter(lambda: stream.read(READ_BLOCK_BYTES), b""):
+        collector.update(block)
+    return collector.keys
+
+
+def add_step_log(index_dir: Path, run_id: int, step_no: int, log_path: Path) -> str:
+    with log_path.open("rb") as stream:
+        keys = read_trigram_keys(stream)
+    return index_step_log(index_dir, run_id, step_no, str(log_path), keys)
+
+
+def index_step_log(index_dir: Path, run_id: int, step_no: int, ref: str, keys: set[int]) -> str:
+    builder = _SegmentBuilder()
+    builder.add(LogDoc(run_id=run_id, step_no=step_no, path=ref), keys)
+    with locked(index_dir):
+        manifest = _read_manifest(index_dir)
+        name = _segment_name(manifest)
+        builder.write(index_dir / name)
+        manifest["segments"].append({"name": name, "level": 0, "docs": 1})
+        obsolete: list[str] = []
+        while True:
+            merged = _merge_tier(index_dir, manifest, max(2, settings.log_index_merge_factor))
+            if not merged:
+                break
+            obsolete.extend(merged)
+        _write_manifest(index_dir, manifest)
+        for stale in obsolete:
+            shutil.rmtree(index_dir / stale, ignore_errors=True)
+    return name
+
+
+def rebuild_log_index(index_dir: Path, logs_root: Path) -> dict[str, int]:
+    builder = _SegmentBuilder()
+    for run_dir in sorted(logs_root.iterdir() if logs_root.exists() else [], key=lambda path: path.name):
+        if not run_dir.name.isdigit():
+            continue
+        for log_path in sorted(run_dir.glob("*.out")):
+            if not log_path.stem.isdigit():
+                continue
+            try:
+                with log_path.open("rb") as stream:
+                    keys = read_trigram_keys(stream)
+            except OSError:
+                continue
+            builder.add(LogDoc(run_id=int(run_dir.name), step_no=int(log_path.stem), path=str(log_path)), keys)
+    with locked(index_dir):
+        manifest = _read_manifest(index_dir)
+        obsolete = [entry["name"] for entry in manifest["segments"]]
+        name = _segment_name(manifest)
+        builder.write(index_dir / name)
+        manifest["segments"] = [{"name": name, "level": 0, "docs": len(builder.docs)}]
+        _write_manifest(index_dir, manifest)
+        for stale in obsolete:
+            shutil.rmtree(index_dir / stale, ignore_errors=True)
+    return {"docs": len(builder.docs), "segments": 1}
+
+
+_segments: dict[Path, LogSegment] = {}
+_segments_lock = threading.Lock()
+
+
+def open_segments(index_dir: Path) -> list[LogSegment]:
+    manifest = _read_manifest(index_dir)
+    opened: list[LogSegment] = []
+    with _segments_lock:
+        live = {index_dir / entry["name"] for entry in manifest["segments"]}
+        for stale in [path for path in _segments if path.parent == index_dir and path not in live]:
+            del _segments[stale]
+        for entry in manifest["segments"]:
+            segment_dir = index_dir / entry["name"]
+            segment = _segments.get(segment_dir)
+            if segment is None:
+                try:
+                    segment = LogSegment(segment_dir)
+                except FileNotFoundError:
+                    continue
+                _segments[segment_dir] = segment
+            opened.append(segment)
+    return opened
+
+
+def candidate_logs(index_dir: Path, query: str, run_ids: set[int] | None = None) -> list[LogDoc]:
+    keys = trigram_keys(query.encode("utf-8"))
+    seen: set[tuple[int, int]] = set()
+    candidates: list[LogDoc] = []
+    for segment in reversed(open_segments(index_dir)):
+        for doc in segment.candidate_docs(keys):
+            if (doc.run_id, doc.step_no) in seen or (run_ids is not None and doc.run_id not in run_ids):
+                continue
+            candidates.append(doc)
+        seen.update(segment.doc_keys)
+    candidates.sort(key=lambda doc: (-doc.run_id, doc.step_no))
+    return candidates
+
+
+def search_logs(index_dir: Path, query: str, run_ids: set[int] | None, limit: int) -> list[LogHit]:
+    case_sensitive = query != query.lower()
+    needle = query.encode("utf-8")
+    if not case_sensitive:
+        needle = needle.lower()
+    hits: list[LogHit] = []
+    for doc in candidate_logs(index_dir, query, run_ids):
+        try:
+            data = artifact_store().read_bytes(doc.path) if is_blob_ref(doc.path) else read_log(doc.path)
+        except OSError:
+            continue
+        for hit in iter_line_hits(Path(doc.path), data, needle, case_sensitive):
+            hits.append(LogHit(doc.run_id, doc.step_no, hit.line_no, hit.snippet[:SNIPPET_MAX_CHARS], hit.match_count))
+            if len(hits) >= limit:
+                return hits
+    return hits
@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import math
+import re
+import zlib
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+HASH_BITS = 20
+HASH_BUCKETS = 1 << HASH_BITS
+DENSE_DIM = 512
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+MATMUL_BLOCK_ROWS = 65_536
+PROJECT_BLOCK_ROWS = 4_096
+
+CHUNK_META_FILE = "chunk_meta.npy"
+CHUNK_INDPTR_FILE = "chunk_indptr.npy"
+CHUNK_TERMS_FILE = "chunk_terms.npy"
+CHUNK_COUNTS_FILE = "chunk_counts.npy"
+DF_FILE = "df.npy"
+TERM_KEYS_FILE = "term_keys.npy"
+TERM_OFFSETS_FILE = "term_offsets.npy"
+TERM_CHUNKS_FILE = "term_chunks.npy"
+TERM_COUNTS_FILE = "term_counts.npy"
+VECTORS_FILE = "vectors.npy"
+
+_TOKEN_RE = re.compile(r"[a-z0-9_]+|[^\x00-\x7f\s]")
+
+
+@dataclass(frozen=True)
+class ChunkScore:
+    chunk_id: int
+    file_id: int
+    start_line: int
+    end_line: int
+    score: float
+
+
+def tokenize(text: str) -> list[str]:
+    tokens: list[str] = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token.isascii():
+            if len(token) < 2:
+                continue
+            tokens.append(token)
+            if "_" in token:
+                tokens.extend(part for part in token.split("_") if len(part) > 1)
+        else:
+            tokens.append(token)
+    return tokens
+
+
+def hash_tokens(tokens: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    if not tokens:
+        return np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.uint16)
+    buckets = np.fromiter((zlib.crc32(token.encode("utf-8")) for token in tokens), dtype=np.uint32, count=len(tokens))
+    terms, counts = np.unique(buckets & (HASH_BUCKETS - 1), return_counts=True)
+    return terms.astype(np.uint32), np.minimum(counts, np.iinfo(np.uint16).max).astype(np.uint16)
+
+
+def _vector_idf(df: np.ndarray, n_chunks: int) -> np.ndarray:
+    return (np.log((n_chunks + 1) / (df.astype(np.float32) + 1)) + 1).astype(np.float32)
+
+
+def _project(terms: np.ndarray, weights: np.ndarray, rows: np.ndarray, n_rows: int) -> np.ndarray:
+    wide = terms.astype(np.uint64)
+    dims = ((wide * np.uint64(2654435761)) % np.uint64(1 << 32)) % np.uint64(DENSE_DIM)
+    signs = np.where(((wide * np.uint64(40503)) >> np.uint64(11)) & np.uint64(1), 1.0, -1.0).astype(np.float32)
+    flat = rows.astype(np.int64) * DENSE_DIM + dims.astype(np.int64)
+    matrix = np.bincount(flat, weights=weights * signs, minlength=n_rows * DENSE_DIM).astype(np.float32)
+    matrix = matrix.reshape(n_rows, DENSE_DIM)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-9)
+
+
+class ChunkTableBuilder:
+    def __init__(self, chunk_lines: int) -> None:
+        self.chunk_lines = chunk_lines
+        self._meta: list[tuple[int, int, int, int]] = []
+        self._terms: list[np.ndarray] = []
+        self._counts: list[np.ndarray] = []
+
+    def add_file(self, file_id: int, data: bytes) -> None:
+        lines = data.decode("utf-8", errors="replace").splitlines()
+        for start in range(0, len(lines), self.chunk_lines):
+            window = lines[start : start + self.chunk_lines]
+            tokens = tokenize("\n".join(window))
+            if not tokens:
+                continue
+            terms, counts = hash_tokens(tokens)
+            self._meta.append((file_id, start + 1, start + len(window), len(tokens)))
+            self._terms.append(terms)
+            self._counts.append(counts)
+
+    def carry(self, store: VectorStore, old_file_id: int, new_file_id: int) -> None:
+        for chunk_id in store.chunks_for_file(old_file_id):
+            _, start_line, end_line, length = store.meta[chunk_id]
+            begin, end = store.indptr[chunk_id], store.indptr[chunk_id + 1]
+            self._meta.append((new_file_id, int(start_line), int(end_line), int(length)))
+            self._terms.append(np.asarray(store.terms[begin:end]))
+            self._counts.append(np.asarray(store.counts[begin:end]))
+
+    def write(self, target_dir: Path, prior_df: np.ndarray | None = None, prior_chunks: int = 0) -> int:
+        n_chunks = len(self._meta)
+        meta = np.array(self._meta, dtype=np.uint32).reshape(n_chunks, 4)
+        lengths = np.array([len(terms) for terms in self._terms], dtype=np.int64)
+        indptr = np.zeros(n_chunks + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        terms = np.concatenate(self._terms) if self._terms else np.zeros(0, dtype=np.uint32)
+        counts = np.concatenate(self._counts) if self._counts else np.zeros(0, dtype=np.uint16)
+        df = np.bincount(terms, minlength=HASH_BUCKETS).astype(np.uint32)
+
+        rows = np.repeat(np.arange(n_chunks), lengths)
+        corpus_df = df if prior_df is None else df + prior_df
+        weights = (1 + np.log(counts.astype(np.float32))) * _vector_idf(corpus_df[terms], n_chunks + prior_chunks)
+        vectors = np.lib.format.open_memmap(
+            target_dir / VECTORS_FILE, mode="w+", dtype=np.float16, shape=(n_chunks, DENSE_DIM)
+        )
+        for begin in range(0, n_chunks, PROJECT_BLOCK_ROWS):
+            end = min(begin + PROJECT_BLOCK_ROWS, n_chunks)
+            window = slice(indptr[begin], indptr[end])
+            vectors[begin:end] = _project(terms[window], weights[window], rows[window] - begin, end - begin)
+        vectors.flush()
+        del vectors
+
+        np.save(target_dir / CHUNK_META_FILE, meta)
+        np.save(target_dir / CHUNK_INDPTR_FILE, indptr)
+        np.save(target_dir / CHUNK_TERMS_FILE, terms)
+        np.save(target_dir / CHUNK_COUNTS_FILE, counts)
+        np.save(target_dir / DF_FILE, df)
+
+        order = np.argsort(terms, kind="stable")
+        term_keys, term_sizes = np.unique(terms[order], return_counts=True)
+        term_offsets = np.zeros(term_keys.size + 1, dtype=np.int64)
+        np.cumsum(term_sizes, out=term_offsets[1:])
+        np.save(target_dir / TERM_KEYS_FILE, term_keys.astype(np.uint32))
+        np.save(target_dir / TERM_OFFSETS_FILE, term_offsets)
+        np.save(target_dir / TERM_CHUNKS_FILE, rows[order].astype(np.uint32))
+        np.save(target_dir / TERM_COUNTS_FILE, counts[order])
+        return n_chunks
+
+
+class VectorStore:
+    def __init__(self, generation_dir: Path) -> None:
+        self.meta = np.load(generation_dir / CHUNK_META_FILE, mmap_mode="r")
+        self.indptr = np.load(generation_dir / CHUNK_INDPTR_FILE, mmap_mode="r")
+        self.terms = np.load(generation_dir / CHUNK_TERMS_FILE, mmap_mode="r")
+        self.counts = np.load(generation_dir / CHUNK_COUNTS_FILE, mmap_mode="r")
+        self.df = np.load(generation_dir / DF_FILE, mmap_mode="r")
+        self.vectors = np.load(generation_dir / VECTORS_FILE, mmap_mode="r")
+        self.term_keys = np.load(generation_dir / TERM_KEYS_FILE, mmap_mode="r")
+        self.term_offsets = np.load(generation_dir / TERM_OFFSETS_FILE, mmap_mode="r")
+        self.term_chunks = np.load(generation_dir / TERM_CHUNKS_FILE, mmap_mode="r")
+        self.term_counts = np.load(generation_dir / TERM_COUNTS_FILE, mmap_mode="r")
+        self.chunk_count = int(self.meta.shape[0])
+        lengths = self.meta[:, 3].astype(np.float32) if self.chunk_count else np.zeros(0, dtype=np.float32)
+        self._lengths = lengths
+        self.length_sum = float(lengths.sum())
+
+    @staticmethod
+    def exists(generation_dir: Path) -> bool:
+        return (generation_dir / VECTORS_FILE).exists() and (generation_dir / TERM_KEYS_FILE).exists()
+
+    def chunks_for_file(self, file_id: int) -> range:
+        file_ids = self.meta[:, 0]
+        begin = int(np.searchsorted(file_ids, file_id, side="left"))
+        end = int(np.searchsorted(file_ids, file_id, side="right"))
+        return range(begin, end)
+
+    def chunk_ids_for_files(self, file_ids: Iterable[int]) -> np.ndarray:
+        ranges = [np.arange(chunks.start, chunks.stop) for chunks in map(self.chunks_for_file, file_ids)]
+        return np.concatenate(ranges) if ranges else np.zeros(0, dtype=np.int64)
+
+    def scored(self, chunk_ids: np.ndarray, scores: np.ndarray, file_offset: int, chunk_offset: int) -> list[ChunkScore]:
+        return [
+            ChunkScore(
+                chunk_id=chunk_offset + int(chunk_id),
+                file_id=file_offset + int(self.meta[chunk_id, 0]),
+                start_line=int(self.meta[chunk_id, 1]),
+                end_line=int(self.meta[chunk_id, 2]),
+                score=float(score),
+            )
+            for chunk_id, score in zip(chunk_ids, scores)
+        ]
+
+    def vector_scores(self, query_vector: np.ndarray) -> np.ndarray:
+        scores = np.empty(self.chunk_count, dtype=np.float32)
+        for begin in range(0, self.chunk_count, MATMUL_BLOCK_ROWS):
+            block = np.asarray(self.vectors[begin : begin + MATMUL_BLOCK_ROWS], dtype=np.float32)
+            scores[begin : begin + block.shape[0]] = block @ query_vector
+        return scores
+
+    def bm25_scores(self, terms: np.ndarray, df: np.ndarray, n_chunks: int, avg_length: float) -> np.ndarray:
+        scores = np.zeros(self.chunk_count, dtype=np.float32)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths / max(avg_length, 1e-9))
+        slots = np.searchsorted(self.term_keys, terms)
+        for term, slot, term_df in zip(terms, slots, df):
+            if slot >= self.term_keys.size or self.term_keys[slot] != term:
+                continue
+            begin, end = int(self.term_offsets[slot]), int(self.term_offsets[slot + 1])
+            chunk_ids = np.asarray(self.term_chunks[begin:end], dtype=np.int64)
+            tf = self.term_counts[begin:end].astype(np.float32)
+            idf = math.log(1 + (n_chunks - float(term_df) + 0.5) / (float(term_df) + 0.5))
+            scores[chunk_ids] += idf * tf * (BM25_K1 + 1) / (tf + norm[chunk_ids])
+        return scores
+
+
+def top_scores(scores: np.ndarray, k: int) -> np.ndarray:
+    positive = np.flatnonzero(scores > 0)
+    if positive.size > k:
+        positive = positive[np.argpartition(scores[positive], -k)[-k:]]
+    return positive[np.argsort(-scores[positive], kind="stable")]
+
+
+def fuse_rankings(rankings: Iterable[list[ChunkScore]], k: int) -> list[ChunkScore]:
+    fused: dict[int, float] = {}
+    by_chunk: dict[int, ChunkScore] = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            fused[hit.chunk_id] = fused.get(hit.chunk_id, 0.0) + 1.0 / (RRF_K + rank)
+            by_chunk[hit.chunk_id] = hit
+    ordered = sorted(fused, key=lambda chunk_id: (-fused[chunk_id], chunk_id))[:k]
+    return [
+        ChunkScore(
+            chunk_id=chunk_id,
+            file_id=by_chunk[chunk_id].file_id,
+            start_line=by_chunk[chunk_id].start_line,
+            end_line=by_chunk[chunk_id].end_line,
+            score=fused[chunk_id],
+        )
+        for chunk_id in ordered
+    ]
+
+
+@dataclass(frozen=True)
+class VectorSegment:
+    store: VectorStore
+    file_offset: int = 0
+    chunk_offset: int = 0
+    dead_chunks: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+
+
+class SegmentedVectors:
+    def __init__(self, segments: list[VectorSegment]) -> None:
+        self.segments = segments
+        self.chunk_count = sum(segment.store.chunk_count for segment in segments)
+        self.live_chunk_count = self.chunk_count - sum(segment.dead_chunks.size for segment in segments)
+        self._avg_length = sum(segment.store.length_sum for segment in segments) / max(self.chunk_count, 1)
+
+    def document_frequency(self, terms: np.ndarray | None = None) -> np.ndarray:
+        total = np.zeros(HASH_BUCKETS if terms is None else terms.size, dtype=np.int64)
+        for segment in self.segments:
+            total += segment.store.df if terms is None else segment.store.df[terms]
+        return total
+
+    def _ranked(self, per_segment: Iterable[tuple[VectorSegment, np.ndarray]], k: int) -> list[ChunkScore]:
+        ranked: list[ChunkScore] = []
+        for segment, scores in per_segment:
+            scores[segment.dead_chunks] = 0
+            top = top_scores(scores, k)
+            ranked.extend(segment.store.scored(top, scores[top], segment.file_offset, segment.chunk_offset))
+        ranked.sort(key=lambda hit: (-hit.score, hit.chunk_id))
+        return ranked[:k]
+
+    def search_vector(self, query: str, k: int) -> list[ChunkScore]:
+        terms, counts = hash_tokens(tokenize(query))
+        if not self.chunk_count or not terms.size:
+            return []
+        weights = (1 + np.log(counts.astype(np.float32))) * _vector_idf(self.document_frequency(terms), self.chunk_count)
+        query_vector = _project(terms, weights, np.zeros(terms.size, dtype=np.int64), 1)[0]
+        return self._ranked(((segment, segment.store.vector_scores(query_vector)) for segment in self.segments), k)
+
+    def search_bm25(self, query: str, k: int) -> list[ChunkScore]:
+        terms, _ = hash_tokens(tokenize(query))
+        if not self.chunk_count or not terms.size:
+            return []
+        df = self.document_frequency(terms)
+        return self._ranked(
+            ((segment, segment.store.bm25_scores(terms, df, self.chunk_count, self._avg_length)) for segment in self.segments),
+            k,
+        )
+
+    def search_hybrid(self, query: str, k: int, depth: int = 100) -> list[ChunkScore]:
+        depth = max(depth, k)
+        return fuse_rankings((self.search_bm25(query, depth), self.search_vector(query, depth)), k)
@@ -0,0 +1,338 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from collections.abc import AsyncGenerator, Generator
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.db.base import Base
+from app.db.models import Plan, Project, Run
+from app.db.session import get_async_db, get_db
+from app.main import app as api_app
+from app.state.machine import RunStatus
+
+
+@dataclass
+class Scenario:
+    runs: int = 1
+    viewers: int = 10
+    workers: int = 4
+    event_rate: float = 200.0
+    duration: float = 2.0
+    pollers: int = 2
+    poll_interval: float = 0.25
+    viewer_delay: float = 0.0
+    block_threshold_ms: float = 50.0
+
+
+@dataclass
+class ScenarioResult:
+    runs: int
+    viewers: int
+    event_rate: float
+    events_posted: int
+    events_failed: int
+    deliveries_expected: int
+    deliveries: int
+    dropped: int
+    blocked: int
+    latency_p50_ms: float
+    latency_p99_ms: float
+    post_p99_ms: float
+    poll_p50_ms: float
+    poll_p99_ms: float
+    throughput_per_s: float
+    cpu_ms_per_1k_events: float
+
+
+@dataclass
+class _Stats:
+    post_ms: list[float] = field(default_factory=list)
+    poll_ms: list[float] = field(default_factory=list)
+    posted: int = 0
+    failed: int = 0
+    blocked: int = 0
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class AsgiViewer:
+    def __init__(self, app: FastAPI, path: str, delay: float = 0.0) -> None:
+        self._app = app
+        self._path = path
+        self._delay = delay
+        self._inbox: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self._accepted = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self.latencies_ms: list[float] = []
+        self.received = 0
+
+    async def _receive(self) -> dict[str, Any]:
+        return await self._inbox.get()
+
+    async def _send(self, message: dict[str, Any]) -> None:
+        if message["type"] == "websocket.accept":
+            self._accepted.set()
+            return
+        if message["type"] != "websocket.send":
+            return
+        if self._delay:
+            await asyncio.sleep(self._delay)
+        payload = json.loads(message.get("text") or message.get("bytes") or b"{}")
+        sent_at = payload.get("sent_at")
+        if sent_at is not None:
+            self.latencies_ms.append((time.perf_counter() - sent_at) * 1000)
+        self.received += 1
+
+    async def connect(self) -> None:
+        scope = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "path": self._path,
+            "raw_path": self._path.encode(),
+            "query_string": b"",
+            "headers": [],
+            "subprotocols": [],
+            "client": ("loadtest", 0),
+            "server": ("loadtest", 80),
+        }
+        await self._inbox.put({"type": "websocket.connect"})
+        self._task = asyncio.create_task(self._app(scope, self._receive, self._send))
+        await self._accepted.wait()
+
+    async def close(self) -> None:
+        await self._inbox.put({"type": "websocket.disconnect", "code": 1000})
+        if self._task is not None:
+            await self._task
+
+
+def _seed_local_db(session_factory: sessionmaker[Session], runs: int) -> list[int]:
+    with session_factory() as db:
+        project = Project(name="loadtest", root_path="/nonexistent")
+        db.add(project)
+        db.flush()
+        plan = Plan(project_id=project.id, intent_text="loadtest", plan_json={"steps": []})
+        db.add(plan)
+        db.flush()
+        created = [
+            Run(project_id=project.id, plan_id=plan.id, status=RunStatus.RUNNING.value, sandbox_meta={}, risk_level="low")
+            for _ in range(runs)
+        ]
+        db.add_all(created)
+        db.commit()
+        return [run.id for run in created]
+
+
+def install_local_db(app: FastAPI, workdir: Path) -> sessionmaker[Session]:
+    db_path = workdir / "loadtest.db"
+    engine = create_engine(f"sqlite+pysqlite:///{db_path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=Session)
+    async_session_factory = async_sessionmaker(
+        bind=create_async_engine(f"sqlite+aiosqlite:///{db_path}"), class_=AsyncSession, expire_on_commit=False
+    )
+
+    def _get_local_db() -> Generator[Session, None, None]:
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def _get_local_async_db() -> AsyncGenerator[AsyncSession, None]:
+        async with async_session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = _get_local_db
+    app.dependency_overrides[get_async_db] = _get_local_async_db
+    return session_factory
+
+
+async def _post_events(
+    client: httpx.AsyncClient, run_ids: list[int], count: int, interval: float, scenario: Scenario, stats: _Stats
+) -> None:
+    started = time.perf_counter()
+    for seq in range(count):
+        run_id = run_ids[seq % len(run_ids)]
+        sent_at = time.perf_counter()
+        payload = {
+            "event": "step.log",
+            "run_id": run_id,
+            "step_no": 1,
+            "stream": "stdout",
+            "line": f"loadtest line {seq}",
+            "sent_at": sent_at,
+        }
+        try:
+            response = await client.post(f"/v1/internal/runs/{run_id}/events", json=payload)
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        elapsed_ms = (time.perf_counter() - sent_at) * 1000
+        stats.post_ms.append(elapsed_ms)
+        if ok:
+            stats.posted += 1
+        else:
+            stats.failed += 1
+        if elapsed_ms > scenario.block_threshold_ms:
+            stats.blocked += 1
+        delay = started + (seq + 1) * interval - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def _poll_runs(client: httpx.AsyncClient, run_ids: list[int], interval: float, stop: asyncio.Event, stats: _Stats) -> None:
+    seq = 0
+    while not stop.is_set():
+        run_id = run_ids[seq % len(run_ids)]
+        seq += 1
+        started = time.perf_counter()
+        try:
+            await client.get(f"/v1/runs/{run_id}")
+        except httpx.HTTPError:
+            pass
+        stats.poll_ms.append((time.perf_counter() - started) * 1000)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except TimeoutError:
+            continue
+
+
+async def run_scenario(scenario: Scenario, app: FastAPI = api_app) -> ScenarioResult:
+    with tempfile.TemporaryDirectory(prefix="localops-loadtest-") as workdir:
+        session_factory = install_local_db(app, Path(workdir))
+        try:
+            run_ids = _seed_local_db(session_factory, scenario.runs)
+            viewers = [
+                AsgiViewer(app, f"/v1/ws/runs/{run_id}", scenario.viewer_delay)
+                for run_id in run_ids
+                for _ in range(scenario.viewers)
+            ]
+            for viewer in viewers:
+                await viewer.connect()
+
+            stats = _Stats()
+            total_events = max(1, int(scenario.event_rate * scenario.duration))
+            per_worker = max(1, total_events // max(1, scenario.workers))
+            interval = scenario.workers / scenario.event_rate if scenario.event_rate > 0 else 0.0
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://loadtest", headers={"x-api-key": settings.api_key}
+            ) as client:
+                stop = asyncio.Event()
+                pollers = [
+                    asyncio.create_task(_poll_runs(client, run_ids, scenario.poll_interval, stop, stats))
+                    for _ in range(scenario.pollers)
+                ]
+                cpu_started = time.process_time()
+                wall_started = time.perf_counter()
+                await asyncio.gather(
+                    *(_post_events(client, run_ids, per_worker, interval, scenario, stats) for _ in range(scenario.workers))
+                )
+                wall_elapsed = time.perf_counter() - wall_started
+                cpu_elapsed = time.process_time() - cpu_started
+                stop.set()
+                await asyncio.gather(*pollers)
+
+            for viewer in viewers:
+                await viewer.close()
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+            app.dependency_overrides.pop(get_async_db, None)
+
+    latencies = [value for viewer in viewers for value in viewer.latencies_ms]
+    deliveries = sum(viewer.received for viewer in viewers)
+    expected = stats.posted * scenario.viewers
+    return ScenarioResult(
+        runs=scenario.runs,
+        viewers=scenario.viewers,
+        event_rate=scenario.event_rate,
+        events_posted=stats.posted,
+        events_failed=stats.failed,
+        deliveries_expected=expected,
+        deliveries=deliveries,
+        dropped=max(0, expected - deliveries),
+        blocked=stats.blocked,
+        latency_p50_ms=round(percentile(latencies, 50), 3),
+        latency_p99_ms=round(percentile(latencies, 99), 3),
+        post_p99_ms=round(percentile(stats.post_ms, 99), 3),
+        poll_p50_ms=round(percentile(stats.poll_ms, 50), 3),
+        poll_p99_ms=round(percentile(stats.poll_ms, 99), 3),
+        throughput_per_s=round(deliveries / wall_elapsed, 1) if wall_elapsed > 0 else 0.0,
+        cpu_ms_per_1k_events=round(cpu_elapsed * 1000 / max(1, stats.posted) * 1000, 2),
+    )
+
+
+def _int_list(raw: str) -> list[int]:
+    return [int(item) for item in raw.split(",") if item.strip()]
+
+
+def _float_list(raw: str) -> list[float]:
+    return [float(item) for item in raw.split(",") if item.strip()]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="In-process API/websocket load test for LocalOps Copilot")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--viewers", type=_int_list, default=[1, 10, 50])
+    parser.add_argument("--rates", type=_float_list, default=[100.0, 500.0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=2.0)
+    parser.add_argument("--pollers", type=int, default=2)
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    parser.add_argument("--viewer-delay", type=float, default=0.0)
+    parser.add_argument("--block-threshold-ms", type=float, default=50.0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    results: list[ScenarioResult] = []
+    for viewers in args.viewers:
+        for rate in args.rates:
+            scenario = Scenario(
+                runs=args.runs,
+                viewers=viewers,
+                workers=args.workers,
+                event_rate=rate,
+                duration=args.duration,
+                pollers=args.pollers,
+                poll_interval=args.poll_interval,
+                viewer_delay=args.viewer_delay,
+                block_threshold_ms=args.block_threshold_ms,
+            )
+            results.append(asyncio.run(run_scenario(scenario)))
+
+    if args.json:
+        print(json.dumps([asdict(result) for result in results], indent=2))
+        return
+
+    header = f"{'viewers':>8} {'rate':>8} {'posted':>8} {'p50ms':>8} {'p99ms':>8} {'dropped':>8} {'blocked':>8} {'msg/s':>10} {'cpu/1k':>8}"
+    print(header)
+    for result in results:
+        print(
+            f"{result.viewers:>8} {result.event_rate:>8.0f} {result.events_posted:>8} {result.latency_p50_ms:>8.2f} "
+            f"{result.latency_p99_ms:>8.2f} {result.dropped:>8} {result.blocked:>8} {result.throughput_per_s:>10.1f} "
+            f"{result.cpu_ms_per_1k_events:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
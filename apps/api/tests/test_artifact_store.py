@@ -0,0 +1,60 @@
+import hashlib
+import io
+import os
+from pathlib import Path
+
+import pytest
+
+from app.services.artifacts.store import ArtifactStore, is_blob_ref
+
+
+def test_identical_contents_share_one_compressed_blob(tmp_path: Path) -> None:
+    store = ArtifactStore(tmp_path / "blobs")
+    report = ("# Run report\n" + "- step ok\n" * 500).encode("utf-8")
+
+    first = store.put_bytes(report)
+    second = store.put_stream(io.BytesIO(report))
+
+    assert first.ref == second.ref == f"blob:{hashlib.sha256(report).hexdigest()}"
+    assert first.size == len(report)
+    assert first.deduplicated is False and second.deduplicated is True
+    assert first.stored_size < len(report) // 10
+    assert store.read_bytes(first.ref) == report
+    assert [path.name for path in (tmp_path / "blobs").rglob("*.gz")] == [store.blob_path(first.sha256).name]
+    assert list((tmp_path / "blobs" / "tmp").iterdir()) == []
+
+
+def test_writer_hashes_while_streaming_and_aborts_cleanly(tmp_path: Path) -> None:
+    store = ArtifactStore(tmp_path / "blobs")
+    with store.writer() as writer:
+        writer.write(b"diff --git a/x b/x\n")
+        writer.write(b"+change\n")
+    assert writer.result is not None
+    assert writer.result.sha256 == hashlib.sha256(b"diff --git a/x b/x\n+change\n").hexdigest()
+
+    with pytest.raises(RuntimeError):
+        with store.writer() as failed:
+            failed.write(b"partial")
+            raise RuntimeError("boom")
+    assert failed.result is None
+    assert list((tmp_path / "blobs" / "tmp").iterdir()) == []
+
+
+def test_legacy_paths_remain_readable(tmp_path: Path) -> None:
+    legacy = tmp_path / "report.md"
+    legacy.write_text("old layout", encoding="utf-8")
+    store = ArtifactStore(tmp_path / "blobs")
+    assert not is_blob_ref(str(legacy))
+    assert store.read_bytes(str(legacy)) == b"old layout"
+    assert store.exists(str(legacy)) and not store.exists("blob:" + "0" * 64)
+
+
+def test_deduplicated_writes_refresh_the_blob_for_gc_grace(tmp_path: Path) -> None:
+    store = ArtifactStore(tmp_path / "blobs")
+    first = store.put_bytes(b"")
+    os.utime(store.blob_path(first.sha256), (0, 0))
+
+    second = store.put_bytes(b"")
+
+    assert second.deduplicated is True
+    assert store.blob_path(first.sha256).stat().st_mtime > 0
@@ -0,0 +1,154 @@
+import json
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.db.base import Base
+from app.db.models import Audit, Project, Run
+from app.db.session import get_async_db, get_db
+from app.main import app
+from app.services.audits.query import (
+    AuditFilter,
+    PayloadPredicate,
+    audits_stmt,
+    decode_cursor,
+    encode_cursor,
+    parse_predicate,
+    payload_condition,
+)
+from loadtest.api_load import install_local_db
+
+BASE = datetime(2026, 10, 1, 9, 0)
+
+
+def _seed(session: Session) -> None:
+    session.add(Project(id=1, name="demo", root_path="/repo"))
+    session.add(Project(id=2, name="other", root_path="/other"))
+    session.add_all(
+        [
+            Run(id=1, project_id=1, status="FAILED", sandbox_meta={}, risk_level="low"),
+            Run(id=2, project_id=2, status="FAILED", sandbox_meta={}, risk_level="low"),
+        ]
+    )
+    for minute in range(8):
+        session.add(
+            Audit(
+                run_id=1 if minute < 6 else 2,
+                actor="worker",
+                action="command.blocked" if minute % 2 else "step.executed",
+                payload_json={
+                    "step_no": minute,
+                    "command": "npm ci" if minute in {1, 3, 6} else "pytest -q",
+                    "sandbox": {"network": "bridge" if minute == 4 else "none"},
+                },
+                created_at=BASE + timedelta(minutes=minute),
+            )
+        )
+    session.commit()
+
+
+@pytest.fixture()
+def db() -> Iterator[Session]:
+    engine = create_engine("sqlite+pysqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as session:
+        _seed(session)
+        yield session
+
+
+@pytest.fixture()
+def client(tmp_path: Path) -> Iterator[TestClient]:
+    session_factory = install_local_db(app, tmp_path)
+    with session_factory() as session:
+        _seed(session)
+    try:
+        with TestClient(app, headers={"x-api-key": settings.api_key}) as test_client:
+            yield test_client
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_async_db, None)
+
+
+def _ids(db: Session, filters: AuditFilter, after=None, limit: int = 100) -> list[int]:
+    return [audit.id for audit in db.scalars(audits_stmt(filters, "sqlite", after, limit)).all()]
+
+
+def test_parse_predicate() -> None:
+    assert parse_predicate("sandbox.network!=none") == PayloadPredicate(("sandbox", "network"), "!=", "none")
+    assert parse_predicate("step_no=3") == PayloadPredicate(("step_no",), "=", 3)
+    assert parse_predicate("command~npm i") == PayloadPredicate(("command",), "~", "npm i")
+    assert parse_predicate("path=~/foo") == PayloadPredicate(("path",), "=", "~/foo")
+    assert parse_predicate("cmd=a!=b") == PayloadPredicate(("cmd",), "=", "a!=b")
+    assert parse_predicate("cmd~a=b") == PayloadPredicate(("cmd",), "~", "a=b")
+    for invalid in ("step_no", "=3", "command~"):
+        with pytest.raises(ValueError):
+            parse_predicate(invalid)
+
+
+def test_filters_on_columns_and_json_paths(db: Session) -> None:
+    blocked_npm = AuditFilter(actions=["command.blocked"], predicates=[parse_predicate("command~npm")], project_id=1)
+    assert _ids(db, blocked_npm) == [4, 2]
+    assert _ids(db, AuditFilter(predicates=[parse_predicate("sandbox.network!=none")])) == [5]
+    assert _ids(db, AuditFilter(predicates=[parse_predicate("step_no=6")])) == [7]
+    window = AuditFilter(run_id=1, since=BASE + timedelta(minutes=2), until=BASE + timedelta(minutes=4))
+    assert _ids(db, window) == [4, 3]
+
+
+def test_substring_predicates_match_wildcards_literally(db: Session) -> None:
+    db.add(Audit(run_id=1, actor="worker", action="step.executed", payload_json={"command": "echo 100%"}, created_at=BASE))
+    db.commit()
+    assert len(_ids(db, AuditFilter(predicates=[parse_predicate("command~0%")]))) == 1
+    assert _ids(db, AuditFilter(predicates=[parse_predicate("command~p_test")])) == []
+
+
+def test_keyset_cursor_walks_every_row_once(db: Session) -> None:
+    seen: list[int] = []
+    after = None
+    while True:
+        page = list(db.scalars(audits_stmt(AuditFilter(), "sqlite", after, 3)).all())
+        seen.extend(audit.id for audit in page)
+        if len(page) < 3:
+            break
+        after = decode_cursor(encode_cursor(page[-1].created_at, page[-1].id))
+    assert seen == list(range(8, 0, -1))
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_postgres_equality_uses_indexable_containment() -> None:
+    condition = payload_condition(parse_predicate("sandbox.network=none"), "postgresql")
+    compiled = condition.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    assert "@>" in str(compiled)
+    assert '{"sandbox": {"network": "none"}}' in str(compiled)
+
+
+def test_route_pages_with_cursor(client: TestClient) -> None:
+    seen: list[int] = []
+    params: dict[str, object] = {"limit": 3, "where": "step_no!=99"}
+    while True:
+        page = client.get("/v1/audits", params=params).json()
+        seen.extend(item["id"] for item in page["items"])
+        if page["next_cursor"] is None:
+            break
+        params["cursor"] = page["next_cursor"]
+    assert seen == list(range(8, 0, -1))
+
+
+def test_route_rejects_bad_predicates_and_cursors(client: TestClient) -> None:
+    assert client.get("/v1/audits", params={"where": "step_no"}).status_code == 400
+    assert client.get("/v1/audits", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_route_exports_ndjson(client: TestClient) -> None:
+    response = client.get("/v1/audits", params={"action": "command.blocked", "project_id": 1, "format": "ndjson"})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == [6, 4, 2]
+    assert rows[0]["payload_json"]["step_no"] == 5
@@ -0,0 +1,72 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.services.executor.checkpoints import (
+    CheckpointMissing,
+    checkpoint_steps,
+    checkpoints_root,
+    gc_checkpoints,
+    has_checkpoints,
+    inherit_checkpoints,
+    restore_checkpoints,
+    scan_workspace,
+    write_checkpoint,
+)
+
+
+@pytest.fixture(autouse=True)
+def _artifact_root(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "artifact_root", str(tmp_path / "data"))
+
+
+def _source(root: Path) -> Path:
+    (root / "src").mkdir(parents=True)
+    (root / "src" / "app.py").write_text("print('v1')\n")
+    (root / "old.txt").write_text("stale")
+    return root
+
+
+def _tree(root: Path) -> dict[str, str]:
+    return {
+        path.relative_to(root).as_posix(): path.read_text()
+        for path in sorted(root.rglob("*"))
+        if path.is_file()
+    }
+
+
+def test_checkpoints_replay_step_deltas_over_fresh_copy(tmp_path: Path) -> None:
+    workspace = _source(tmp_path / "run1")
+    manifest = scan_workspace(workspace)
+
+    (workspace / "build").mkdir()
+    (workspace / "build" / "out.bin").write_text("artifact")
+    manifest = write_checkpoint(1, 1, workspace, manifest)
+    (workspace / "old.txt").unlink()
+    (workspace / "src" / "app.py").write_text("print('patched')\n")
+    manifest = write_checkpoint(1, 2, workspace, manifest)
+    assert checkpoint_steps(1) == [1, 2]
+    assert has_checkpoints(1, [1, 2]) and not has_checkpoints(1, [1, 2, 3])
+
+    inherit_checkpoints(1, 2, [1, 2])
+    resumed = _source(tmp_path / "run2")
+    restore_checkpoints(2, [1, 2], resumed)
+    assert _tree(resumed) == _tree(workspace)
+
+    with pytest.raises(CheckpointMissing):
+        restore_checkpoints(2, [3], resumed)
+
+
+def test_gc_removes_oldest_runs_over_budget(tmp_path: Path) -> None:
+    workspace = tmp_path / "ws"
+    workspace.mkdir()
+    for run_id in (1, 2, 3):
+        (workspace / f"blob{run_id}").write_bytes(os.urandom(4096))
+        write_checkpoint(run_id, 1, workspace, {})
+        os.utime(checkpoints_root() / str(run_id), (run_id, run_id))
+
+    result = gc_checkpoints(budget_bytes=1, keep={1})
+    assert result["removed_runs"] == 2
+    assert sorted(path.name for path in checkpoints_root().iterdir()) == ["1"]
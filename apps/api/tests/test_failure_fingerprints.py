@@ -0,0 +1,62 @@
+from collections.abc import Iterator
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db.base import Base
+from app.db.models import Project, Run
+from app.services.failures.fingerprint import hamming, normalize_tail, simhash
+from app.services.failures.store import previous_run_counts, record_failure
+
+RESET_TAIL = [
+    "FAILED tests/test_api.py::test_fetch - ConnectionError: ECONNRESET at 0x7f3a2b1c",
+    '  File "/tmp/run-12-abcd/app/client.py", line 42, in fetch',
+    "E   requests.exceptions.ConnectionError: [Errno 104] Connection reset by peer",
+    "=== 1 failed, 33 passed in 2.31s ===",
+]
+NPM_TAIL = [
+    "npm ERR! code ERESOLVE",
+    "npm ERR! ERESOLVE unable to resolve dependency tree",
+    "npm ERR! Found: react@18.2.0",
+]
+
+
+@pytest.fixture()
+def db() -> Iterator[Session]:
+    engine = create_engine("sqlite+pysqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as session:
+        session.add(Project(id=1, name="demo", root_path="/repo"))
+        session.add_all(
+            Run(id=run_id, project_id=1, status="FAILED", sandbox_meta={}, risk_level="low") for run_id in range(1, 6)
+        )
+        session.commit()
+        yield session
+
+
+def _vary(run_id: int) -> list[str]:
+    return [line.replace("12", str(run_id)).replace("2.31", f"{run_id}.0{run_id}") for line in RESET_TAIL]
+
+
+def test_normalization_masks_volatile_tokens() -> None:
+    assert normalize_tail(_vary(3), 50) == normalize_tail(_vary(4), 50)
+    assert normalize_tail(RESET_TAIL, 50)[1] == 'file "/tmp/run-<id>-*/app/client.py", line <n>, in fetch'
+    assert hamming(simhash(normalize_tail(RESET_TAIL, 50)), simhash(normalize_tail(NPM_TAIL, 50))) > 10
+
+
+def test_near_duplicates_share_a_cluster(db: Session) -> None:
+    first = record_failure(db, 1, 1, 2, _vary(1))
+    other = record_failure(db, 2, 1, 1, NPM_TAIL)
+    again = record_failure(db, 3, 1, 2, _vary(3))
+    latest = record_failure(db, 4, 1, 2, _vary(4) + ["E   AssertionError"])
+    db.commit()
+
+    assert first is not None and other is not None and again is not None and latest is not None
+    assert first.cluster_id == first.id
+    assert other.cluster_id == other.id
+    assert again.cluster_id == first.id
+    assert latest.cluster_id == first.id
+    assert previous_run_counts(db, 4) == {2: 2}
+    assert previous_run_counts(db, 1) == {2: 0}
+    assert record_failure(db, 5, 1, 1, ["", "   "]) is None
@@ -0,0 +1,94 @@
+import os
+import shutil
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from app.services.search.index import IndexHit, build_index, iter_index_hits, open_index
+from app.services.search.keyword import RECENCY_HALF_LIFE_DAYS, KeywordRanker, iter_rg_hits, rank_hits, stream_hits
+
+
+def test_ranker_prefers_frequent_shallow_recent_hits(tmp_path: Path) -> None:
+    (tmp_path / "deep" / "er").mkdir(parents=True)
+    for rel in ("top.py", "deep/er/nested.py", "old.py"):
+        (tmp_path / rel).write_text("x\n")
+    now = 1_000_000_000.0
+    os.utime(tmp_path / "top.py", (now, now))
+    os.utime(tmp_path / "deep/er/nested.py", (now, now))
+    os.utime(tmp_path / "old.py", (now - 365 * 86400, now - 365 * 86400))
+    ranker = KeywordRanker(tmp_path, now=now)
+
+    def hit(rel: str, count: int = 1) -> IndexHit:
+        return IndexHit(path=str(tmp_path / rel), line_no=1, snippet="x", match_count=count)
+
+    assert ranker.score(hit("top.py", 3)) > ranker.score(hit("top.py"))
+    assert ranker.score(hit("top.py")) > ranker.score(hit("deep/er/nested.py"))
+    assert ranker.score(hit("top.py")) > ranker.score(hit("old.py"))
+
+
+def test_recency_boost_halves_after_half_life(tmp_path: Path) -> None:
+    now = 1_000_000_000.0
+    for rel, age_days in (("fresh.py", 0), ("month.py", RECENCY_HALF_LIFE_DAYS)):
+        (tmp_path / rel).write_text("x\n")
+        mtime = now - age_days * 86400
+        os.utime(tmp_path / rel, (mtime, mtime))
+    ranker = KeywordRanker(tmp_path, now=now)
+
+    def boost(rel: str) -> float:
+        return ranker.score(IndexHit(path=str(tmp_path / rel), line_no=1, snippet="x")) - 1
+
+    assert boost("month.py") == pytest.approx(boost("fresh.py") / 2)
+
+
+def test_rank_hits_only_consumes_candidate_window(tmp_path: Path) -> None:
+    consumed = 0
+
+    def endless() -> Iterator[IndexHit]:
+        nonlocal consumed
+        while True:
+            consumed += 1
+            yield IndexHit(path=str(tmp_path / "f.py"), line_no=consumed, snippet="needle")
+
+    ranked = rank_hits(endless(), KeywordRanker(tmp_path), 5)
+    assert len(ranked) == 5
+    assert consumed == 50
+    assert [score for score, _ in ranked] == sorted((score for score, _ in ranked), reverse=True)
+    assert len(list(stream_hits(endless(), KeywordRanker(tmp_path), 3))) == 3
+
+
+def test_stream_yields_the_ranked_results(tmp_path: Path) -> None:
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "deep.py").write_text("x\n")
+    (tmp_path / "top.py").write_text("x\n")
+    hits = [
+        IndexHit(path=str(tmp_path / "pkg" / "deep.py"), line_no=1, snippet="needle"),
+        IndexHit(path=str(tmp_path / "top.py"), line_no=1, snippet="needle needle", match_count=2),
+        IndexHit(path=str(tmp_path / "top.py"), line_no=2, snippet="needle"),
+    ]
+    ranker = KeywordRanker(tmp_path, now=0.0)
+    streamed = list(stream_hits((hit for hit in hits), ranker, 2))
+    assert streamed == rank_hits((hit for hit in hits), ranker, 2)
+    assert [(Path(hit.path).name, hit.line_no) for _, hit in streamed] == [("top.py", 1), ("top.py", 2)]
+
+
+def test_index_hits_count_matches_per_line(tmp_path: Path) -> None:
+    root = tmp_path / "repo"
+    root.mkdir()
+    (root / "a.py").write_text("retry retry retry\nno match\nretry once\n")
+    build_index(root, tmp_path / "index")
+    reader = open_index(tmp_path / "index")
+    assert reader is not None
+    hits = list(iter_index_hits(reader, root, "retry"))
+    assert [(hit.line_no, hit.match_count) for hit in hits] == [(1, 3), (3, 1)]
+
+
+@pytest.mark.skipif(shutil.which("rg") is None, reason="ripgrep not installed")
+def test_rg_hits_stream_fixed_strings(tmp_path: Path) -> None:
+    (tmp_path / "a.txt").write_text("".join(f"value.{i} value.{i}\n" for i in range(5000)))
+    (tmp_path / "b.txt").write_text("valueX\n")
+    hits = iter_rg_hits(tmp_path, "value.")
+    first = next(hits)
+    hits.close()
+    assert first.match_count == 2
+    assert not any(hit.path.endswith("b.txt") for hit in iter_rg_hits(tmp_path, "value."))
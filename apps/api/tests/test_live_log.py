@@ -0,0 +1,52 @@
+from app.services.executor.output import LiveLogLimiter, OutputLine, split_output
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_split_output_coalesces_carriage_return_redraws() -> None:
+    raw = "Collecting x\r\n10%\r50%\r100%\nDone ✓\npartial".encode()
+    chunks = [raw[index : index + 3] for index in range(0, len(raw), 3)]
+    assert list(split_output(chunks)) == [
+        OutputLine("Collecting x"),
+        OutputLine("10%", progress=True),
+        OutputLine("50%", progress=True),
+        OutputLine("100%"),
+        OutputLine("Done ✓"),
+        OutputLine("partial"),
+    ]
+    assert list(split_output([b"a\r", b"\nb\r"])) == [OutputLine("a"), OutputLine("b", progress=True)]
+
+
+def test_limiter_caps_live_events_and_reports_suppressed_lines() -> None:
+    clock = Clock()
+    limiter = LiveLogLimiter(rate_per_second=10, burst=5, progress_interval=0.5, max_line_chars=20, clock=clock)
+    events = [event for index in range(100_000) for event in limiter.offer(OutputLine(f"line {index}"))]
+    assert [event["line"] for event in events] == [f"line {index}" for index in range(5)]
+
+    clock.now = 1.0
+    events = limiter.offer(OutputLine("after pause"))
+    assert events == [
+        {"line": "… 99995 lines suppressed", "suppressed": 99995},
+        {"line": "after pause"},
+    ]
+    assert limiter.offer(OutputLine("x" * 30)) == [{"line": "x" * 20 + "… [10 chars truncated]"}]
+    assert limiter.flush() == []
+    assert limiter.summary() == {"emitted": 8, "suppressed": 99995}
+
+
+def test_limiter_throttles_progress_frames() -> None:
+    clock = Clock()
+    limiter = LiveLogLimiter(rate_per_second=100, burst=100, progress_interval=0.5, max_line_chars=100, clock=clock)
+    emitted = []
+    for frame in range(100):
+        clock.now = frame * 0.01
+        emitted += limiter.offer(OutputLine(f"{frame}%", progress=True))
+    assert emitted == [{"line": "0%", "progress": True}, {"line": "50%", "progress": True}]
+    limiter.suppressed = 2
+    assert limiter.flush() == [{"line": "… 2 lines suppressed", "suppressed": 2}]
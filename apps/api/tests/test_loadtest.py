@@ -0,0 +1,18 @@
+import asyncio
+
+from loadtest.api_load import Scenario, percentile, run_scenario
+
+
+def test_percentile() -> None:
+    assert percentile([], 99) == 0.0
+    assert percentile([1.0, 2.0, 3.0, 4.0, 5.0], 50) == 3.0
+    assert percentile([1.0, 2.0, 3.0, 4.0, 5.0], 99) == 5.0
+
+
+def test_small_scenario_delivers_every_event() -> None:
+    scenario = Scenario(runs=2, viewers=3, workers=2, event_rate=100.0, duration=0.2, pollers=1, poll_interval=0.05)
+    result = asyncio.run(run_scenario(scenario))
+    assert result.events_posted == 20
+    assert result.events_failed == 0
+    assert result.deliveries == result.deliveries_expected == 60
+    assert result.dropped == 0
@@ -0,0 +1,70 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.services.search.index import trigram_keys
+from app.services.search.logs import (
+    MANIFEST_FILE,
+    add_step_log,
+    candidate_logs,
+    read_trigram_keys,
+    rebuild_log_index,
+    search_logs,
+)
+
+
+def _write_log(logs_root: Path, run_id: int, step_no: int, text: str) -> Path:
+    log_path = logs_root / str(run_id) / f"{step_no}.out"
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    log_path.write_text(text)
+    return log_path
+
+
+def test_step_logs_are_merged_into_tiers(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "log_index_merge_factor", 3)
+    logs_root = tmp_path / "logs"
+    index_dir = tmp_path / "logindex"
+    for run_id in range(1, 10):
+        text = "collecting\nrequests.exceptions.ConnectionError: ECONNRESET\n" if run_id % 3 == 0 else "12 passed\n"
+        add_step_log(index_dir, run_id, 1, _write_log(logs_root, run_id, 1, text))
+
+    manifest = json.loads((index_dir / MANIFEST_FILE).read_text())
+    assert [(entry["level"], entry["docs"]) for entry in manifest["segments"]] == [(2, 9)]
+    assert sorted(path.name for path in index_dir.glob("seg-*")) == [manifest["segments"][0]["name"]]
+
+    hits = search_logs(index_dir, "ECONNRESET", None, 10)
+    assert [(hit.run_id, hit.step_no, hit.line_no) for hit in hits] == [(9, 1, 2), (6, 1, 2), (3, 1, 2)]
+    assert [hit.run_id for hit in search_logs(index_dir, "econnreset", {3, 4}, 10)] == [3]
+    assert search_logs(index_dir, "Econnreset", None, 10) == []
+    assert len(search_logs(index_dir, "ECONNRESET", None, 2)) == 2
+
+
+def test_reindexed_step_shadows_older_segment(tmp_path: Path) -> None:
+    logs_root = tmp_path / "logs"
+    index_dir = tmp_path / "logindex"
+    log_path = _write_log(logs_root, 1, 1, "timeout waiting for db\n")
+    add_step_log(index_dir, 1, 1, log_path)
+    log_path.write_text("all good\n")
+    add_step_log(index_dir, 1, 1, log_path)
+    assert candidate_logs(index_dir, "timeout") == []
+    assert [doc.run_id for doc in candidate_logs(index_dir, "good")] == [1]
+
+
+def test_rebuild_from_log_directory(tmp_path: Path) -> None:
+    logs_root = tmp_path / "logs"
+    index_dir = tmp_path / "logindex"
+    _write_log(logs_root, 4, 2, "flaky ECONNRESET\n")
+    _write_log(logs_root, 5, 1, "ok\n")
+    (logs_root / "5" / "1.err").write_text("ECONNRESET")
+    assert rebuild_log_index(index_dir, logs_root) == {"docs": 2, "segments": 1}
+    hits = search_logs(index_dir, "ECONNRESET", None, 10)
+    assert [(hit.run_id, hit.step_no, hit.snippet) for hit in hits] == [(4, 2, "flaky ECONNRESET")]
+
+
+def test_streamed_trigrams_span_block_boundaries(monkeypatch: pytest.MonkeyPatch) -> None:
+    data = b"Traceback: ConnectionResetError ECONNRESET\n" * 3
+    monkeypatch.setattr("app.services.search.logs.READ_BLOCK_BYTES", 5)
+    assert read_trigram_keys(io.BytesIO(data)) == trigram_keys(data)
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine
+
+from app.db.partitions import (
+    add_months,
+    create_partition_sql,
+    drop_partitions_before,
+    ensure_partitions,
+    month_start,
+    partition_floor,
+    split_default_partition_sql,
+)
+
+
+def test_month_arithmetic_crosses_years() -> None:
+    assert month_start(datetime(2026, 12, 31, 23, 30, tzinfo=timezone(timedelta(hours=-2)))) == datetime(
+        2027, 1, 1, tzinfo=timezone.utc
+    )
+    assert add_months(datetime(2026, 11, 1, tzinfo=timezone.utc), 3) == datetime(2027, 2, 1, tzinfo=timezone.utc)
+    assert add_months(datetime(2026, 1, 1, tzinfo=timezone.utc), -1) == datetime(2025, 12, 1, tzinfo=timezone.utc)
+    assert partition_floor(datetime(2026, 10, 19, 8, 0)) == datetime(2026, 10, 1)
+
+
+def test_partition_ddl_covers_one_month() -> None:
+    assert create_partition_sql("audits", datetime(2026, 12, 5, tzinfo=timezone.utc)) == (
+        "CREATE TABLE IF NOT EXISTS audits_p202612 PARTITION OF audits "
+        "FOR VALUES FROM ('2026-12-01T00:00:00+00:00') TO ('2027-01-01T00:00:00+00:00')"
+    )
+
+
+def test_partition_maintenance_is_a_noop_outside_postgres() -> None:
+    with create_engine("sqlite+pysqlite:///:memory:").connect() as connection:
+        now = datetime(2026, 10, 19, tzinfo=timezone.utc)
+        assert ensure_partitions(connection, now, 3) == []
+        assert drop_partitions_before(connection, now) == []
+
+
+def test_rows_in_default_partition_move_into_new_month() -> None:
+    assert split_default_partition_sql("audits", datetime(2026, 12, 5, tzinfo=timezone.utc)) == [
+        "ALTER TABLE audits DETACH PARTITION audits_pdefault",
+        create_partition_sql("audits", datetime(2026, 12, 1, tzinfo=timezone.utc)),
+        "INSERT INTO audits SELECT * FROM audits_pdefault "
+        "WHERE created_at >= '2026-12-01T00:00:00+00:00' AND created_at < '2027-01-01T00:00:00+00:00'",
+        "DELETE FROM audits_pdefault "
+        "WHERE created_at >= '2026-12-01T00:00:00+00:00' AND created_at < '2027-01-01T00:00:00+00:00'",
+        "ALTER TABLE audits ATTACH PARTITION audits_pdefault DEFAULT",
+    ]
@@ -0,0 +1,95 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.services.planner.registry import AhoCorasick, CompiledRules, PlannerRegistry
+from app.services.planner.rule_planner import generate_plan
+
+
+def _step(commands: list[str]) -> dict:
+    return {"id": "s1", "type": "inspect", "title": "t", "commands": commands, "dangerous": False, "network_required": False}
+
+
+def _config(rules: list[dict]) -> dict:
+    return {
+        "default_template": "noop",
+        "templates": {
+            "noop": {"risk_level": "medium", "steps": [_step(["ls"])]},
+            "grep": {"risk_level": "low", "steps": [_step(["rg -n \"${pattern}\" ."])]},
+        },
+        "rules": rules,
+    }
+
+
+def test_aho_corasick_finds_overlapping_keywords() -> None:
+    matcher = AhoCorasick(["he", "she", "his", "hers", "单测"])
+    assert matcher.search("ushers") == {0, 1, 3}
+    assert matcher.search("运行单测") == {4}
+    assert matcher.search("nothing") == set()
+
+
+def test_default_rules_keep_existing_plans() -> None:
+    plan = generate_plan("运行单测并生成报告")
+    assert plan["intent"] == "运行单测并生成报告"
+    assert [step["commands"] for step in plan["steps"]] == [["git status"], ["pytest -q"]]
+    assert generate_plan("build then test")["steps"][1]["commands"] == ["pytest -q"]
+    assert generate_plan("Build")["steps"][1]["commands"] == ["pnpm build"]
+    assert generate_plan("看看日志")["steps"][0]["commands"] == ['rg -n "error|exception|traceback" .']
+    assert generate_plan("整理一下")["risk_level"] == "medium"
+    generate_plan("运行单测")["steps"].clear()
+    assert len(generate_plan("运行单测")["steps"]) == 2
+    mutated = generate_plan("运行单测")
+    mutated["steps"][1]["commands"].append("rm -rf /")
+    mutated["steps"][1]["type"] = "sharded_test"
+    mutated["assumptions"].append("changed")
+    fresh = generate_plan("运行单测")
+    assert "rm -rf /" not in fresh["steps"][1]["commands"] and fresh["steps"][1]["type"] != "sharded_test"
+    assert "changed" not in fresh["assumptions"]
+
+
+def test_priority_and_parameters() -> None:
+    rules = CompiledRules(
+        _config(
+            [
+                {"id": "low", "priority": 1, "keywords": ["timeout"], "template": "grep", "params": {"pattern": "timeout"}},
+                {"id": "high", "priority": 9, "keywords": ["oom"], "template": "grep", "params": {"pattern": "OOMKilled"}},
+            ]
+        )
+    )
+    rule = rules.match("OOM and timeout")
+    assert rule is not None and rule.rule_id == "high"
+    assert rule.template.render("x")["steps"][0]["commands"] == ['rg -n "OOMKilled" .']
+    assert rules.match("all good") is None
+
+    with pytest.raises(ValueError, match="missing parameters"):
+        CompiledRules(_config([{"id": "bad", "keywords": ["x"], "template": "grep"}]))
+
+
+def test_rules_hot_reload(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    rules_path = tmp_path / "rules.json"
+    rules_path.write_text(json.dumps(_config([{"id": "a", "keywords": ["disk"], "template": "noop"}])))
+    monkeypatch.setattr(settings, "planner_rules_path", str(rules_path))
+    registry = PlannerRegistry()
+    assert registry.rules().match("disk full") is not None
+
+    rules_path.write_text(json.dumps(_config([{"id": "b", "keywords": ["memory"], "template": "noop"}])))
+    os.utime(rules_path, ns=(1, 1))
+    assert registry.rules().match("disk full") is None
+    assert registry.rules().match("memory") is not None
+
+    rules_path.write_text("{broken")
+    os.utime(rules_path, ns=(2, 2))
+    assert registry.rules().match("memory") is not None
+
+    rules_path.unlink()
+    assert registry.rules().match("memory") is not None
+
+
+def test_adapt_templates_need_inspect_and_execute_steps() -> None:
+    config = _config([])
+    config["templates"]["tests"] = {"risk_level": "low", "adapt": "test", "steps": [_step(["pytest -q"])]}
+    with pytest.raises(ValueError, match="adapt templates"):
+        CompiledRules(config)
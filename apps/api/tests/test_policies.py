@@ -1,4 +1,16 @@
-from app.services.executor.policies import validate_command_policy
+import json
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.services.executor.policies import (
+    DEFAULT_RULES,
+    PolicyEngine,
+    PolicyRegistry,
+    split_command,
+    validate_command_policy,
+)
 
 
 def test_allowlist_command_allowed() -> None:
@@ -17,3 +29,59 @@ def test_unknown_command_blocked() -> None:
     ok, reason = validate_command_policy("curl https://example.com")
     assert ok is False
     assert "allowlist" in reason
+
+
+def test_every_command_in_a_pipeline_is_checked() -> None:
+    assert validate_command_policy("git status && pytest -q 2>&1 | rg FAILED") == (True, "ok")
+    ok, reason = validate_command_policy("pytest -q; curl https://example.com")
+    assert ok is False
+    assert "'curl'" in reason
+
+
+def test_each_line_is_checked_as_a_command() -> None:
+    assert validate_command_policy("git status\ncurl http://x")[0] is False
+    assert validate_command_policy("git status\r\nrm -rf ~")[0] is False
+    assert validate_command_policy("git status\npytest -q") == (True, "ok")
+    assert validate_command_policy('echo "a\nb"') == (True, "ok")
+
+
+def test_paths_to_allowlisted_names_are_blocked() -> None:
+    assert validate_command_policy("./git --version")[0] is False
+    assert validate_command_policy("/tmp/x/pytest")[0] is False
+
+
+def test_substitutions_are_checked() -> None:
+    assert validate_command_policy("echo $(curl https://example.com)")[0] is False
+    assert validate_command_policy('echo "`wget x`"')[0] is False
+    assert validate_command_policy("echo 'a;b|c'") == (True, "ok")
+
+
+def test_split_command_handles_operators() -> None:
+    assert split_command("FOO=1 pytest -q > out.txt 2>&1 || (cd sub; npm test)") == [
+        ["pytest", "-q", "2"],
+        ["cd", "sub"],
+        ["npm", "test"],
+    ]
+
+
+def test_project_rules_from_config(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    config_path = tmp_path / "policy.json"
+    config_path.write_text(
+        json.dumps({"projects": {"7": {"allow": ["make"], "block": ["npm"], "deny_patterns": [r"\bmake\s+clean\b"]}}})
+    )
+    monkeypatch.setattr(settings, "policy_config_path", str(config_path))
+    registry = PolicyRegistry()
+    engine = registry.engine_for(7)
+    assert engine.check("make test") == (True, "ok")
+    assert engine.check("make clean")[1] == "dangerous pattern blocked"
+    assert engine.check("npm test")[0] is False
+    assert engine.check("rm -rf /")[0] is False
+    assert registry.engine_for(8).check("make test")[0] is False
+    assert registry.engine_for(7) is engine
+
+
+def test_validate_plan_reports_each_violation() -> None:
+    engine = PolicyEngine(DEFAULT_RULES)
+    plan = {"steps": [{"id": "s1", "commands": ["git status", "curl x"]}, {"id": "s2", "commands": ["mkfs /dev/sda"]}]}
+    assert [(item["step"], item["command"]) for item in engine.validate_plan(plan)] == [("s1", "curl x"), ("s2", "mkfs /dev/sda")]
+    assert engine.check("pytest -q") is engine.check("pytest -q")
@@ -0,0 +1,74 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.services.executor.policies import policy_registry
+from app.services.fingerprint.project_fingerprint import project_fingerprint
+from app.services.planner.rule_planner import generate_plan
+
+
+@pytest.fixture(autouse=True)
+def _artifact_root(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "artifact_root", str(tmp_path / "data"))
+
+
+def _make_repo(root: Path) -> None:
+    (root / "src").mkdir(parents=True)
+    (root / "tests").mkdir()
+    (root / "node_modules" / "dep").mkdir(parents=True)
+    (root / "pyproject.toml").write_text("[project]\nname='demo'\n[project.optional-dependencies]\ndev=['pytest']\n")
+    (root / "package.json").write_text(json.dumps({"scripts": {"build": "vite build"}, "devDependencies": {"vitest": "1"}}))
+    (root / "pnpm-lock.yaml").write_text("lockfileVersion: 9\n")
+    (root / "src" / "app.py").write_text("print('hi')\n")
+    (root / "src" / "main.ts").write_text("export {}\n")
+    (root / "tests" / "test_app.py").write_text("def test_ok():\n    pass\n")
+    (root / "node_modules" / "dep" / "index.js").write_text("")
+
+
+def test_fingerprint_detects_toolchain(tmp_path: Path) -> None:
+    root = tmp_path / "repo"
+    _make_repo(root)
+    fingerprint = project_fingerprint(1, root)
+    assert fingerprint["languages"] == ["javascript", "python", "typescript"]
+    assert fingerprint["package_managers"] == ["pip", "pnpm"]
+    assert set(fingerprint["lockfiles"]) == {"pnpm-lock.yaml"}
+    assert fingerprint["test_frameworks"] == ["pytest", "vitest"]
+    assert fingerprint["scripts"] == ["build"]
+    assert fingerprint["file_count"] == 6
+    assert fingerprint["rescanned_dirs"] == 3
+
+
+def test_fingerprint_refreshes_only_changed_dirs(tmp_path: Path) -> None:
+    root = tmp_path / "repo"
+    _make_repo(root)
+    first = project_fingerprint(1, root)
+    assert project_fingerprint(1, root) == first
+
+    (root / "src" / "extra.py").write_text("x = 1\n")
+    refreshed = project_fingerprint(1, root)
+    assert refreshed["rescanned_dirs"] == 1
+    assert refreshed["file_count"] == first["file_count"] + 1
+    assert refreshed["key"] == first["key"]
+
+    (root / "pnpm-lock.yaml").write_text("lockfileVersion: 9\npackages: {}\n")
+    assert project_fingerprint(1, root)["key"] != first["key"]
+
+
+def test_planner_uses_fingerprint(tmp_path: Path) -> None:
+    root = tmp_path / "repo"
+    _make_repo(root)
+    fingerprint = project_fingerprint(1, root)
+
+    test_plan = generate_plan("运行单测", fingerprint)
+    assert test_plan["project_fingerprint"] == fingerprint["key"]
+    assert test_plan["steps"][1]["commands"] == ["pytest -q"]
+    assert generate_plan("build it", fingerprint)["steps"][1]["commands"] == ["pnpm build"]
+    assert policy_registry.engine_for(1).validate_plan(test_plan) == []
+
+    empty = tmp_path / "empty"
+    empty.mkdir()
+    bare_plan = generate_plan("run tests", project_fingerprint(2, empty))
+    assert [step["type"] for step in bare_plan["steps"]] == ["inspect"]
+    assert generate_plan("run tests")["steps"][1]["commands"] == ["pytest -q"]
@@ -0,0 +1,92 @@
+import os
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.db.base import Base
+from app.db.models import Artifact, Audit, Project, Run, RunStep
+from app.services.artifacts.store import artifact_store
+from app.services.retention.archive import archive_path, read_log
+from app.services.retention.policy import apply_retention, expired_runs_stmt
+
+NOW = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture()
+def db(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Session]:
+    monkeypatch.setattr(settings, "artifact_root", str(tmp_path / "data"))
+    monkeypatch.setattr(settings, "retention_archive_after_days", 7)
+    monkeypatch.setattr(settings, "retention_failed_archive_after_days", 30)
+    monkeypatch.setattr(settings, "retention_keep_runs_per_project", 3)
+    engine = create_engine("sqlite+pysqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as session:
+        session.add(Project(id=1, name="demo", root_path="/repo"))
+        session.commit()
+        yield session
+
+
+def _add_run(db: Session, run_id: int, status: str, age_days: int) -> None:
+    finished = NOW - timedelta(days=age_days)
+    db.add(Run(id=run_id, project_id=1, status=status, sandbox_meta={}, risk_level="low", finished_at=finished))
+    logs_dir = Path(settings.artifact_root) / "logs" / str(run_id)
+    logs_dir.mkdir(parents=True)
+    stdout_path = logs_dir / "1.out"
+    stdout_path.write_text(f"run {run_id} collected 12 items\n" * 20, encoding="utf-8")
+    db.add(RunStep(run_id=run_id, step_no=1, type="execute", command="pytest -q", status="SUCCEEDED", stdout_path=str(stdout_path)))
+    blob = artifact_store().put_bytes(f"# Run {run_id} Report".encode())
+    db.add(Artifact(run_id=run_id, kind="report", path=blob.ref, sha256=blob.sha256, size=blob.size))
+    db.commit()
+
+
+def test_policy_uses_age_status_and_count(db: Session, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "retention_keep_runs_per_project", 4)
+    _add_run(db, 1, "SUCCEEDED", 10)
+    _add_run(db, 2, "FAILED", 10)
+    _add_run(db, 3, "FAILED", 40)
+    _add_run(db, 4, "SUCCEEDED", 1)
+    _add_run(db, 5, "SUCCEEDED", 1)
+    _add_run(db, 6, "RUNNING", 100)
+    assert db.scalars(expired_runs_stmt(NOW)).all() == [1, 3]
+    _add_run(db, 7, "CANCELLED", 0)
+    assert db.scalars(expired_runs_stmt(NOW)).all() == [1, 2, 3]
+
+
+def test_expired_runs_are_packed_and_stay_readable(db: Session) -> None:
+    _add_run(db, 1, "SUCCEEDED", 10)
+    _add_run(db, 2, "SUCCEEDED", 1)
+    original = str(Path(settings.artifact_root) / "logs" / "1" / "1.out")
+
+    report = apply_retention(db, NOW)
+    assert report["archived_runs"] == 1
+    assert report["reclaimed_bytes"] > 0
+    assert not Path(original).exists()
+
+    step = db.scalar(select(RunStep).where(RunStep.run_id == 1))
+    assert step.stdout_path == f"{archive_path(1)}!logs/1.out"
+    assert read_log(step.stdout_path).startswith(b"run 1 collected")
+    assert read_log(original) == read_log(step.stdout_path)
+    assert db.get(Run, 1).sandbox_meta["archive"] == str(archive_path(1))
+    assert [audit.action for audit in db.scalars(select(Audit)).all()] == ["run.archived"]
+    assert apply_retention(db, NOW)["archived_runs"] == 0
+
+
+def test_budget_purges_oldest_archives_and_unreferenced_blobs(db: Session, monkeypatch: pytest.MonkeyPatch) -> None:
+    for run_id in (1, 2, 3):
+        _add_run(db, run_id, "SUCCEEDED", 20)
+    for blob in Path(settings.artifact_root, "blobs").rglob("*.gz"):
+        os.utime(blob, (0, 0))
+    monkeypatch.setattr(settings, "retention_budget_bytes", 1)
+
+    report = apply_retention(db, NOW)
+    assert report["archived_runs"] == 3
+    assert report["purged_runs"] == 3
+    assert report["deleted_blobs"] == 3
+    assert db.scalars(select(Artifact)).all() == []
+    assert db.scalar(select(RunStep).where(RunStep.run_id == 1)).stdout_path is None
+    assert not archive_path(1).exists()
@@ -0,0 +1,130 @@
+import asyncio
+import os
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.base import Base
+from app.db.models import Audit, Plan, Project, Run, RunStep
+from app.services.executor.journal import RunJournal, journal_path, recover_journal
+
+STEPS = 120
+
+
+@pytest.fixture()
+def database(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[tuple[Path, list[int]]]:
+    monkeypatch.setattr(settings, "artifact_root", str(tmp_path / "data"))
+    db_path = tmp_path / "journal.db"
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Project(id=1, name="p", root_path="/nonexistent"))
+        db.add(Plan(id=1, project_id=1, intent_text="journal", plan_json={"steps": []}))
+        db.add(Run(id=1, project_id=1, plan_id=1, status="RUNNING", sandbox_meta={}, risk_level="low"))
+        db.add_all(RunStep(run_id=1, step_no=no, type="shell", command=f"echo {no}", status="QUEUED") for no in range(1, STEPS + 1))
+        db.commit()
+        step_ids = list(db.scalars(select(RunStep.id).order_by(RunStep.step_no)))
+    engine.dispose()
+    yield db_path, step_ids
+
+
+async def _with_sessions(db_path: Path, work) -> tuple[object, int]:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    statements = 0
+
+    def count(*_: object) -> None:
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        result = await work(async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False))
+    finally:
+        await engine.dispose()
+    return result, statements
+
+
+def _state(db_path: Path) -> tuple[list[tuple[str, int | None]], list[str], int]:
+    engine = create_engine(f"sqlite:///{db_path}")
+    with Session(engine) as db:
+        steps = [(step.status, step.exit_code) for step in db.scalars(select(RunStep).order_by(RunStep.step_no))]
+        audits = list(db.scalars(select(Audit.action).order_by(Audit.id)))
+        seq = db.scalar(select(Run.journal_seq).where(Run.id == 1))
+    engine.dispose()
+    return steps, audits, seq
+
+
+def test_steps_and_audits_flush_in_constant_round_trips(database: tuple[Path, list[int]]) -> None:
+    db_path, step_ids = database
+
+    async def work(factory: async_sessionmaker[AsyncSession]) -> int:
+        journal = RunJournal(1, factory, flush_seconds=3600)
+        journal.start()
+        for step_id in step_ids:
+            step = RunStep(id=step_id)
+            journal.update_step(step, status="RUNNING", started_at=datetime.now(timezone.utc))
+            journal.update_step(step, status="SUCCEEDED", exit_code=0, finished_at=datetime.now(timezone.utc))
+            journal.audit("step.executed", {"step_id": step_id, "exit_code": 0})
+        await journal.flush()
+        await journal.close()
+        return journal.flushes
+
+    flushes, statements = asyncio.run(_with_sessions(db_path, work))
+
+    steps, audits, seq = _state(db_path)
+    assert flushes == 1
+    assert statements <= 6
+    assert steps == [("SUCCEEDED", 0)] * STEPS
+    assert audits == ["step.executed"] * STEPS
+    assert seq == STEPS * 3
+    assert not journal_path(1).exists()
+
+
+def test_timer_flushes_without_boundaries(database: tuple[Path, list[int]]) -> None:
+    db_path, step_ids = database
+
+    async def work(factory: async_sessionmaker[AsyncSession]) -> int:
+        journal = RunJournal(1, factory, flush_seconds=0.05)
+        journal.start()
+        journal.update_step(RunStep(id=step_ids[0]), status="RUNNING")
+        await asyncio.sleep(0.2)
+        flushes = journal.flushes
+        await journal.close()
+        return flushes
+
+    flushes, _ = asyncio.run(_with_sessions(db_path, work))
+
+    assert flushes == 1
+    assert _state(db_path)[0][0] == ("RUNNING", None)
+
+
+def test_recovery_replays_only_unflushed_entries(database: tuple[Path, list[int]]) -> None:
+    db_path, step_ids = database
+
+    async def crash(factory: async_sessionmaker[AsyncSession]) -> None:
+        journal = RunJournal(1, factory, flush_seconds=3600)
+        journal.update_step(RunStep(id=step_ids[0]), status="SUCCEEDED", exit_code=0)
+        journal.audit("step.executed", {"step_no": 1})
+        await journal.flush()
+        journal.update_step(RunStep(id=step_ids[1]), status="FAILED", exit_code=2)
+        journal.audit("step.executed", {"step_no": 2})
+        os.close(journal._fd)
+
+    asyncio.run(_with_sessions(db_path, crash))
+    with journal_path(1).open("a", encoding="utf-8") as handle:
+        handle.write('{"seq": 5, "audit": {"act')
+
+    replayed, _ = asyncio.run(_with_sessions(db_path, lambda factory: recover_journal(1, factory)))
+
+    steps, audits, seq = _state(db_path)
+    assert replayed == 2
+    assert steps[:3] == [("SUCCEEDED", 0), ("FAILED", 2), ("QUEUED", None)]
+    assert audits == ["step.executed", "step.executed"]
+    assert seq == 4
+    assert not journal_path(1).exists()
@@ -0,0 +1,146 @@
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.services.executor import images
+from app.services.executor.images import (
+    ImageBuildError,
+    dependency_lockfiles,
+    ensure_sandbox_image,
+    gc_sandbox_images,
+    image_key,
+    link_node_modules,
+    load_index,
+    node_manifests,
+    write_build_context,
+)
+
+POETRY_LOCK = """
+[[package]]
+name = "requests"
+version = "2.32.3"
+
+[[package]]
+name = "localpkg"
+version = "0.1.0"
+
+[package.source]
+type = "directory"
+url = "../localpkg"
+"""
+
+
+class FakeDocker:
+    def __init__(self) -> None:
+        self.images: dict[str, tuple[str, int]] = {"localops-sandbox-runner:latest": ("sha256:base", 100)}
+        self.builds: list[str] = []
+        self.removed: list[str] = []
+        self.fail_builds = False
+
+    def __call__(self, *args: str, timeout: float | None = 60) -> str:
+        if args[:2] == ("image", "inspect"):
+            if args[-1] not in self.images:
+                raise ImageBuildError("no such image")
+            image_id, size = self.images[args[-1]]
+            return f"{image_id} {size}"
+        if args[:2] == ("image", "rm"):
+            self.removed.append(args[-1])
+            self.images.pop(args[-1], None)
+            return ""
+        if args[0] == "build":
+            if self.fail_builds:
+                raise ImageBuildError("docker build failed: network is unreachable")
+            tag = args[args.index("-t") + 1]
+            self.builds.append(tag)
+            self.images[tag] = (f"sha256:{len(self.builds):064d}", 1000)
+            return ""
+        raise AssertionError(args)
+
+
+@pytest.fixture()
+def docker(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> FakeDocker:
+    monkeypatch.setattr(settings, "artifact_root", str(tmp_path / "data"))
+    (tmp_path / "data" / "mirror").mkdir(parents=True)
+    fake = FakeDocker()
+    monkeypatch.setattr(images, "_docker", fake)
+    return fake
+
+
+def _project(root: Path) -> Path:
+    root.mkdir()
+    (root / "requirements.txt").write_text("pytest==8.3.4\n-e .\n")
+    (root / "requirements-dev.txt").write_text("-r requirements.txt\nruff==0.8.4\n")
+    (root / "poetry.lock").write_text(POETRY_LOCK)
+    (root / "package.json").write_text('{"name": "demo"}')
+    (root / "pnpm-lock.yaml").write_text("lockfileVersion: '9.0'\n")
+    return root
+
+
+def test_key_tracks_lockfiles_and_node_manifests(tmp_path: Path) -> None:
+    root = _project(tmp_path / "repo")
+
+    def key_for(base_id: str = "sha256:base") -> str:
+        lockfiles = dependency_lockfiles(root)
+        return image_key(lockfiles, base_id, node_manifests(root, lockfiles))
+
+    key = key_for()
+    assert sorted(dependency_lockfiles(root)) == ["pnpm-lock.yaml", "poetry.lock", "requirements-dev.txt", "requirements.txt"]
+    assert key_for() == key
+    assert key_for("sha256:rebuilt-base") != key
+    (root / ".npmrc").write_text("node-linker=hoisted\n")
+    assert key_for() != key
+    key = key_for()
+    (root / "requirements.txt").write_text("pytest==8.3.5\n")
+    assert key_for() != key
+
+
+def test_build_context_is_offline_and_pinned(tmp_path: Path) -> None:
+    root = _project(tmp_path / "repo")
+    context = tmp_path / "context"
+    assert write_build_context(root, dependency_lockfiles(root), context)
+    assert (context / "lock" / "requirements.txt").read_text() == "pytest==8.3.4\n"
+    assert (context / "lock" / "poetry-requirements.txt").read_text() == "requests==2.32.3\n"
+    assert (context / "lock" / "node" / "package.json").exists()
+    dockerfile = (context / "Dockerfile").read_text()
+    assert "--no-index --find-links /mirror/pip" in dockerfile
+    assert "pnpm install --offline --frozen-lockfile" in dockerfile
+
+
+def test_image_is_built_once_and_reused(docker: FakeDocker, tmp_path: Path) -> None:
+    root = _project(tmp_path / "repo")
+    first = ensure_sandbox_image(1, root)
+    second = ensure_sandbox_image(2, root)
+    assert first.built and not second.built
+    assert first.ref == second.ref == "sha256:" + "1".zfill(64)
+    assert len(docker.builds) == 1
+    assert load_index()[first.key]["projects"] == [1, 2]
+    link_node_modules(second, root)
+    assert (root / "node_modules").readlink() == Path(images.NODE_MODULES)
+
+    docker.images.pop(first.tag)
+    assert ensure_sandbox_image(1, root).built
+    assert len(docker.builds) == 2
+
+
+def test_build_failure_falls_back_to_base_image(docker: FakeDocker, tmp_path: Path) -> None:
+    docker.fail_builds = True
+    image = ensure_sandbox_image(1, _project(tmp_path / "repo"))
+    assert image.ref == settings.sandbox_image
+    assert "network is unreachable" in image.meta()["error"]
+    empty = tmp_path / "empty"
+    empty.mkdir()
+    assert ensure_sandbox_image(1, empty).meta() == {"ref": settings.sandbox_image, "base": settings.sandbox_image}
+
+
+def test_gc_removes_least_recently_used_images(docker: FakeDocker, tmp_path: Path) -> None:
+    keys = []
+    for name in ("a", "b", "c"):
+        root = tmp_path / name
+        root.mkdir()
+        (root / "requirements.txt").write_text(f"{name}==1.0\n")
+        keys.append(ensure_sandbox_image(1, root).key)
+    ensure_sandbox_image(1, tmp_path / "a")
+    assert gc_sandbox_images(2000, keep={keys[2]}) == {"removed_images": 1, "bytes": 2000}
+    assert set(load_index()) == {keys[0], keys[2]}
+    assert docker.removed == [images.image_tag(keys[1])]
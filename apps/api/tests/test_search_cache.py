@@ -0,0 +1,114 @@
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.services.search.cache import (
+    UNINDEXED_STAMP,
+    GenerationStamps,
+    LruBytesCache,
+    SearchCache,
+    cache_key,
+)
+from app.services.search.index import build_index, index_dir_for
+
+
+def test_lru_is_bounded_by_bytes() -> None:
+    cache = LruBytesCache(max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    assert cache.get("a") == b"1234"
+    cache.put("c", b"1234")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1234"
+    assert cache.size_bytes == 8
+    cache.put("huge", b"x" * 11)
+    assert cache.get("huge") is None
+
+
+def test_lru_entries_expire(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [100.0]
+    monkeypatch.setattr("app.services.search.cache.time.monotonic", lambda: now[0])
+    cache = LruBytesCache(max_bytes=100)
+    cache.put("k", b"v", ttl_seconds=5)
+    assert cache.get("k") == b"v"
+    now[0] = 106.0
+    assert cache.get("k") is None
+    assert cache.size_bytes == 0
+
+
+def test_cache_key_normalizes_semantic_queries_only() -> None:
+    assert cache_key(1, "vector", "Retry  Policy", 10, "gen-000001") == cache_key(
+        1, "vector", "retry policy", 10, "gen-000001"
+    )
+    assert cache_key(1, "keyword", "Retry", 10, "gen-000001") != cache_key(1, "keyword", "retry", 10, "gen-000001")
+    assert cache_key(1, "vector", "retry", 10, "gen-000001") != cache_key(1, "vector", "retry", 10, "gen-000002")
+
+
+def test_generation_stamp_follows_published_index(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "artifact_root", str(tmp_path / "data"))
+    root = tmp_path / "repo"
+    root.mkdir()
+    (root / "a.py").write_text("print('hi')\n")
+    stamps = GenerationStamps(ttl_seconds=60)
+
+    assert stamps.get(7) == UNINDEXED_STAMP
+    build_index(root, index_dir_for(7))
+    assert stamps.get(7) == UNINDEXED_STAMP
+    stamps.invalidate(7)
+    assert stamps.get(7) == "gen-000001"
+
+
+def test_search_cache_round_trips_results() -> None:
+    cache = SearchCache(max_bytes=1024)
+    results = [{"path": "a.py", "snippet": "x", "line_range": [1, 1], "score": 1.0}]
+    assert cache.get("k") is None
+    cache.put("k", results)
+    assert cache.get("k") == results
+
+
+class _FakePipeline:
+    def __init__(self, store: dict[str, tuple[bytes, float]], now: list[float]) -> None:
+        self._store = store
+        self._now = now
+        self._replies: list[object] = []
+
+    def get(self, key: str) -> "_FakePipeline":
+        entry = self._store.get(key)
+        self._replies.append(entry[0] if entry and entry[1] > self._now[0] else None)
+        return self
+
+    def pttl(self, key: str) -> "_FakePipeline":
+        entry = self._store.get(key)
+        self._replies.append(int((entry[1] - self._now[0]) * 1000) if entry and entry[1] > self._now[0] else -2)
+        return self
+
+    def execute(self) -> list[object]:
+        return self._replies
+
+
+def test_redis_hit_keeps_remaining_ttl_locally(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [100.0]
+    monkeypatch.setattr("app.services.search.cache.time.monotonic", lambda: now[0])
+    store: dict[str, tuple[bytes, float]] = {}
+
+    class FakeRedis:
+        def set(self, key: str, value: bytes, ex: int) -> None:
+            store[key] = (value, now[0] + ex)
+
+        def pipeline(self, transaction: bool = True) -> _FakePipeline:
+            return _FakePipeline(store, now)
+
+    results = [{"path": "a.py", "snippet": "x", "line_range": [1, 1], "score": 1.0}]
+    writer = SearchCache(max_bytes=1024)
+    writer._redis = FakeRedis()
+    writer.put("k", results, ttl_seconds=30)
+    reader = SearchCache(max_bytes=1024)
+    reader._redis = FakeRedis()
+
+    now[0] = 110.0
+    assert reader.get("k") == results
+    assert reader.local.get("k") is not None
+    now[0] = 131.0
+    assert reader.local.get("k") is None
+    assert reader.get("k") is None
@@ -0,0 +1,149 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.services.search.index import (
+    build_index,
+    index_dir_for,
+    index_status,
+    line_offsets,
+    open_index,
+    refresh_index,
+    search_index,
+)
+
+
+def _make_repo(root: Path) -> None:
+    (root / "pkg").mkdir()
+    (root / "pkg" / "core.py").write_text("import os\n\ndef connect():\n    raise ConnectionError('ECONNRESET')\n")
+    (root / "README.md").write_text("Connection handling notes\n")
+    (root / "node_modules").mkdir()
+    (root / "node_modules" / "dep.js").write_text("ECONNRESET")
+    (root / "blob.bin").write_bytes(b"\0ECONNRESET")
+
+
+def test_line_offsets() -> None:
+    assert list(line_offsets(b"a\nbb\nc")) == [0, 2, 5]
+    assert list(line_offsets(b"a\nbb\n")) == [0, 2]
+
+
+def test_build_and_search(tmp_path: Path) -> None:
+    root = tmp_path / "repo"
+    root.mkdir()
+    _make_repo(root)
+    index_dir = tmp_path / "index"
+
+    meta = build_index(root, index_dir)
+    assert meta["generation"] == 1
+    assert meta["file_count"] == 2
+    assert index_status(index_dir)["generation"] == 1
+
+    reader = open_index(index_dir)
+    assert reader is not None
+    hits = search_index(reader, root, "ECONNRESET", 10)
+    assert [(Path(hit.path).name, hit.line_no) for hit in hits] == [("core.py", 4)]
+    assert "ConnectionError" in hits[0].snippet
+
+    smart_case = search_index(reader, root, "connection", 10)
+    assert {Path(hit.path).name for hit in smart_case} == {"README.md", "core.py"}
+    assert search_index(reader, root, "Connection", 10)[0].path.endswith("README.md")
+    assert search_index(reader, root, "missing-token", 10) == []
+
+
+def test_rebuild_publishes_new_generation(tmp_path: Path) -> None:
+    root = tmp_path / "repo"
+    root.mkdir()
+    _make_repo(root)
+    index_dir = tmp_path / "index"
+    build_index(root, index_dir)
+    (root / "new.txt").write_text("fresh content\n")
+    assert build_index(root, index_dir)["generation"] == 2
+
+    reader = open_index(index_dir)
+    assert reader is not None
+    assert reader.generation == 2
+    assert search_index(reader, root, "fresh", 10)[0].line_no == 1
+
+
+def test_refresh_only_touches_changed_files(tmp_path: Path) -> None:
+    root = tmp_path / "repo"
+    root.mkdir()
+    _make_repo(root)
+    index_dir = tmp_path / "index"
+    build_index(root, index_dir)
+    snapshot = open_index(index_dir)
+    assert snapshot is not None
+
+    assert refresh_index(root, index_dir)["mode"] == "unchanged"
+
+    (root / "README.md").write_text("Rewritten notes\n")
+    (root / "pkg" / "extra.py").write_text("VALUE = 'ECONNRESET'\n")
+    os.utime(root / "pkg" / "core.py", ns=(1, 1))
+    meta = refresh_index(root, index_dir)
+    assert (meta["mode"], meta["generation"]) == ("refresh", 2)
+    assert (meta["added"], meta["changed"], meta["deleted"]) == (1, 1, 0)
+
+    reader = open_index(index_dir)
+    assert reader is not None and reader.generation == 2
+    assert {Path(hit.path).name for hit in search_index(reader, root, "ECONNRESET", 10)} == {"core.py", "extra.py"}
+    assert search_index(reader, root, "handling", 10) == []
+    assert search_index(reader, root, "Rewritten", 10)[0].line_no == 1
+    assert snapshot.generation == 1
+    assert len(snapshot.files) == 2
+
+    (root / "pkg" / "extra.py").unlink()
+    meta = refresh_index(root, index_dir)
+    assert (meta["added"], meta["changed"], meta["deleted"]) == (0, 0, 1)
+
+
+def test_refresh_skips_artifact_root_inside_project(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    root = tmp_path / "workspace"
+    root.mkdir()
+    _make_repo(root)
+    monkeypatch.setattr(settings, "artifact_root", str(root / "data"))
+    index_dir = index_dir_for(1)
+    assert build_index(root, index_dir)["file_count"] == 2
+
+    (root / "data" / "logs" / "7").mkdir(parents=True)
+    (root / "data" / "logs" / "7" / "1.out").write_text("ECONNRESET\n")
+    assert refresh_index(root, index_dir)["mode"] == "unchanged"
+    assert refresh_index(root, index_dir)["mode"] == "unchanged"
+    assert index_status(index_dir)["generation"] == 1
+
+
+def test_refresh_writes_delta_segments_and_compacts(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "search_index_max_segments", 3)
+    root = tmp_path / "repo"
+    root.mkdir()
+    for index in range(20):
+        (root / f"mod_{index}.py").write_text(f"def handler_{index}():\n    return {index}\n")
+    index_dir = tmp_path / "index"
+    build_index(root, index_dir)
+
+    (root / "mod_3.py").write_text("def handler_3():\n    raise TimeoutError('delta')\n")
+    meta = refresh_index(root, index_dir)
+    assert (meta["segments"], meta["compacted"], meta["file_count"]) == (2, False, 20)
+    reader = open_index(index_dir)
+    assert [len(segment.files) for segment in reader.segments] == [20, 1]
+    assert [Path(hit.path).name for hit in search_index(reader, root, "TimeoutError", 10)] == ["mod_3.py"]
+    assert search_index(reader, root, "return 3", 10) == []
+    assert len(search_index(reader, root, "return 1", 20)) == 11
+
+    (root / "mod_4.py").unlink()
+    meta = refresh_index(root, index_dir)
+    assert (meta["segments"], meta["deleted"], meta["file_count"]) == (3, 1, 19)
+    assert search_index(open_index(index_dir), root, "handler_4", 10) == []
+
+    (root / "mod_5.py").write_text("VALUE = 'compacted'\n")
+    meta = refresh_index(root, index_dir)
+    assert (meta["segments"], meta["compacted"], meta["file_count"]) == (1, True, 19)
+    reader = open_index(index_dir)
+    assert [Path(hit.path).name for hit in search_index(reader, root, "TimeoutError", 10)] == ["mod_3.py"]
+    assert [Path(hit.path).name for hit in search_index(reader, root, "compacted", 10)] == ["mod_5.py"]
+    assert search_index(reader, root, "handler_4", 10) == []
+
+    (root / "mod_6.py").write_text("VALUE = 6\n")
+    assert refresh_index(root, index_dir)["segments"] == 2
+    assert sorted(path.name for path in index_dir.glob("gen-*")) == ["gen-000004", "gen-000005"]
@@ -0,0 +1,103 @@
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.services.planner.rule_planner import generate_plan
+from app.services.planner.test_impact import changed_since, git_head, parse_imports, refresh_import_graph, select_tests
+
+
+@pytest.fixture(autouse=True)
+def _artifact_root(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "artifact_root", str(tmp_path / "data"))
+
+
+def _make_repo(root: Path) -> None:
+    (root / "src" / "pkg").mkdir(parents=True)
+    (root / "tests").mkdir()
+    (root / "src" / "pkg" / "__init__.py").write_text("")
+    (root / "src" / "pkg" / "core.py").write_text("VALUE = 1\n")
+    (root / "src" / "pkg" / "service.py").write_text("from .core import VALUE\n")
+    (root / "src" / "pkg" / "cli.py").write_text("import pkg.service\n")
+    (root / "tests" / "test_service.py").write_text("from pkg.service import VALUE\n")
+    (root / "tests" / "test_cli.py").write_text("from pkg import cli\n")
+    (root / "tests" / "test_other.py").write_text("import json\n")
+
+
+def test_parse_imports_resolves_relative_imports() -> None:
+    assert parse_imports("src/pkg/service.py", b"from .core import VALUE\nfrom .. import util\nimport os") == [
+        "os",
+        "src",
+        "src.pkg.core",
+        "src.pkg.core.VALUE",
+        "src.util",
+    ]
+    assert parse_imports("broken.py", b"def (") == []
+
+
+def test_selects_tests_that_import_changed_modules(tmp_path: Path) -> None:
+    root = tmp_path / "repo"
+    _make_repo(root)
+
+    selection = select_tests(1, root, ["src/pkg/core.py"])
+    assert selection.full_suite is False
+    assert selection.tests == ("tests/test_cli.py", "tests/test_service.py")
+    assert selection.command() == "pytest -q tests/test_cli.py tests/test_service.py"
+
+    assert select_tests(1, root, ["src/pkg/cli.py"]).tests == ("tests/test_cli.py",)
+    assert select_tests(1, root, ["tests/test_other.py", "README.md"]).tests == ("tests/test_other.py",)
+    assert select_tests(1, root, ["conftest.py"]).full_suite is True
+    assert select_tests(1, root, ["data/fixture.json"]).full_suite is True
+    assert select_tests(1, root, None).command() == "pytest -q"
+
+
+def test_conftest_dependencies_select_every_test_below_it(tmp_path: Path) -> None:
+    root = tmp_path / "repo"
+    (root / "app").mkdir(parents=True)
+    (root / "tests").mkdir()
+    (root / "smoke").mkdir()
+    (root / "app" / "db.py").write_text("ENGINE = None\n")
+    (root / "tests" / "conftest.py").write_text("import app.db\n")
+    (root / "tests" / "test_a.py").write_text("def test_a(db):\n    pass\n")
+    (root / "tests" / "test_b.py").write_text("import app.db\n")
+    (root / "smoke" / "test_c.py").write_text("import json\n")
+
+    selection = select_tests(1, root, ["app/db.py"])
+
+    assert selection.full_suite is False
+    assert selection.tests == ("tests/test_a.py", "tests/test_b.py")
+
+
+def test_import_graph_reparses_only_changed_files(tmp_path: Path) -> None:
+    root = tmp_path / "repo"
+    _make_repo(root)
+    first = refresh_import_graph(1, root)
+    (root / "src" / "pkg" / "core.py").write_text("VALUE = 1\n")
+    (root / "tests" / "test_other.py").write_text("import pkg.core\n")
+    second = refresh_import_graph(1, root)
+    assert second["src/pkg/core.py"][0] == first["src/pkg/core.py"][0]
+    assert second["tests/test_other.py"][3] == ["pkg.core"]
+    assert select_tests(1, root, ["src/pkg/core.py"]).full_suite is True
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+def test_changes_since_recorded_head(tmp_path: Path) -> None:
+    root = tmp_path / "repo"
+    _make_repo(root)
+    git = ["git", "-C", str(root), "-c", "user.email=t@example.com", "-c", "user.name=t"]
+    subprocess.run([*git, "init", "-q"], check=True)
+    subprocess.run([*git, "add", "."], check=True)
+    subprocess.run([*git, "commit", "-qm", "init"], check=True)
+    head = git_head(root)
+    assert head is not None
+
+    (root / "src" / "pkg" / "cli.py").write_text("import pkg.service\nDEBUG = True\n")
+    (root / "src" / "pkg" / "extra.py").write_text("")
+    assert changed_since(root, head) == ["src/pkg/cli.py", "src/pkg/extra.py"]
+
+    fingerprint = {"key": "k", "languages": ["python"], "test_frameworks": ["pytest"], "scripts": []}
+    plan = generate_plan("运行单测", fingerprint, lambda: select_tests(1, root, changed_since(root, head)))
+    assert plan["steps"][1]["commands"] == ["pytest -q tests/test_cli.py"]
+    assert plan["test_impact"]["selected_tests"] == 1
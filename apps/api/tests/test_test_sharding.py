@@ -0,0 +1,116 @@
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.services.executor import sharding
+from app.services.executor.sharding import (
+    SHARDED_STEP_TYPE,
+    discover_tests,
+    junit_durations,
+    load_durations,
+    merge_exit_codes,
+    merge_junit,
+    partition,
+    plan_shards,
+    record_durations,
+    shard_command,
+    split_pytest_command,
+)
+from app.services.planner.rule_planner import generate_plan
+from app.services.planner.test_impact import TestSelection
+
+
+@pytest.fixture(autouse=True)
+def _settings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "artifact_root", str(tmp_path / "data"))
+    monkeypatch.setattr(settings, "test_shard_max", 3)
+    monkeypatch.setattr(sharding.os, "cpu_count", lambda: 8)
+
+
+def test_partition_balances_by_duration() -> None:
+    durations = {"t/a.py": 8.0, "t/b.py": 5.0, "t/c.py": 4.0, "t/d.py": 3.0, "t/e.py": 2.0}
+    shards = partition(sorted(durations) + ["t/new.py"], durations, 3)
+    assert [shard.tests for shard in shards] == [("t/a.py", "t/e.py"), ("t/b.py", "t/d.py"), ("t/c.py", "t/new.py")]
+    assert [shard.expected_seconds for shard in shards] == [10.0, 8.0, 8.0]
+
+
+def test_split_pytest_command_separates_paths(tmp_path: Path) -> None:
+    (tmp_path / "tests").mkdir()
+    assert split_pytest_command("python -m pytest -q -k 'not slow' tests/", tmp_path) == (
+        ["python", "-m", "pytest", "-q", "-k", "not slow"],
+        ["tests"],
+    )
+    assert split_pytest_command("pytest -q -n 4", tmp_path) is None
+    assert split_pytest_command("npm test", tmp_path) is None
+
+
+def test_plan_shards_uses_recorded_durations(tmp_path: Path) -> None:
+    root = tmp_path / "repo"
+    (root / "tests").mkdir(parents=True)
+    for name in ("test_a.py", "test_b.py", "test_c.py", "test_d.py"):
+        (root / "tests" / name).write_text("def test_ok():\n    pass\n")
+    (root / "tests" / "helpers.py").write_text("")
+    record_durations(7, {"tests/test_a.py": 30.0, "tests/test_b.py": 1.0})
+
+    base_args, shards = plan_shards(7, root, "pytest -q")
+    assert base_args == ["pytest", "-q"]
+    assert [shard.tests for shard in shards] == [("tests/test_a.py",), ("tests/test_b.py", "tests/test_c.py"), ("tests/test_d.py",)]
+    assert shard_command(base_args, shards[1], ".localops/junit-2-1.xml") == (
+        "pytest -q -p no:cacheprovider --junitxml=.localops/junit-2-1.xml tests/test_b.py tests/test_c.py"
+    )
+    assert plan_shards(7, root, "pytest -q tests/test_a.py") is None
+
+
+def test_junit_reports_merge_into_durations(tmp_path: Path) -> None:
+    first = tmp_path / "junit-0.xml"
+    second = tmp_path / "junit-1.xml"
+    first.write_text(
+        '<testsuites><testsuite name="pytest" tests="2">'
+        '<testcase classname="tests.test_a" name="test_one" time="1.5"/>'
+        '<testcase classname="tests.test_a.TestGroup" name="test_two" time="0.5"/>'
+        "</testsuite></testsuites>"
+    )
+    second.write_text('<testsuite name="pytest"><testcase classname="tests.test_b" name="test_x" time="2"/></testsuite>')
+    known = {"tests/test_a.py", "tests/test_b.py"}
+
+    durations = junit_durations([first, second, tmp_path / "missing.xml"], known)
+    assert durations == {"tests/test_a.py": 2.0, "tests/test_b.py": 2.0}
+    record_durations(3, durations)
+    record_durations(3, {"tests/test_b.py": 4.0})
+    assert load_durations(3) == {"tests/test_a.py": 2.0, "tests/test_b.py": 4.0}
+
+    merged = tmp_path / "merged.xml"
+    assert merge_junit([first, second], merged) is True
+    assert junit_durations([merged], known) == durations
+
+
+def test_merge_exit_codes() -> None:
+    assert merge_exit_codes([0, 0, 5]) == 0
+    assert merge_exit_codes([0, 1, 2]) == 2
+    assert merge_exit_codes([5, 5]) == 5
+
+
+def test_full_suite_plans_use_sharded_step() -> None:
+    fingerprint = {"key": "k", "languages": ["python"], "test_frameworks": ["pytest"], "scripts": []}
+    full = generate_plan("运行单测", fingerprint, lambda: TestSelection(full_suite=True, reason="no change set available"))
+    assert full["steps"][1]["type"] == SHARDED_STEP_TYPE
+    selected = generate_plan(
+        "运行单测", fingerprint, lambda: TestSelection(full_suite=False, reason="import graph", tests=("tests/test_a.py",))
+    )
+    assert selected["steps"][1]["type"] == "execute"
+
+
+def test_discovery_follows_pytest_collection_config(tmp_path: Path) -> None:
+    root = tmp_path / "repo"
+    for rel_path in ("tests/test_a.py", "tests/check_b.py", "scripts/test_tool.py", "tests/test_c.py"):
+        (root / rel_path).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel_path).write_text("")
+    assert discover_tests(root, []) == ["scripts/test_tool.py", "tests/test_a.py", "tests/test_c.py"]
+
+    (root / "pyproject.toml").write_text('[tool.pytest.ini_options]\ntestpaths = ["tests"]\npython_files = "check_*.py"\n')
+    assert discover_tests(root, []) == ["tests/check_b.py"]
+    assert discover_tests(root, ["scripts/test_tool.py"]) == ["scripts/test_tool.py"]
+
+    (root / "pytest.ini").write_text("[pytest]\ntestpaths = tests\n")
+    assert discover_tests(root, []) == ["tests/test_a.py", "tests/test_c.py"]
@@ -0,0 +1,99 @@
+import hashlib
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.db.session import get_async_db, get_db
+from app.main import app
+from app.services.artifacts.store import artifact_store
+from app.services.artifacts.uploads import gc_uploads, uploads_root
+from app.services.search.logs import log_index_dir, search_logs
+from loadtest.api_load import install_local_db
+
+
+@pytest.fixture()
+def client(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[TestClient]:
+    monkeypatch.setattr(settings, "artifact_root", str(tmp_path / "data"))
+    monkeypatch.setattr(settings, "upload_chunk_max_bytes", 64)
+    install_local_db(app, tmp_path)
+    try:
+        with TestClient(app, headers={"x-api-key": settings.api_key}) as test_client:
+            yield test_client
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_async_db, None)
+
+
+def _start(client: TestClient, data: bytes, **meta: object) -> dict:
+    payload = {"sha256": hashlib.sha256(data).hexdigest(), "size": len(data), **meta}
+    response = client.post("/v1/internal/uploads", json=payload)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_chunked_upload_resumes_from_server_offset(client: TestClient) -> None:
+    data = b"".join(f"line {index} ok\n".encode() for index in range(12))
+    session = _start(client, data)
+    upload = f"/v1/internal/uploads/{session['upload_id']}"
+
+    assert client.put(upload, params={"offset": 0}, content=data[:40]).json()["offset"] == 40
+    conflict = client.put(upload, params={"offset": 0}, content=data[:40])
+    assert conflict.status_code == 409 and conflict.json()["detail"] == {"offset": 40}
+    assert client.put(upload, params={"offset": 40}, content=data[40:140]).status_code == 413
+
+    offset = client.get(upload).json()["offset"]
+    while offset < len(data):
+        offset = client.put(upload, params={"offset": offset}, content=data[offset : offset + 64]).json()["offset"]
+    done = client.post(f"{upload}:complete").json()
+
+    assert done["complete"] is True and done["ref"] == f"blob:{session['sha256']}"
+    assert artifact_store().read_bytes(done["ref"]) == data
+    assert list(uploads_root().iterdir()) == []
+    assert client.get(upload).status_code == 404
+
+
+def test_checksum_mismatch_is_rejected(client: TestClient) -> None:
+    session = _start(client, b"expected")
+    upload = f"/v1/internal/uploads/{session['upload_id']}"
+    client.put(upload, params={"offset": 0}, content=b"tampered")
+
+    response = client.post(f"{upload}:complete")
+
+    assert response.status_code == 422
+    assert not artifact_store().blob_path(session["sha256"]).exists()
+
+
+def test_known_blob_is_deduplicated_and_logs_are_indexed(client: TestClient) -> None:
+    data = b"collected 3 items\nFAILED tests/test_api.py::test_login - AssertionError\n"
+    artifact_store().put_bytes(data)
+
+    status = _start(client, data, kind="log", run_id=7, step_no=2)
+
+    assert status["complete"] is True and status["deduplicated"] is True
+    assert list(uploads_root().glob("*.json")) == []
+    hits = search_logs(log_index_dir(), "test_login", {7}, 10)
+    assert [(hit.step_no, hit.line_no) for hit in hits] == [(2, 2)]
+
+
+def test_abandoned_sessions_expire(client: TestClient) -> None:
+    _start(client, b"never finished")
+    assert gc_uploads(now=4102444800.0, ttl_seconds=settings.upload_session_ttl_seconds) == 1
+    assert list(uploads_root().iterdir()) == []
+
+
+def test_completed_log_upload_is_indexed_in_one_pass(client: TestClient) -> None:
+    data = b"".join(f"step line {index}\n".encode() for index in range(8)) + b"ERROR ECONNRESET upstream\n"
+    session = _start(client, data, kind="log", run_id=9, step_no=1)
+    upload = f"/v1/internal/uploads/{session['upload_id']}"
+    offset = 0
+    while offset < len(data):
+        offset = client.put(upload, params={"offset": offset}, content=data[offset : offset + 64]).json()["offset"]
+
+    done = client.post(f"{upload}:complete").json()
+
+    assert artifact_store().read_bytes(done["ref"]) == data
+    hits = search_logs(log_index_dir(), "ECONNRESET", {9}, 10)
+    assert [(hit.step_no, hit.line_no) for hit in hits] == [(1, 9)]
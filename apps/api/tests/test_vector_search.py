@@ -0,0 +1,93 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.services.search.index import build_index, open_index, refresh_index, search_chunks
+from app.services.search.vector import hash_tokens, tokenize
+
+
+def _make_repo(root: Path) -> None:
+    (root / "db.py").write_text("def open_database_connection(pool_size):\n    return create_pool(pool_size)\n")
+    (root / "ws.py").write_text("async def broadcast_websocket_event(run_id, payload):\n    await send(payload)\n")
+    (root / "notes.md").write_text("部署说明：数据库连接池\n")
+
+
+def test_tokenize_splits_identifiers() -> None:
+    assert tokenize("open_database_connection(x)") == ["open_database_connection", "open", "database", "connection"]
+    assert "数" in tokenize("数据库")
+    terms, counts = hash_tokens(["pool", "pool", "size"])
+    assert len(terms) == 2 and sorted(counts.tolist()) == [1, 2]
+
+
+def test_vector_and_hybrid_rank_relevant_chunk_first(tmp_path: Path) -> None:
+    root = tmp_path / "repo"
+    root.mkdir()
+    _make_repo(root)
+    index_dir = tmp_path / "index"
+    assert build_index(root, index_dir)["chunk_count"] == 3
+    reader = open_index(index_dir)
+    assert reader is not None
+
+    for mode in ("vector", "hybrid"):
+        hits = search_chunks(reader, root, "database pool", mode, 2)
+        assert Path(hits[0].path).name == "db.py"
+        assert hits[0].start_line == 1
+        assert [hit.score for hit in hits] == sorted((hit.score for hit in hits), reverse=True)
+        assert hits[0].score > 0
+    assert search_chunks(reader, root, "websocket broadcast", "hybrid", 1)[0].snippet.startswith("async def")
+    assert search_chunks(reader, root, "zzzz qqqq", "vector", 5) == []
+
+
+def test_refresh_carries_unchanged_chunks(tmp_path: Path) -> None:
+    root = tmp_path / "repo"
+    root.mkdir()
+    _make_repo(root)
+    index_dir = tmp_path / "index"
+    build_index(root, index_dir)
+    (root / "ws.py").unlink()
+    (root / "cache.py").write_text("def evict_lru_entry(cache):\n    cache.popitem(last=False)\n")
+    meta = refresh_index(root, index_dir)
+    assert meta["chunk_count"] == 3
+
+    reader = open_index(index_dir)
+    assert reader is not None
+    assert Path(search_chunks(reader, root, "lru evict", "vector", 1)[0].path).name == "cache.py"
+    assert Path(search_chunks(reader, root, "database", "hybrid", 1)[0].path).name == "db.py"
+    assert all(Path(hit.path).name != "ws.py" for hit in search_chunks(reader, root, "websocket broadcast", "hybrid", 5))
+
+
+def test_bm25_postings_match_chunk_term_table(tmp_path: Path) -> None:
+    root = tmp_path / "repo"
+    root.mkdir()
+    _make_repo(root)
+    for index in range(30):
+        (root / f"mod_{index}.py").write_text(f"def handler_{index}(pool):\n    return pool.size * {index}\n" * (index % 4 + 1))
+    build_index(root, tmp_path / "index")
+    vectors = open_index(tmp_path / "index").vectors
+    store = vectors.segments[0].store
+
+    for term in np.unique(np.asarray(store.terms)):
+        slot = int(np.searchsorted(store.term_keys, term))
+        begin, end = int(store.term_offsets[slot]), int(store.term_offsets[slot + 1])
+        positions = np.flatnonzero(np.asarray(store.terms) == term)
+        expected = np.searchsorted(store.indptr, positions, side="right") - 1
+        assert store.term_keys[slot] == term
+        assert np.asarray(store.term_chunks[begin:end]).tolist() == expected.tolist()
+        assert np.asarray(store.term_counts[begin:end]).tolist() == np.asarray(store.counts[positions]).tolist()
+    assert [hit.chunk_id for hit in vectors.search_bm25("pool size", 3)]
+
+
+def test_projection_in_row_blocks_matches_single_pass(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    root = tmp_path / "repo"
+    root.mkdir()
+    for index in range(12):
+        (root / f"mod_{index}.py").write_text(f"def handler_{index}(pool):\n    return pool.size * {index}\n")
+    build_index(root, tmp_path / "single")
+    monkeypatch.setattr("app.services.search.vector.PROJECT_BLOCK_ROWS", 5)
+    build_index(root, tmp_path / "blocked")
+
+    single = np.asarray(open_index(tmp_path / "single").vectors.segments[0].store.vectors)
+    blocked = np.asarray(open_index(tmp_path / "blocked").vectors.segments[0].store.vectors)
+    assert single.shape == (12, 512)
+    assert np.array_equal(single, blocked)
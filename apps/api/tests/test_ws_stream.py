@@ -0,0 +1,86 @@
+import json
+import zlib
+from collections import OrderedDict
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1.routes import runs as runs_routes
+from app.api.v1.ws.stream import compact_batch, encode_frames
+from app.core.config import settings
+from app.db.models import Plan, Project, Run
+from app.db.session import get_async_db, get_db
+from app.main import app
+from loadtest.api_load import install_local_db
+
+
+@pytest.fixture()
+def client(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[TestClient]:
+    monkeypatch.setattr(runs_routes, "_known_run_projects", OrderedDict())
+    monkeypatch.setattr(settings, "ws_stream_flush_ms", 20)
+    session_factory = install_local_db(app, tmp_path)
+    with session_factory() as db:
+        for project_id, run_ids in ((1, (1, 2)), (2, (3,))):
+            db.add(Project(id=project_id, name=f"p{project_id}", root_path="/nonexistent"))
+            db.add(Plan(id=project_id, project_id=project_id, intent_text="stream", plan_json={"steps": []}))
+            db.add_all(
+                Run(id=run_id, project_id=project_id, plan_id=project_id, status="RUNNING", sandbox_meta={}, risk_level="low")
+                for run_id in run_ids
+            )
+        db.commit()
+    try:
+        with TestClient(app, headers={"x-api-key": settings.api_key}) as test_client:
+            yield test_client
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_async_db, None)
+
+
+def _log(run_id: int, line: str) -> dict:
+    return {"event": "step.log", "run_id": run_id, "step_no": 1, "stream": "stdout", "line": line}
+
+
+def test_compact_batch_groups_consecutive_log_lines() -> None:
+    finished = {"event": "step.finished", "run_id": 1, "step_no": 1, "status": "SUCCEEDED", "exit_code": 0}
+    progress = {**_log(1, "50%"), "progress": True}
+    frame = compact_batch([_log(1, "a"), _log(1, "b"), _log(2, "c"), progress, finished, _log(1, "d")])
+    assert frame == [[1, 1, None, ["a", "b"]], [2, 1, None, ["c"]], progress, finished, [1, 1, None, ["d"]]]
+
+
+def test_batched_frames_cut_bandwidth_by_an_order_of_magnitude() -> None:
+    events = [_log(7, f"tests/test_module_{index % 40}.py::test_case_{index} PASSED") for index in range(500)]
+    per_event = sum(len(zlib.compress(frame.encode(), 6)) for frame in encode_frames("json", events))
+    (batched,) = encode_frames("batch", events)
+    assert per_event / len(zlib.compress(batched.encode(), 6)) >= 10
+
+
+def test_one_socket_follows_runs_and_projects(client: TestClient) -> None:
+    with client.websocket_connect("/v1/ws/stream?encoding=batch") as websocket:
+        websocket.send_text(json.dumps({"op": "subscribe", "runs": [3], "projects": [1]}))
+        assert json.loads(websocket.receive_text()) == [{"event": "stream.subscriptions", "runs": [3], "projects": [1]}]
+        for run_id, line in ((1, "a"), (1, "b"), (2, "c"), (3, "d")):
+            assert client.post(f"/v1/internal/runs/{run_id}/events", json=_log(run_id, line)).status_code == 200
+        received: list = []
+        while sum(len(entry[3]) for entry in received) < 4:
+            received.extend(json.loads(websocket.receive_text()))
+        assert [entry[:1] + entry[3:] for entry in received] == [[1, ["a", "b"]], [2, ["c"]], [3, ["d"]]]
+
+        websocket.send_text(json.dumps({"op": "unsubscribe", "projects": [1]}))
+        assert json.loads(websocket.receive_text())[0]["projects"] == []
+        client.post("/v1/internal/runs/1/events", json=_log(1, "ignored"))
+        client.post("/v1/internal/runs/3/events", json=_log(3, "kept"))
+        assert json.loads(websocket.receive_text()) == [[3, 1, None, ["kept"]]]
+
+        websocket.send_text(json.dumps({"op": "subscribe", "runs": ["x"]}))
+        assert json.loads(websocket.receive_text())[0]["event"] == "stream.error"
+
+
+def test_run_project_lookups_are_kept_in_an_lru(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(runs_routes, "KNOWN_RUNS_LIMIT", 2)
+    for run_id in (1, 2, 1, 3):
+        assert client.post(f"/v1/internal/runs/{run_id}/events", json=_log(run_id, "x")).status_code == 200
+    assert list(runs_routes._known_run_projects.items()) == [(1, 1), (3, 2)]
+    assert client.post("/v1/internal/runs/99/events", json=_log(99, "x")).status_code == 404
+    assert 99 not in runs_routes._known_run_projects
@@ -29,11 +29,27 @@ type RunDetail = {
   audit_content: string | null;
 };
 
+type LogEvent = { event: string; line?: string; status?: string; step_no?: number; shard?: number; progress?: boolean };
+type LogState = { lines: string[]; progress: Record<string, number> };
+
+function appendLog(prev: LogState, data: LogEvent, line: string): LogState {
+  const key = `${data.step_no ?? ""}:${data.shard ?? ""}`;
+  const slot = prev.progress[key];
+  const lines = slot === undefined ? [...prev.lines, line] : prev.lines.map((value, index) => (index === slot ? line : value));
+  const progress = { ...prev.progress };
+  if (data.progress) {
+    progress[key] = slot ?? lines.length - 1;
+  } else {
+    delete progress[key];
+  }
+  return { lines, progress };
+}
+
 export default function RunDetailPage() {
   const params = useParams<{ id: string }>();
   const runId = useMemo(() => Number(params.id), [params.id]);
   const [run, setRun] = useState<RunDetail | null>(null);
-  const [logs, setLogs] = useState<string[]>([]);
+  const [logs, setLogs] = useState<LogState>({ lines: [], progress: {} });
   const [error, setError] = useState("");
   const [tab, setTab] = useState<"artifacts" | "diff" | "report">("artifacts");
 
@@ -59,10 +75,10 @@ export default function RunDetailPage() {
     const wsBase = API_BASE.replace("http://", "ws://").replace("https://", "wss://");
     const ws = new WebSocket(`${wsBase}/v1/ws/runs/${runId}`);
     ws.onmessage = (event) => {
-      const data = JSON.parse(event.data) as { event: string; line?: string; status?: string };
+      const data = JSON.parse(event.data) as LogEvent;
       const logLine = data.line;
       if (data.event === "step.log" && typeof logLine === "string") {
-        setLogs((prev) => [...prev, logLine]);
+        setLogs((prev) => appendLog(prev, data, logLine));
       }
       if (data.event === "run.completed" || data.event === "run.status") {
         void loadRun();
@@ -126,7 +142,7 @@ export default function RunDetailPage() {
       <section>
         <div className="panel">
           <h3>实时日志</h3>
-          <div className="log">{logs.join("\n") || "等待日志..."}</div>
+          <div className="log">{logs.lines.join("\n") || "等待日志..."}</div>
         </div>
 
         <div className="panel">
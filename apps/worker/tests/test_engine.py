@@ -0,0 +1,72 @@
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.executor.output import LiveLogLimiter
+from worker import runner
+from worker.engine import EngineLoop
+
+
+def test_engine_runs_many_coroutines_on_one_loop() -> None:
+    engine = EngineLoop(max_concurrent_runs=20)
+    peak = 0
+
+    async def fake_run(run_id: int) -> int:
+        nonlocal peak
+        peak = max(peak, engine.active_runs)
+        await asyncio.sleep(0.2)
+        return run_id
+
+    try:
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=40) as pool:
+            results = list(pool.map(lambda run_id: engine.submit(fake_run(run_id)), range(40)))
+        elapsed = time.monotonic() - started
+    finally:
+        engine.close()
+    assert results == list(range(40))
+    assert peak == 20
+    assert 0.4 <= elapsed < 1.5
+
+
+def test_container_output_streams_without_blocking(monkeypatch: pytest.MonkeyPatch) -> None:
+    events: list[dict] = []
+
+    async def capture(run_id: int, payload: dict) -> None:
+        events.append(payload)
+
+    monkeypatch.setattr(runner, "_emit_event", capture)
+    script = "import sys; sys.stdout.write('start\\n10%\\r90%\\rdone\\n' + ''.join(f'line {i}\\n' for i in range(50)))"
+    limiter = LiveLogLimiter(rate_per_second=0, burst=10, progress_interval=0, max_line_chars=100)
+    collected: list[str] = []
+
+    async def scenario() -> int:
+        ticks = 0
+
+        async def ticker() -> None:
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        background = asyncio.create_task(ticker())
+        code = await runner._run_container(1, 2, [sys.executable, "-c", script], collected, limiter, shard=0)
+        background.cancel()
+        assert ticks > 0
+        return code
+
+    assert asyncio.run(scenario()) == 0
+    assert collected[:2] == ["start", "done"] and len(collected) == 52
+    assert [event["line"] for event in events[:3]] == ["start", "10%", "90%"]
+    assert events[-1] == {
+        "event": "step.log",
+        "run_id": 1,
+        "step_no": 2,
+        "stream": "stdout",
+        "shard": 0,
+        "line": "… 44 lines suppressed",
+        "suppressed": 44,
+    }
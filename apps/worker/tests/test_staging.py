@@ -0,0 +1,48 @@
+import asyncio
+from pathlib import Path
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.main import app
+from app.services.artifacts.store import artifact_store
+from worker import staging
+
+
+class FlakyTransport(httpx.AsyncBaseTransport):
+    def __init__(self) -> None:
+        self.inner = httpx.ASGITransport(app=app)
+        self.puts = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "PUT":
+            self.puts += 1
+            if self.puts == 2:
+                await self.inner.handle_async_request(request)
+                raise httpx.ReadTimeout("response lost", request=request)
+        return await self.inner.handle_async_request(request)
+
+
+def test_upload_resumes_after_lost_chunk_response(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    transport = FlakyTransport()
+    client = httpx.AsyncClient(transport=transport)
+    monkeypatch.setattr(staging, "event_client", lambda: client)
+    monkeypatch.setattr(settings, "api_base_url", "http://api")
+    monkeypatch.setattr(settings, "artifact_root", str(tmp_path / "data"))
+    monkeypatch.setattr(settings, "artifact_transport", "upload")
+    monkeypatch.setattr(settings, "worker_staging_root", str(tmp_path / "staging"))
+    monkeypatch.setattr(settings, "upload_chunk_bytes", 1000)
+    data = b"".join(f"PASSED tests/test_case_{index}.py\n".encode() for index in range(200))
+
+    async def publish() -> staging.StoredBlob:
+        try:
+            return await staging.publish_bytes(5, "report.md", data, {"kind": "artifact", "run_id": 5})
+        finally:
+            await client.aclose()
+
+    blob = asyncio.run(publish())
+
+    assert artifact_store().read_bytes(blob.ref) == data
+    assert transport.puts == -(-len(data) // 1000)
+    assert list(staging.staging_dir(5).iterdir()) == []
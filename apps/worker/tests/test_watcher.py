@@ -0,0 +1,20 @@
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from worker.watcher import projects_for_changes
+
+
+def test_changes_map_to_owning_projects() -> None:
+    projects = {1: Path("/repos/a"), 2: Path("/repos/b")}
+    changed = ["/repos/a/src/main.py", "/repos/b/node_modules/x/index.js", "/elsewhere/file.txt"]
+    assert projects_for_changes(projects, changed) == {1}
+
+
+def test_artifact_writes_inside_project_are_ignored(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "artifact_root", "/workspace/data")
+    projects = {1: Path("/workspace")}
+    changed = ["/workspace/data/logs/3/1.out", "/workspace/data/index/1/gen-000002/meta.json"]
+    assert projects_for_changes(projects, changed) == set()
+    assert projects_for_changes(projects, ["/workspace/apps/main.py"]) == {1}
@@ -6,5 +6,9 @@ from app.core.config import settings
 
 celery_app = Celery("localops-worker", broker=settings.redis_url, backend=settings.redis_url)
 celery_app.conf.update(task_track_started=True, task_serializer="json", accept_content=["json"], result_serializer="json")
+celery_app.conf.beat_schedule = {
+    "apply-retention": {"task": "worker.apply_retention", "schedule": float(settings.retention_interval_seconds)},
+    "maintain-partitions": {"task": "worker.maintain_partitions", "schedule": 86400.0},
+}
 
-celery_app.autodiscover_tasks(["worker.runner"])
+celery_app.autodiscover_tasks(["worker.runner", "worker.indexer", "worker.maintenance"])
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from collections.abc import Coroutine
+from typing import Any, TypeVar
+
+import httpx
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+
+class EngineLoop:
+    def __init__(self, max_concurrent_runs: int) -> None:
+        self.max_concurrent_runs = max_concurrent_runs
+        self.active_runs = 0
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._serve, name="run-engine", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _serve(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._slots = asyncio.Semaphore(self.max_concurrent_runs)
+        self.client = httpx.AsyncClient(timeout=3.0, limits=httpx.Limits(max_connections=100))
+        self._loop.call_soon(self._ready.set)
+        self._loop.run_forever()
+
+    async def _guarded(self, coro: Coroutine[Any, Any, T]) -> T:
+        async with self._slots:
+            self.active_runs += 1
+            try:
+                return await coro
+            finally:
+                self.active_runs -= 1
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> T:
+        return asyncio.run_coroutine_threadsafe(self._guarded(coro), self._loop).result()
+
+    def close(self) -> None:
+        asyncio.run_coroutine_threadsafe(self.client.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+_engine: EngineLoop | None = None
+_engine_pid: int | None = None
+_engine_lock = threading.Lock()
+
+
+def engine_loop() -> EngineLoop:
+    global _engine, _engine_pid
+    with _engine_lock:
+        if _engine is None or _engine_pid != os.getpid():
+            _engine = EngineLoop(settings.worker_max_concurrent_runs)
+            _engine_pid = os.getpid()
+        return _engine
+
+
+def event_client() -> httpx.AsyncClient:
+    return engine_loop().client
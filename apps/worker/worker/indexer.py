@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.models.project import Project
+from app.db.session import SessionLocal
+from app.services.search.index import build_index, index_dir_for, refresh_index
+from app.services.search.logs import log_index_dir, rebuild_log_index
+from worker.celery_app import celery_app
+
+
+def _project_root(project_id: int) -> Path | None:
+    db = SessionLocal()
+    try:
+        project = db.scalar(select(Project).where(Project.id == project_id))
+    finally:
+        db.close()
+    if project is None or not Path(project.root_path).exists():
+        return None
+    return Path(project.root_path)
+
+
+@celery_app.task(name="worker.build_index")
+def build_project_index(project_id: int) -> dict[str, Any]:
+    root_path = _project_root(project_id)
+    if root_path is None:
+        return {"status": "missing", "project_id": project_id}
+    return build_index(root_path, index_dir_for(project_id))
+
+
+@celery_app.task(name="worker.refresh_index")
+def refresh_project_index(project_id: int) -> dict[str, Any]:
+    root_path = _project_root(project_id)
+    if root_path is None:
+        return {"status": "missing", "project_id": project_id}
+    return refresh_index(root_path, index_dir_for(project_id))
+
+
+@celery_app.task(name="worker.rebuild_log_index")
+def rebuild_step_log_index() -> dict[str, int]:
+    return rebuild_log_index(log_index_dir(), Path(settings.artifact_root) / "logs")
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timezone
+from typing import Any
+
+from app.core.config import settings
+from app.db.partitions import add_months, drop_partitions_before, ensure_partitions, month_start
+from app.db.session import SessionLocal
+from app.services.retention.policy import apply_retention
+from worker.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="worker.apply_retention")
+def apply_retention_policy() -> dict[str, Any]:
+    db = SessionLocal()
+    try:
+        report = apply_retention(db)
+    finally:
+        db.close()
+    logger.info(
+        "retention archived %s runs, purged %s, deleted %s blobs, reclaimed %s bytes",
+        report["archived_runs"],
+        report["purged_runs"],
+        report["deleted_blobs"],
+        report["reclaimed_bytes"],
+    )
+    return report
+
+
+@celery_app.task(name="worker.maintain_partitions")
+def maintain_partitions() -> dict[str, list[str]]:
+    now = datetime.now(timezone.utc)
+    db = SessionLocal()
+    try:
+        connection = db.connection()
+        created = ensure_partitions(connection, now, settings.partition_months_ahead)
+        dropped: list[str] = []
+        if settings.partition_retention_months > 0:
+            cutoff = add_months(month_start(now), -settings.partition_retention_months)
+            dropped = drop_partitions_before(connection, cutoff)
+        db.commit()
+    finally:
+        db.close()
+    logger.info("partitions created %s, dropped %s", created, dropped)
+    return {"created": created, "dropped": dropped}
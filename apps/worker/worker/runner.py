@@ -1,15 +1,18 @@
 from __future__ import annotations
 
-import hashlib
+import asyncio
 import json
+import logging
 import shutil
 import subprocess
 import tempfile
+import time
 from datetime import datetime, timezone
 from pathlib import Path
 
-import httpx
+from celery.signals import worker_ready
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.core.metrics import step_failures_total
@@ -19,33 +22,52 @@ from app.db.models.plan import Plan
 from app.db.models.project import Project
 from app.db.models.run import Run
 from app.db.models.run_step import RunStep
-from app.db.session import SessionLocal
+from app.db.session import AsyncSessionLocal
+from app.services.artifacts.store import StoredBlob, artifact_store
+from app.services.executor.checkpoints import (
+    CheckpointMissing,
+    gc_checkpoints,
+    inherit_checkpoints,
+    restore_checkpoints,
+    scan_workspace,
+    write_checkpoint,
+)
+from app.services.executor.images import SandboxImage, ensure_sandbox_image, gc_sandbox_images, link_node_modules
+from app.services.executor.journal import JournalBusy, RunJournal, journal_run_ids, recover_journal
+from app.services.executor.output import READ_CHUNK_BYTES, LiveLogLimiter, OutputLine, OutputSplitter
 from app.services.executor.policies import evaluate_risk, validate_command_policy
+from app.services.executor.sharding import (
+    JUNIT_DIR,
+    SHARDED_STEP_TYPE,
+    junit_durations,
+    merge_exit_codes,
+    merge_junit,
+    plan_shards,
+    record_durations,
+    shard_command,
+)
+from app.services.failures.store import previous_run_counts, record_failure
+from app.services.planner.test_impact import git_head
+from app.services.search.logs import add_step_log, log_index_dir
 from app.state.machine import RunStatus, StepStatus, can_transition_run, can_transition_step
 from worker.celery_app import celery_app
+from worker.engine import engine_loop, event_client
+from worker.staging import UploadFailed, publish_bytes, publish_file, staging_dir, upload_enabled
 
-
-def _sha256_of_file(file_path: Path) -> str:
-    digest = hashlib.sha256()
-    with file_path.open("rb") as handle:
-        while True:
-            block = handle.read(8192)
-            if not block:
-                break
-            digest.update(block)
-    return digest.hexdigest()
+logger = logging.getLogger(__name__)
 
 
-def _emit_event(run_id: int, payload: dict) -> None:
-    with httpx.Client(timeout=3.0) as client:
-        client.post(
-            f"{settings.api_base_url}/v1/internal/runs/{run_id}/events",
-            headers={"x-api-key": settings.api_key},
-            json=payload,
-        )
+async def _emit_event(run_id: int, payload: dict) -> None:
+    await event_client().post(
+        f"{settings.api_base_url}/v1/internal/runs/{run_id}/events",
+        headers={"x-api-key": settings.api_key},
+        json=payload,
+    )
 
 
-def _docker_command(command: str, workspace: Path, needs_network: bool) -> list[str]:
+def _docker_command(
+    command: str, workspace: Path, needs_network: bool, cpus: str = "1.0", image: str | None = None
+) -> list[str]:
     network_mode = "bridge" if needs_network else "none"
     return [
         "docker",
@@ -54,7 +76,7 @@ def _docker_command(command: str, workspace: Path, needs_network: bool) -> list[
         "--network",
         network_mode,
         "--cpus",
-        "1.0",
+        cpus,
         "--memory",
         "512m",
         "--pids-limit",
@@ -66,28 +88,174 @@ def _docker_command(command: str, workspace: Path, needs_network: bool) -> list[
         f"{workspace}:/workspace",
         "-w",
         "/workspace",
-        settings.sandbox_image,
+        image or settings.sandbox_image,
         "sh",
         "-lc",
         command,
     ]
 
 
-def _write_artifact(db, run_id: int, kind: str, path: Path) -> None:
-    if not path.exists():
-        return
-    db.add(
-        Artifact(
-            run_id=run_id,
-            kind=kind,
-            path=str(path),
-            sha256=_sha256_of_file(path),
-            size=path.stat().st_size,
-        )
+async def _write_artifact(db: AsyncSession, run_id: int, kind: str, blob: StoredBlob) -> None:
+    db.add(Artifact(run_id=run_id, kind=kind, path=blob.ref, sha256=blob.sha256, size=blob.size))
+    await _emit_event(run_id, {"event": "artifact.created", "run_id": run_id, "kind": kind, "path": blob.ref})
+
+
+def _index_step_log(run_id: int, step_no: int, log_path: Path) -> None:
+    try:
+        add_step_log(log_index_dir(), run_id, step_no, log_path)
+    except OSError:
+        pass
+
+
+def _checkpoint_step(run_id: int, step_no: int, workspace: Path, manifest: dict[str, list[int]]) -> dict[str, list[int]]:
+    try:
+        manifest = write_checkpoint(run_id, step_no, workspace, manifest)
+        gc_checkpoints(settings.checkpoint_budget_bytes, keep={run_id})
+    except OSError:
+        pass
+    return manifest
+
+
+def _live_limiter() -> LiveLogLimiter:
+    return LiveLogLimiter(
+        settings.step_log_rate_per_second,
+        settings.step_log_burst,
+        settings.step_log_progress_interval_seconds,
+        settings.step_log_max_line_chars,
     )
 
 
-def _generate_report(run: Run, steps: list[RunStep], report_path: Path) -> None:
+async def _stream_output(
+    run_id: int,
+    step_no: int,
+    stdout: asyncio.StreamReader,
+    collected: list[str],
+    limiter: LiveLogLimiter,
+    shard: int | None = None,
+) -> None:
+    base = {"event": "step.log", "run_id": run_id, "step_no": step_no, "stream": "stdout"}
+    if shard is not None:
+        base["shard"] = shard
+    splitter = OutputSplitter()
+    pending_progress: str | None = None
+
+    async def publish(lines: list[OutputLine]) -> None:
+        nonlocal pending_progress
+        for line in lines:
+            if line.progress:
+                pending_progress = line.text
+            else:
+                pending_progress = None
+                collected.append(line.text)
+            for event in limiter.offer(line):
+                await _emit_event(run_id, {**base, **event})
+
+    while chunk := await stdout.read(READ_CHUNK_BYTES):
+        await publish(splitter.feed(chunk))
+    await publish(splitter.close())
+    if pending_progress is not None:
+        collected.append(pending_progress)
+    for event in limiter.flush():
+        await _emit_event(run_id, {**base, **event})
+
+
+async def _run_container(
+    run_id: int, step_no: int, args: list[str], collected: list[str], limiter: LiveLogLimiter, shard: int | None = None
+) -> int:
+    process = await asyncio.create_subprocess_exec(*args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    try:
+        if process.stdout is not None:
+            await _stream_output(run_id, step_no, process.stdout, collected, limiter, shard)
+        return await process.wait()
+    except asyncio.CancelledError:
+        if process.returncode is None:
+            process.kill()
+        raise
+
+
+async def _prepare_image(db: AsyncSession, run: Run, project: Project, workspace: Path) -> SandboxImage:
+    image = await asyncio.to_thread(ensure_sandbox_image, project.id, workspace)
+    run.sandbox_meta = {**(run.sandbox_meta or {}), "image": image.meta()}
+    if image.error is not None:
+        db.add(Audit(run_id=run.id, actor="worker", action="sandbox.image_failed", payload_json=image.meta()))
+    elif image.built:
+        db.add(Audit(run_id=run.id, actor="worker", action="sandbox.image_built", payload_json=image.meta()))
+        try:
+            await asyncio.to_thread(
+                gc_sandbox_images, settings.sandbox_image_budget_bytes, {image.key} if image.key else None
+            )
+        except OSError:
+            pass
+    try:
+        link_node_modules(image, workspace)
+    except OSError:
+        pass
+    return image
+
+
+async def _run_single_step(
+    run_id: int, step: RunStep, workspace: Path, image: str, limiter: LiveLogLimiter
+) -> tuple[int, list[str]]:
+    collected_lines: list[str] = []
+    command = _docker_command(step.command, workspace, False, image=image)
+    return_code = await _run_container(run_id, step.step_no, command, collected_lines, limiter)
+    return return_code, collected_lines
+
+
+async def _run_sharded_step(
+    run: Run, step: RunStep, workspace: Path, image: str, limiter: LiveLogLimiter
+) -> tuple[int, list[str]] | None:
+    planned = await asyncio.to_thread(plan_shards, run.project_id, workspace, step.command)
+    if planned is None:
+        return None
+    base_args, shards = planned
+    (workspace / JUNIT_DIR).mkdir(exist_ok=True)
+    junit_paths = [workspace / JUNIT_DIR / f"junit-{step.step_no}-{shard.index}.xml" for shard in shards]
+    outputs: list[list[str]] = [[] for _ in shards]
+    exit_codes = [0] * len(shards)
+    elapsed = [0.0] * len(shards)
+
+    async def run_shard(position: int) -> None:
+        shard = shards[position]
+        started = time.monotonic()
+        command = shard_command(base_args, shard, f"{JUNIT_DIR}/{junit_paths[position].name}")
+        exit_codes[position] = await _run_container(
+            run.id,
+            step.step_no,
+            _docker_command(command, workspace, False, str(settings.test_shard_cpus), image),
+            outputs[position],
+            limiter,
+            shard.index,
+        )
+        elapsed[position] = time.monotonic() - started
+
+    await asyncio.gather(*(run_shard(position) for position in range(len(shards))))
+
+    def merge_results() -> None:
+        merge_junit(junit_paths, workspace / JUNIT_DIR / f"step-{step.step_no}.xml")
+        record_durations(run.project_id, junit_durations(junit_paths, {test for shard in shards for test in shard.tests}))
+
+    await asyncio.to_thread(merge_results)
+    summary = [
+        {
+            "shard": shard.index,
+            "tests": len(shard.tests),
+            "expected_seconds": shard.expected_seconds,
+            "seconds": round(elapsed[position], 3),
+            "exit_code": exit_codes[position],
+        }
+        for position, shard in enumerate(shards)
+    ]
+    meta = dict(run.sandbox_meta or {})
+    meta["shards"] = {**meta.get("shards", {}), str(step.step_no): summary}
+    run.sandbox_meta = meta
+    lines = [f"[shard {shard.index}] {line}" for shard, output in zip(shards, outputs) for line in output]
+    return merge_exit_codes(exit_codes), lines
+
+
+def _generate_report(
+    run: Run, steps: list[RunStep], previous_runs: dict[int, int] | None = None
+) -> str:
     lines: list[str] = []
     lines.append(f"# Run {run.id} Report")
     lines.append("")
@@ -95,39 +263,110 @@ def _generate_report(run: Run, steps: list[RunStep], report_path: Path) -> None:
     lines.append(f"- risk_level: {run.risk_level}")
     lines.append(f"- started_at: {run.started_at}")
     lines.append(f"- finished_at: {run.finished_at}")
+    resume = (run.sandbox_meta or {}).get("resume")
+    if resume:
+        lines.append(f"- resumed_from: run {resume['run_id']} at step {resume['step_no']}")
+    image = (run.sandbox_meta or {}).get("image")
+    if image:
+        lines.append(f"- sandbox_image: {image.get('tag') or image['ref']} ({image['ref']})")
     lines.append("")
     lines.append("## Steps")
+    shards = (run.sandbox_meta or {}).get("shards", {})
     for step in steps:
         lines.append(f"- step {step.step_no}: {step.command} => {step.status} (exit={step.exit_code})")
+        for shard in shards.get(str(step.step_no), []):
+            lines.append(
+                f"  - shard {shard['shard']}: {shard['tests']} test files, {shard['seconds']}s (exit={shard['exit_code']})"
+            )
     failed_steps = [step for step in steps if step.status == StepStatus.FAILED.value]
     if failed_steps:
         lines.append("")
         lines.append("## Failure")
         for step in failed_steps:
-            lines.append(f"- step {step.step_no} failed")
+            seen = (previous_runs or {}).get(step.step_no)
+            if seen:
+                lines.append(f"- step {step.step_no} failed (seen in {seen} previous runs)")
+            else:
+                lines.append(f"- step {step.step_no} failed")
     lines.append("")
     lines.append("## Next")
     if failed_steps:
         lines.append("- review stderr logs and fix command or source code")
     else:
         lines.append("- review generated artifacts and finalize")
-    report_path.write_text("\n".join(lines), encoding="utf-8")
+    return "\n".join(lines)
 
 
-@celery_app.task(name="worker.execute_run")
-def execute_run(run_id: int) -> None:
-    db = SessionLocal()
+def _prepare_workspace(run_id: int, source_root: Path) -> tuple[Path, str | None]:
+    workspace = Path(tempfile.mkdtemp(prefix=f"run-{run_id}-"))
+    if not source_root.exists():
+        return workspace, None
+    shutil.copytree(source_root, workspace, dirs_exist_ok=True)
+    return workspace, git_head(workspace)
+
+
+def _write_step_logs(run_id: int, step_no: int, stdout_path: Path, stderr_path: Path, lines: list[str]) -> None:
+    stdout_path.write_text("\n".join(lines), encoding="utf-8")
+    stderr_path.write_text("", encoding="utf-8")
+    if not upload_enabled():
+        _index_step_log(run_id, step_no, stdout_path)
+
+
+async def _upload_step_logs(run_id: int, step_no: int, stdout_path: Path, stderr_path: Path) -> tuple[str, str]:
+    meta = {"kind": "log", "run_id": run_id, "step_no": step_no}
+    stdout_blob, stderr_blob = await asyncio.gather(
+        publish_file(stdout_path, meta), publish_file(stderr_path, {"kind": "artifact", "run_id": run_id})
+    )
+    return stdout_blob.ref, stderr_blob.ref
+
+
+def _capture_diff(workspace: Path, target: Path) -> None:
+    with target.open("wb") as handle:
+        subprocess.run(["git", "-C", str(workspace), "diff"], stdout=handle, stderr=subprocess.DEVNULL, check=False)
+
+
+async def _store_diff(run_id: int, workspace: Path) -> StoredBlob:
+    if upload_enabled():
+        staged = staging_dir(run_id) / "diff.patch"
+        await asyncio.to_thread(_capture_diff, workspace, staged)
+        return await publish_file(staged, {"kind": "artifact", "run_id": run_id})
+    store = artifact_store()
+
+    def stream_diff() -> StoredBlob:
+        diff_proc = subprocess.Popen(["git", "-C", str(workspace), "diff"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        diff_blob = store.put_stream(diff_proc.stdout) if diff_proc.stdout is not None else store.put_bytes(b"")
+        diff_proc.wait()
+        return diff_blob
+
+    return await asyncio.to_thread(stream_diff)
+
+
+async def _await_log_uploads(journal: RunJournal, pending: list[tuple[RunStep, asyncio.Task[tuple[str, str]]]]) -> None:
+    for step, upload in pending:
+        try:
+            stdout_ref, stderr_ref = await upload
+        except UploadFailed as exc:
+            journal.audit("artifact.upload_failed", {"step_no": step.step_no, "kind": "log", "reason": str(exc)})
+            continue
+        journal.update_step(step, stdout_path=stdout_ref, stderr_path=stderr_ref)
+
+
+async def execute_run_async(run_id: int) -> None:
+    db = AsyncSessionLocal()
     temp_workspace: Path | None = None
+    journal: RunJournal | None = None
+    log_uploads: list[tuple[RunStep, asyncio.Task[tuple[str, str]]]] = []
     try:
-        run = db.scalar(select(Run).where(Run.id == run_id))
+        await recover_journal(run_id, AsyncSessionLocal)
+        run = await db.scalar(select(Run).where(Run.id == run_id))
         if run is None:
             return
-        plan = db.scalar(select(Plan).where(Plan.id == run.plan_id))
-        project = db.scalar(select(Project).where(Project.id == run.project_id))
+        plan = await db.scalar(select(Plan).where(Plan.id == run.plan_id))
+        project = await db.scalar(select(Project).where(Project.id == run.project_id))
         if plan is None or project is None:
             run.status = RunStatus.FAILED.value
             db.add(Audit(run_id=run.id, actor="worker", action="run.failed", payload_json={"reason": "missing plan or project"}))
-            db.commit()
+            await db.commit()
             return
 
         if not can_transition_run(RunStatus(run.status), RunStatus.RUNNING):
@@ -135,41 +374,59 @@ def execute_run(run_id: int) -> None:
             run.started_at = datetime.now(timezone.utc)
 
         data_root = Path(settings.artifact_root)
-        logs_dir = data_root / "logs" / str(run.id)
-        reports_dir = data_root / "reports" / str(run.id)
-        artifacts_dir = data_root / "artifacts" / str(run.id)
+        logs_dir = staging_dir(run.id) if upload_enabled() else data_root / "logs" / str(run.id)
         logs_dir.mkdir(parents=True, exist_ok=True)
-        reports_dir.mkdir(parents=True, exist_ok=True)
-        artifacts_dir.mkdir(parents=True, exist_ok=True)
 
-        temp_workspace = Path(tempfile.mkdtemp(prefix=f"run-{run.id}-"))
-        source_root = Path(project.root_path)
-        if source_root.exists():
-            shutil.copytree(source_root, temp_workspace, dirs_exist_ok=True)
+        temp_workspace, head = await asyncio.to_thread(_prepare_workspace, run.id, Path(project.root_path))
+        if head is not None:
+            run.sandbox_meta = {**(run.sandbox_meta or {}), "git_head": head}
+
+        resume = (run.sandbox_meta or {}).get("resume")
+        if resume:
+            restored_steps = list(range(1, resume["step_no"]))
+            try:
+                await asyncio.to_thread(inherit_checkpoints, resume["run_id"], run.id, restored_steps)
+                await asyncio.to_thread(restore_checkpoints, run.id, restored_steps, temp_workspace)
+            except CheckpointMissing as exc:
+                run.status = RunStatus.FAILED.value
+                run.finished_at = datetime.now(timezone.utc)
+                db.add(Audit(run_id=run.id, actor="worker", action="run.failed", payload_json={"reason": str(exc)}))
+                await db.commit()
+                return
+            db.add(
+                Audit(
+                    run_id=run.id,
+                    actor="worker",
+                    action="checkpoint.restored",
+                    payload_json={"source_run_id": resume["run_id"], "steps": restored_steps},
+                )
+            )
+        await db.commit()
+        image = await _prepare_image(db, run, project, temp_workspace)
+        manifest = await asyncio.to_thread(scan_workspace, temp_workspace)
 
-        steps = list(db.scalars(select(RunStep).where(RunStep.run_id == run.id).order_by(RunStep.step_no)).all())
-        _emit_event(run.id, {"event": "run.status", "run_id": run.id, "status": RunStatus.RUNNING.value})
+        steps = list((await db.scalars(select(RunStep).where(RunStep.run_id == run.id).order_by(RunStep.step_no))).all())
+        for step in steps:
+            db.expunge(step)
+        journal = RunJournal(run.id, AsyncSessionLocal, start_seq=run.journal_seq)
+        await journal.flush(db)
+        journal.start()
+        await _emit_event(run.id, {"event": "run.status", "run_id": run.id, "status": RunStatus.RUNNING.value})
 
         run_failed = False
+        failed_step: tuple[int, list[str]] | None = None
         for step in steps:
             if not can_transition_step(StepStatus(step.status), StepStatus.RUNNING):
                 continue
 
-            ok, reason = validate_command_policy(step.command)
+            ok, reason = validate_command_policy(step.command, project.id, project.name)
             if not ok:
-                step.status = StepStatus.FAILED.value
-                step.exit_code = 126
-                step.finished_at = datetime.now(timezone.utc)
-                step_failures_total.labels(command=step.command.split()[0] if step.command else "unknown").inc()
-                db.add(
-                    Audit(
-                        run_id=run.id,
-                        actor="worker",
-                        action="command.blocked",
-                        payload_json={"step_no": step.step_no, "command": step.command, "reason": reason},
-                    )
+                journal.update_step(
+                    step, status=StepStatus.FAILED.value, exit_code=126, finished_at=datetime.now(timezone.utc)
                 )
-                _emit_event(
+                step_failures_total.labels(command=step.command.split()[0] if step.command else "unknown").inc()
+                journal.audit("command.blocked", {"step_no": step.step_no, "command": step.command, "reason": reason})
+                await _emit_event(
                     run.id,
                     {
                         "event": "step.finished",
@@ -182,77 +439,62 @@ def execute_run(run_id: int) -> None:
                 run_failed = True
                 break
 
-            step.status = StepStatus.RUNNING.value
-            step.started_at = datetime.now(timezone.utc)
-            db.add(step)
-            db.commit()
+            journal.update_step(step, status=StepStatus.RUNNING.value, started_at=datetime.now(timezone.utc))
 
-            _emit_event(
+            await _emit_event(
                 run.id,
                 {"event": "step.started", "run_id": run.id, "step_no": step.step_no, "command": step.command},
             )
 
             stdout_path = logs_dir / f"{step.step_no}.out"
             stderr_path = logs_dir / f"{step.step_no}.err"
-            docker_cmd = _docker_command(step.command, temp_workspace, False)
-            process = subprocess.Popen(
-                docker_cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
+            outcome = None
+            limiter = _live_limiter()
+            if step.type == SHARDED_STEP_TYPE:
+                outcome = await _run_sharded_step(run, step, temp_workspace, image.ref, limiter)
+            return_code, collected_lines = outcome or await _run_single_step(
+                run.id, step, temp_workspace, image.ref, limiter
             )
 
-            collected_lines: list[str] = []
-            if process.stdout is not None:
-                for line in process.stdout:
-                    stripped = line.rstrip("\n")
-                    collected_lines.append(stripped)
-                    _emit_event(
-                        run.id,
-                        {
-                            "event": "step.log",
-                            "run_id": run.id,
-                            "step_no": step.step_no,
-                            "stream": "stdout",
-                            "line": stripped,
-                        },
-                    )
-            return_code = process.wait()
-
-            stdout_path.write_text("\n".join(collected_lines), encoding="utf-8")
-            stderr_path.write_text("", encoding="utf-8")
-
-            step.stdout_path = str(stdout_path)
-            step.stderr_path = str(stderr_path)
-            step.exit_code = return_code
-            step.finished_at = datetime.now(timezone.utc)
-            step.status = StepStatus.SUCCEEDED.value if return_code == 0 else StepStatus.FAILED.value
-            db.add(step)
+            await asyncio.to_thread(_write_step_logs, run.id, step.step_no, stdout_path, stderr_path, collected_lines)
 
-            db.add(
-                Audit(
-                    run_id=run.id,
-                    actor="worker",
-                    action="step.executed",
-                    payload_json={
-                        "step_no": step.step_no,
-                        "command": step.command,
-                        "cwd": "/workspace",
-                        "env_allowlist": ["PATH", "HOME"],
-                        "exit_code": return_code,
-                        "risk": evaluate_risk(step.command, False),
-                        "sandbox": {
-                            "network": "none",
-                            "cpus": "1.0",
-                            "memory": "512m",
-                            "pids_limit": "128",
-                        },
-                    },
+            if upload_enabled():
+                log_uploads.append(
+                    (step, asyncio.create_task(_upload_step_logs(run.id, step.step_no, stdout_path, stderr_path)))
                 )
+                log_paths = {"stdout_path": None, "stderr_path": None}
+            else:
+                log_paths = {"stdout_path": str(stdout_path), "stderr_path": str(stderr_path)}
+            journal.update_step(
+                step,
+                **log_paths,
+                exit_code=return_code,
+                finished_at=datetime.now(timezone.utc),
+                status=StepStatus.SUCCEEDED.value if return_code == 0 else StepStatus.FAILED.value,
             )
 
-            _emit_event(
+            journal.audit(
+                "step.executed",
+                {
+                    "step_no": step.step_no,
+                    "command": step.command,
+                    "cwd": "/workspace",
+                    "env_allowlist": ["PATH", "HOME"],
+                    "exit_code": return_code,
+                    "risk": evaluate_risk(step.command, False),
+                    "live_log": limiter.summary(),
+                    "sandbox": {
+                        "network": "none",
+                        "image": image.ref,
+                        "cpus": "1.0",
+                        "shards": len((run.sandbox_meta or {}).get("shards", {}).get(str(step.step_no), [])) or 1,
+                        "memory": "512m",
+                        "pids_limit": "128",
+                    },
+                },
+            )
+
+            await _emit_event(
                 run.id,
                 {
                     "event": "step.finished",
@@ -265,21 +507,22 @@ def execute_run(run_id: int) -> None:
 
             if return_code != 0:
                 step_failures_total.labels(command=step.command.split()[0] if step.command else "unknown").inc()
+                failed_step = (step.step_no, collected_lines)
                 run_failed = True
-                db.commit()
                 break
 
-            db.commit()
+            manifest = await asyncio.to_thread(_checkpoint_step, run.id, step.step_no, temp_workspace, manifest)
 
+        await _await_log_uploads(journal, log_uploads)
+        await journal.stop()
         run.finished_at = datetime.now(timezone.utc)
         run.status = RunStatus.FAILED.value if run_failed else RunStatus.SUCCEEDED.value
 
-        report_path = reports_dir / "report.md"
-        audit_path = artifacts_dir / "audit.json"
-        diff_path = artifacts_dir / "diff.patch"
-
-        steps = list(db.scalars(select(RunStep).where(RunStep.run_id == run.id).order_by(RunStep.step_no)).all())
-        _generate_report(run, steps, report_path)
+        if failed_step is not None:
+            failed_no, failed_lines = failed_step
+            await db.run_sync(lambda session: record_failure(session, run.id, run.project_id, failed_no, failed_lines))
+        previous_runs = await db.run_sync(lambda session: previous_run_counts(session, run.id))
+        report = _generate_report(run, steps, previous_runs)
 
         audit_records = [
             {
@@ -292,37 +535,67 @@ def execute_run(run_id: int) -> None:
             }
             for step in steps
         ]
-        audit_path.write_text(
-            json.dumps(
-                {
-                    "run_id": run.id,
-                    "status": run.status,
-                    "timeline": audit_records,
-                    "sandbox": run.sandbox_meta,
-                },
-                ensure_ascii=False,
-                indent=2,
-            ),
-            encoding="utf-8",
+        audit_json = json.dumps(
+            {
+                "run_id": run.id,
+                "status": run.status,
+                "timeline": audit_records,
+                "sandbox": run.sandbox_meta,
+            },
+            ensure_ascii=False,
+            indent=2,
         )
 
-        diff_cmd = ["git", "-C", str(temp_workspace), "diff"]
-        diff_proc = subprocess.run(diff_cmd, capture_output=True, text=True, check=False)
-        diff_path.write_text(diff_proc.stdout, encoding="utf-8")
-
-        _write_artifact(db, run.id, "report", report_path)
-        _emit_event(run.id, {"event": "artifact.created", "run_id": run.id, "kind": "report", "path": str(report_path)})
-        _write_artifact(db, run.id, "audit", audit_path)
-        _emit_event(run.id, {"event": "artifact.created", "run_id": run.id, "kind": "audit", "path": str(audit_path)})
-        _write_artifact(db, run.id, "diff", diff_path)
-        _emit_event(run.id, {"event": "artifact.created", "run_id": run.id, "kind": "diff", "path": str(diff_path)})
+        artifact_meta = {"kind": "artifact", "run_id": run.id}
+        try:
+            await _write_artifact(
+                db, run.id, "report", await publish_bytes(run.id, "report.md", report.encode("utf-8"), artifact_meta)
+            )
+            await _write_artifact(
+                db, run.id, "audit", await publish_bytes(run.id, "audit.json", audit_json.encode("utf-8"), artifact_meta)
+            )
+            await _write_artifact(db, run.id, "diff", await _store_diff(run.id, temp_workspace))
+            for junit_path in sorted((temp_workspace / JUNIT_DIR).glob("step-*.xml")):
+                await _write_artifact(db, run.id, "junit", await publish_file(junit_path, artifact_meta))
+        except UploadFailed as exc:
+            journal.audit("artifact.upload_failed", {"kind": "artifact", "reason": str(exc)})
 
-        db.add(Audit(run_id=run.id, actor="worker", action="run.completed", payload_json={"status": run.status}))
+        journal.audit("run.completed", {"status": run.status})
         db.add(run)
-        db.commit()
+        await journal.flush(db)
 
-        _emit_event(run.id, {"event": "run.completed", "run_id": run.id, "status": run.status})
+        await _emit_event(run.id, {"event": "run.completed", "run_id": run.id, "status": run.status})
+    except JournalBusy as exc:
+        logger.warning("skipping run %s: %s", run_id, exc)
     finally:
-        db.close()
+        for _, upload in log_uploads:
+            upload.cancel()
+        if journal is not None:
+            await journal.close()
+        await db.close()
         if temp_workspace is not None and temp_workspace.exists():
-            shutil.rmtree(temp_workspace, ignore_errors=True)
+            await asyncio.to_thread(shutil.rmtree, temp_workspace, True)
+        if upload_enabled():
+            await asyncio.to_thread(shutil.rmtree, staging_dir(run_id), True)
+
+
+async def recover_run_journals() -> int:
+    recovered = 0
+    for run_id in journal_run_ids():
+        try:
+            recovered += await recover_journal(run_id, AsyncSessionLocal)
+        except JournalBusy:
+            continue
+    return recovered
+
+
+@worker_ready.connect
+def _recover_journals_on_start(**_: object) -> None:
+    recovered = engine_loop().submit(recover_run_journals())
+    if recovered:
+        logger.info("replayed %s journal entries from interrupted runs", recovered)
+
+
+@celery_app.task(name="worker.execute_run")
+def execute_run(run_id: int) -> None:
+    engine_loop().submit(execute_run_async(run_id))
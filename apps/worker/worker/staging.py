@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from app.core.config import settings
+from app.services.artifacts.store import StoredBlob, artifact_store
+from worker.engine import event_client
+
+HASH_BLOCK_BYTES = 1024 * 1024
+RETRY_STATUSES = {409, 500, 502, 503, 504}
+
+
+class UploadFailed(Exception):
+    pass
+
+
+def upload_enabled() -> bool:
+    return settings.artifact_transport == "upload"
+
+
+def staging_dir(run_id: int) -> Path:
+    root = Path(settings.worker_staging_root) if settings.worker_staging_root else Path(tempfile.gettempdir()) / "localops-staging"
+    path = root / str(run_id)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _digest(path: Path) -> tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    with path.open("rb") as handle:
+        for block in iter(lambda: handle.read(HASH_BLOCK_BYTES), b""):
+            digest.update(block)
+            size += len(block)
+    return digest.hexdigest(), size
+
+
+def _read_chunk(path: Path, offset: int, length: int) -> bytes:
+    with path.open("rb") as handle:
+        handle.seek(offset)
+        return handle.read(length)
+
+
+async def _call(method: str, path: str, **kwargs: Any) -> dict[str, Any]:
+    response = await event_client().request(
+        method,
+        f"{settings.api_base_url}{path}",
+        headers={"x-api-key": settings.api_key},
+        timeout=settings.upload_timeout_seconds,
+        **kwargs,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def _stored(status: dict[str, Any]) -> StoredBlob:
+    return StoredBlob(
+        status["ref"], status["sha256"], status["size"], status.get("stored_size") or 0, status.get("deduplicated", False)
+    )
+
+
+async def upload_file(path: Path, meta: dict[str, Any]) -> StoredBlob:
+    sha256, size = await asyncio.to_thread(_digest, path)
+    create = {"sha256": sha256, "size": size, **meta}
+    status = await _call("POST", "/v1/internal/uploads", json=create)
+    failures = 0
+    while not status["complete"]:
+        upload = f"/v1/internal/uploads/{status['upload_id']}"
+        try:
+            if status["offset"] < size:
+                chunk = await asyncio.to_thread(_read_chunk, path, status["offset"], settings.upload_chunk_bytes)
+                status = await _call("PUT", upload, params={"offset": status["offset"]}, content=chunk)
+            else:
+                status = await _call("POST", f"{upload}:complete")
+            failures = 0
+        except (httpx.TransportError, httpx.HTTPStatusError) as exc:
+            code = exc.response.status_code if isinstance(exc, httpx.HTTPStatusError) else None
+            failures += 1
+            if failures > settings.upload_max_retries or (code is not None and code not in RETRY_STATUSES | {404}):
+                raise UploadFailed(f"upload of {path.name} failed: {exc}") from exc
+            await asyncio.sleep(min(5.0, 0.2 * 2**failures))
+            try:
+                status = await _call("GET", upload) if code != 404 else await _call("POST", "/v1/internal/uploads", json=create)
+            except (httpx.TransportError, httpx.HTTPStatusError):
+                continue
+    return _stored(status)
+
+
+async def publish_file(path: Path, meta: dict[str, Any]) -> StoredBlob:
+    if not upload_enabled():
+        return await asyncio.to_thread(artifact_store().put_file, path)
+    blob = await upload_file(path, meta)
+    path.unlink(missing_ok=True)
+    return blob
+
+
+async def publish_bytes(run_id: int, name: str, data: bytes, meta: dict[str, Any]) -> StoredBlob:
+    if not upload_enabled():
+        return await asyncio.to_thread(artifact_store().put_bytes, data)
+    staged = staging_dir(run_id) / name
+    await asyncio.to_thread(staged.write_bytes, data)
+    return await publish_file(staged, meta)
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Iterable
+from pathlib import Path
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.models.project import Project
+from app.db.session import SessionLocal
+from app.services.search.index import SKIP_DIRS, current_generation_name, excluded_dirs, index_dir_for, is_excluded
+from worker.celery_app import celery_app
+
+try:
+    from watchfiles import watch
+except ImportError:  # pragma: no cover - watchfiles ships with uvicorn[standard]
+    watch = None
+
+logger = logging.getLogger(__name__)
+
+
+def indexed_projects() -> dict[int, Path]:
+    db = SessionLocal()
+    try:
+        projects = list(db.scalars(select(Project)).all())
+    finally:
+        db.close()
+    return {
+        project.id: Path(project.root_path)
+        for project in projects
+        if Path(project.root_path).is_dir() and current_generation_name(index_dir_for(project.id)) is not None
+    }
+
+
+def projects_for_changes(projects: dict[int, Path], changed_paths: Iterable[str]) -> set[int]:
+    matched: set[int] = set()
+    excluded = {project_id: excluded_dirs(root, index_dir_for(project_id)) for project_id, root in projects.items()}
+    for raw_path in changed_paths:
+        changed = Path(raw_path)
+        for project_id, root in projects.items():
+            try:
+                relative = changed.relative_to(root)
+            except ValueError:
+                continue
+            if any(part in SKIP_DIRS for part in relative.parts) or is_excluded(relative, excluded[project_id]):
+                continue
+            matched.add(project_id)
+    return matched
+
+
+def _enqueue_refresh(project_ids: Iterable[int]) -> None:
+    for project_id in sorted(project_ids):
+        logger.info("enqueue index refresh for project %s", project_id)
+        celery_app.send_task("worker.refresh_index", kwargs={"project_id": project_id})
+
+
+def _watch_until_reload(projects: dict[int, Path]) -> None:
+    deadline = time.monotonic() + settings.index_watch_reload_seconds
+    for changes in watch(
+        *projects.values(),
+        debounce=settings.index_watch_debounce_ms,
+        rust_timeout=settings.index_watch_reload_seconds * 1000,
+        yield_on_timeout=True,
+        force_polling=settings.index_watch_force_polling or None,
+    ):
+        if changes:
+            _enqueue_refresh(projects_for_changes(projects, (path for _, path in changes)))
+        if time.monotonic() >= deadline:
+            return
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    while True:
+        projects = indexed_projects()
+        if not projects:
+            time.sleep(settings.index_watch_poll_seconds)
+            continue
+        if watch is None:
+            _enqueue_refresh(projects)
+            time.sleep(settings.index_watch_poll_seconds)
+            continue
+        _watch_until_reload(projects)
+
+
+if __name__ == "__main__":
+    main()